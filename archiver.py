@@ -1,37 +1,139 @@
 import sys
 import os
+import stat
+import time
+import errno
 import shutil
 import datetime
+import concurrent.futures
+import metrics
 
 # --- Configuration ---
 # The file extension we are looking for.
 TARGET_EXTENSION = ".nupkg"
 # The base directory where all the temporary download folders reside.
 TEMP_DOWNLOAD_FOLDER = "temp_downloads"
+# How packages reach the destination folder:
+#   auto    - hard link, else reflink (copy-on-write clone), else copy
+#   reflink - reflink, else copy (the destination never shares an inode with the source)
+#   copy    - always copy
+LINK_MODES = ("auto", "reflink", "copy")
+# Threads copying packages when they cannot be linked (copies are I/O bound).
+COPY_WORKERS = 8
+# Linux ioctl that clones a file's extents on btrfs, XFS and other CoW filesystems.
+FICLONE = 0x40049409
 
-def extract_nupkg_packages():
+def _scan_package_folders(source_base_dir):
+    """
+    Lists '<name>/<name>.nupkg' under source_base_dir in one os.scandir pass.
+
+    Only the folder entries come from scandir (whose type check needs no extra
+    stat on most platforms); each candidate package is then stat'ed once, and that
+    result is reused for its size and device.
+
+    Returns:
+        tuple (list, list): (folder name, package path, os.stat_result) for every
+                            package found, and the package paths that were missing.
+    """
+    found, missing = [], []
+    with os.scandir(source_base_dir) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            # Assume file name is EXACTLY the raw folder name + extension.
+            # This handles cases where directory names contain hidden whitespace.
+            source_file_path = os.path.join(entry.path, entry.name + TARGET_EXTENSION)
+            try:
+                st = os.stat(source_file_path)
+            except OSError:
+                missing.append(source_file_path)
+                continue
+            if stat.S_ISREG(st.st_mode):
+                found.append((entry.name, source_file_path, st))
+            else:
+                missing.append(source_file_path)
+    return found, missing
+
+def _reflink(source_path, destination_path):
+    """Clones source_path as a copy-on-write reflink. Raises OSError where unsupported."""
+    import fcntl # Not available on Windows, where reflinks are never attempted
+    with open(source_path, 'rb') as src, open(destination_path, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination_path)
+            raise
+    shutil.copystat(source_path, destination_path)
+
+def _link_package(source_path, destination_path, link_mode, same_device):
+    """
+    Links source_path into place without copying its data, if link_mode and the
+    filesystem allow it.
+
+    Returns:
+        str or None: 'hardlink' or 'reflink', or None if the file must be copied.
+    """
+    if not same_device or link_mode == "copy":
+        return None
+    if link_mode == "auto":
+        try:
+            os.link(source_path, destination_path)
+            return "hardlink"
+        except OSError:
+            pass # Links not supported here (e.g. FAT/exFAT); try a clone
+    if sys.platform.startswith("linux"):
+        try:
+            _reflink(source_path, destination_path)
+            return "reflink"
+        except OSError as e:
+            if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EPERM):
+                raise
+    return None
+
+def extract_nupkg_packages(source_base_dir=None, destination_dir=None, link_mode="auto", max_workers=COPY_WORKERS,
+                           verbose=False):
     """
     Scans subdirectories inside the 'temp_downloads' folder (relative to the
-    script's location) for matching .nuget files and copies them to a new, 
+    script's location) for matching .nuget files and collects them into a new,
     timestamped destination folder.
     
     This version correctly uses the executable's location to resolve paths, 
     ensuring it works reliably when packaged as an EXE and passed to users.
+
+    The folder is scanned once with os.scandir. When the destination is on the
+    same filesystem, each package is hard-linked (or reflinked) rather than
+    copied; anything that cannot be linked is copied by a pool of threads.
+
+    Args:
+        source_base_dir (str, optional): Folder holding one subfolder per package;
+                                         defaults to [EXE_DIR]/temp_downloads.
+        destination_dir (str, optional): Folder to collect into; defaults to
+                                         [EXE_DIR]/whale_puup_<timestamp>.
+        link_mode (str): One of LINK_MODES.
+        max_workers (int): Threads used for copies.
+        verbose (bool): Print a line for every package, not just failures.
+
+    Returns:
+        str: The destination folder, or None if the source folder is missing or
+             the destination cannot be created.
     """
-    
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode '{link_mode}' (choose from {', '.join(LINK_MODES)})")
+
     # 1. Determine the absolute path of the script's directory (EXE location)
     # sys.argv[0] holds the path to the executing file. os.path.dirname 
     # extracts the folder path from that file path.
     script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
     
     # Construct the GUARANTEED input path: [EXE_DIR]/temp_downloads
-    SOURCE_BASE_DIR = os.path.join(script_dir, TEMP_DOWNLOAD_FOLDER)
+    SOURCE_BASE_DIR = source_base_dir or os.path.join(script_dir, TEMP_DOWNLOAD_FOLDER)
 
     
     # 2. Generate the unique, timestamped destination folder name
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     # Construct the GUARANTEED output path: [EXE_DIR]/whale_puup_...
-    DESTINATION_DIR = os.path.join(script_dir, f"whale_puup_{timestamp}")
+    DESTINATION_DIR = destination_dir or os.path.join(script_dir, f"whale_puup_{timestamp}")
     
     # Check if the source directory exists
     if not os.path.isdir(SOURCE_BASE_DIR):
@@ -47,46 +149,68 @@ def extract_nupkg_packages():
         print(f"Error creating destination folder: {e}")
         return
 
-    found_count = 0
-    
-    # 4. Iterate through all items in the SOURCE_BASE_DIR
-    for folder_name_raw in os.listdir(SOURCE_BASE_DIR):
-        
-        # We must use the raw folder name to access the folder path
-        sub_dir_path = os.path.join(SOURCE_BASE_DIR, folder_name_raw)
+    start = time.perf_counter()
+    destination_device = os.stat(DESTINATION_DIR).st_dev
 
-        # Ensure the item is a directory before proceeding
-        if os.path.isdir(sub_dir_path):
-            
-            # Assume file name is EXACTLY the raw folder name + extension.
-            # This handles cases where directory names contain hidden whitespace.
-            expected_filename = f"{folder_name_raw}{TARGET_EXTENSION}"
-            source_file_path = os.path.join(sub_dir_path, expected_filename)
-            
-            # Print the path we are checking using os.path.join for clean separators
-            print(f"\nChecking path: {source_file_path}")
-
-            # 5. Check if the specific, expected file exists
-            if os.path.isfile(source_file_path):
-                # We strip the name for the final output folder to keep files clean.
-                clean_filename_for_copy = f"{folder_name_raw.strip()}{TARGET_EXTENSION}"
-                destination_file_path = os.path.join(DESTINATION_DIR, clean_filename_for_copy)
-                
-                # 6. Copy the file
+    # 4. Scan the SOURCE_BASE_DIR once for '<name>/<name>.nupkg'
+    packages, missing = _scan_package_folders(SOURCE_BASE_DIR)
+    for source_file_path in missing:
+        print(f"\nChecking path: {source_file_path}")
+        print(f"  -> File not found at expected location.")
+
+    # 5. Link what can be linked; queue the rest for copying
+    counts = {"hardlink": 0, "reflink": 0, "copy": 0}
+    found_count = copied_bytes = 0
+    to_copy = []
+    for folder_name_raw, source_file_path, st in packages:
+        # We strip the name for the final output folder to keep files clean.
+        clean_filename_for_copy = f"{folder_name_raw.strip()}{TARGET_EXTENSION}"
+        destination_file_path = os.path.join(DESTINATION_DIR, clean_filename_for_copy)
+        same_device = st.st_dev == destination_device
+        try:
+            how = _link_package(source_file_path, destination_file_path, link_mode, same_device)
+        except OSError as e:
+            print(f"  -> ERROR linking '{clean_filename_for_copy}': {e}")
+            continue
+        if how is None:
+            if same_device:
+                link_mode = "copy" # This filesystem refused; don't pay for a failed attempt per package
+            to_copy.append((clean_filename_for_copy, source_file_path, destination_file_path, st.st_size))
+            continue
+        counts[how] += 1
+        found_count += 1
+        copied_bytes += st.st_size
+        if verbose:
+            print(f"  -> SUCCESS: Linked '{clean_filename_for_copy}' ({how}) to '{DESTINATION_DIR}'")
+
+    # 6. Copy the rest on a thread pool
+    if to_copy:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # shutil.copy2 preserves file metadata
+            futures = {executor.submit(shutil.copy2, source, destination): (name, size)
+                       for name, source, destination, size in to_copy}
+            for future in concurrent.futures.as_completed(futures):
+                name, size = futures[future]
                 try:
-                    # shutil.copy2 preserves file metadata
-                    shutil.copy2(source_file_path, destination_file_path)
-                    found_count += 1
-                    print(f"  -> SUCCESS: Copied '{clean_filename_for_copy}' to '{DESTINATION_DIR}'")
+                    future.result()
                 except Exception as e:
-                    print(f"  -> ERROR copying '{clean_filename_for_copy}': {e}")
-            else:
-                print(f"  -> File not found at expected location.")
-            
+                    print(f"  -> ERROR copying '{name}': {e}")
+                    continue
+                counts["copy"] += 1
+                found_count += 1
+                copied_bytes += size
+                if verbose:
+                    print(f"  -> SUCCESS: Copied '{name}' to '{DESTINATION_DIR}'")
+    elapsed = time.perf_counter() - start
+    metrics.recorder().record("collect", elapsed, copied_bytes)
+
     # 7. Final summary
     print("\n--- Summary ---")
     if found_count > 0:
-        print(f"Extraction complete! Copied {found_count} file(s) to '{DESTINATION_DIR}'")
+        rate = f"{found_count / elapsed:.0f} files/s, {copied_bytes / elapsed / (1024 * 1024):.1f} MB/s" if elapsed > 0 else "instant"
+        print(f"Extraction complete! Collected {found_count} file(s) ({copied_bytes / (1024 * 1024):.1f} MB) "
+              f"to '{DESTINATION_DIR}' in {elapsed:.2f} s ({rate}): {counts['hardlink']} hard-linked, "
+              f"{counts['reflink']} reflinked, {counts['copy']} copied")
     else:
         print(f"No matching {TARGET_EXTENSION} files were found.")
 
@@ -114,13 +238,8 @@ def create_zip_archive(source_folder_path):
     output_dir = source_folder_path 
     
     try:
-        # shutil.make_archive parameters:
-        # 1. base_name: The path/name of the output ZIP (WITHOUT the .zip extension)
-        # 2. format: 'zip'
-        # 3. root_dir: The directory *containing* the directory to be zipped (the parent folder)
-        # 4. base_dir: The directory *to be zipped* (the source folder name itself)
-        
-        # We want to zip the *contents* of source_folder_path, 
+        # We want to zip the *contents* of source_folder_path (under a top-level
+        # folder of the same name, as shutil.make_archive with base_dir did),
         # but we need the output file to land *inside* source_folder_path.
         
         # To do this, we create the ZIP file *temporarily* outside the folder, 
@@ -128,15 +247,11 @@ def create_zip_archive(source_folder_path):
         
         # Temporary ZIP path in the parent directory
         parent_dir = os.path.dirname(source_folder_path)
-        temp_zip_path = os.path.join(parent_dir, zip_basename) 
+        archive_path_with_ext = os.path.join(parent_dir, f"{zip_basename}.zip")
         
-        # Archive the contents of the source folder
-        archive_path_with_ext = shutil.make_archive(
-            base_name=temp_zip_path,  # Output file name (temporarily outside)
-            format='zip',
-            root_dir=parent_dir,      # Start search in parent directory
-            base_dir=zip_basename     # Zip the contents of this folder inside root_dir
-        )
+        # Archive the contents of the source folder, deflating members across all cores
+        members = zipwriter.collect_members(source_folder_path, prefix=zip_basename)
+        zipwriter.write_zip_parallel(members, archive_path_with_ext)
         
         # 3. Move the ZIP file into the source folder
         final_zip_name = f"{zip_basename}.zip"
@@ -164,21 +279,108 @@ import os
 import shutil
 # IMPORTANT: These imports rely on other modules existing in the same directory.
 import encoder  # Assumes encoder.py has encode_file_to_base64
+import zipwriter # Parallel deflate for archive members
+import incremental # Manifest-based reuse of unchanged members
+import dedup # Stores identical files once
+import repack # Copies .nupkg members straight into the archive
+import volumes # Split Base64 output into numbered parts
+import integrity # Block hashes recorded while encoding
+import compression # Per-file choice of compression method
+import metrics # Per-stage timing and throughput
+import scanner # Parallel folder listing with include/exclude rules
 import utilities # Assumes utilities.py has the color function
 
-def archive_and_encode_packages(source_dir, dest_folder):
+def write_zip_stream(source_dir, fileobj, max_workers=None, deduplicate=False, policy=None,
+                     repack_packages=False, package_filter=None, scan_rules=None):
+    """
+    Writes the contents of source_dir as a ZIP archive into an open binary stream.
+
+    Member names are relative to source_dir (matching shutil.make_archive with
+    root_dir=source_dir), and empty directories are kept as directory entries.
+    Members are compressed in parallel by zipwriter, and files are compressed in
+    chunks, so memory use does not grow with file size. The compression policy
+    picks each file's method; already-compressed content is stored.
+
+    Args:
+        source_dir (str): The directory whose contents are archived.
+        fileobj: A writable binary stream (seekable or not).
+        max_workers (int, optional): Compression processes; defaults to the CPU count.
+        deduplicate (bool): Store files with identical content once, plus an index
+                            that dedup.restore_archive uses to put the copies back.
+        policy (compression.CompressionPolicy or str, optional): Compression policy
+                                                                 or its name (see
+                                                                 compression.POLICIES).
+        repack_packages (bool): source_dir holds downloaded '<package_id>.nupkg' files,
+                                whose members are copied into the archive under
+                                '<package_id>/' without being extracted (see repack.py).
+        package_filter (package_filter.PackageFilter, optional): With repack_packages,
+                                                                 copy only the wanted
+                                                                 members.
+        scan_rules (scanner.ScanRules, optional): Paths to leave out of source_dir.
+
+    Returns:
+        int: The number of files archived (including deduplicated copies).
+    """
+    policy = compression.get_policy(policy)
+    if repack_packages:
+        stats = repack.write_zip_repack(source_dir, fileobj, policy, package_filter, deduplicate)
+        if deduplicate:
+            dedup.print_report(stats["dedup"])
+        repack.print_report(stats)
+        return stats["files"]
+    members = scanner.collect_members(source_dir, scan_rules)
+    if deduplicate:
+        stats = dedup.write_zip_dedup(members, fileobj, max_workers, policy)
+        dedup.print_report(stats)
+        return stats["files"]
+    return zipwriter.write_zip_parallel(members, fileobj, max_workers, policy)
+
+def archive_and_encode_packages(source_dir, dest_folder, stream=True, incremental_build=False,
+                                deduplicate=False, part_size=None, compression_policy=None,
+                                repack_packages=False, package_filter=None, codec=None, scan_rules=None):
     """
     Archives the content of the source directory into a ZIP file,
     then encodes that ZIP file into a Base64 .txt file in the destination folder.
 
+    In streaming mode (the default) the ZIP is never written to disk: archive output
+    is fed straight into a chunked Base64 encoder, so disk I/O is halved, no extra
+    free space is needed, and peak memory stays constant for any archive size.
+
     Args:
         source_dir (str): The directory containing files to be zipped (either
                           NuGet extracted content or user's local folder).
         dest_folder (str): The final destination path for the ZIP and Base64 files.
+        stream (bool): Encode in a single streaming pass instead of writing an
+                       intermediate ZIP file first.
+        incremental_build (bool): In streaming mode, keep a manifest next to the output
+                                  and only recompress files that changed since the
+                                  previous run.
+        deduplicate (bool): Store identical files once (e.g. the same DLL shipped by
+                            several packages). Ignored for incremental builds.
+        part_size (int, optional): Split the Base64 output into numbered part files
+                                   of at most this many bytes, encoded in parallel.
+                                   Implies stream=False and no incremental build.
+        compression_policy (str, optional): Name of a compression.POLICIES entry
+                                            (or a CompressionPolicy); 'default' if None.
+        repack_packages (bool): source_dir holds downloaded .nupkg files to repack
+                                rather than extracted packages (see write_zip_stream).
+                                Ignored for incremental builds.
+        package_filter (package_filter.PackageFilter, optional): Members to keep when
+                                                                 repacking.
+        codec (str, optional): A textcodec.CODECS name for the text output; Base64 if
+                               None. Base85 and Ascii85 output is 6% smaller but
+                               slower to encode and decode.
+        scan_rules (scanner.ScanRules, optional): gitignore-style rules for what to
+                                                  leave out of source_dir (see
+                                                  scanner.load_rules); everything is
+                                                  archived if None.
 
     Returns:
         tuple (str, str): A tuple containing the paths to the final ZIP file
                           and the final Base64 TXT file, or (None, None) on failure.
+                          In streaming mode no ZIP file is created and the first
+                          element is None. With part_size the second element is
+                          the list of part file paths.
     """
     
     zip_path = None
@@ -192,26 +394,71 @@ def archive_and_encode_packages(source_dir, dest_folder):
         # 1. --- Determine ZIP Filename ---
         base_name = os.path.basename(source_dir)
         zip_base = os.path.join(dest_folder, base_name)
+        base64_output_path = zip_base + ".base64.txt"
+
+        if stream and not part_size:
+            # 2. --- Stream ZIP Output Straight Into the Base64 Encoder ---
+            print(utilities.color(f"[ARCHIVE] Streaming ZIP of {base_name} directly into Base64...", "YELLOW"))
+
+            if incremental_build:
+                # The incremental builder restores the previous output itself on failure
+                output_path, base64_output_path = base64_output_path, None
+                with metrics.stage("archive+encode", base_name) as stage:
+                    stats = incremental.archive_incremental(source_dir, output_path, policy=compression_policy,
+                                                            codec=codec, scan_rules=scan_rules)
+                    stage.bytes = stats["archive_bytes"]
+                incremental.print_report(stats)
+                print(utilities.color(f"[ENCODE] Base64 file saved to: {output_path}", "GREEN"))
+                return None, output_path
+
+            # Archive bytes are hashed as they are encoded and recorded in a sidecar
+            # manifest, which decode mode checks block by block.
+            hasher = integrity.BlockHasher()
+            with metrics.stage("archive+encode", base_name) as stage, \
+                    encoder.Base64StreamWriter(base64_output_path, hasher=hasher, codec=codec) as b64_stream:
+                file_count = write_zip_stream(source_dir, b64_stream, deduplicate=deduplicate,
+                                              policy=compression_policy, repack_packages=repack_packages,
+                                              package_filter=package_filter, scan_rules=scan_rules)
+                stage.bytes = hasher.size
+            integrity.write_manifest(integrity.manifest_path_for(base64_output_path), hasher, base64_output_path)
+
+            print(utilities.color(f"[ENCODE] Archived {file_count} file(s); Base64 file saved to: {base64_output_path}", "GREEN"))
+            return None, base64_output_path
         
         print(utilities.color(f"[ARCHIVE] Compressing contents of {base_name} into a ZIP...", "YELLOW"))
 
         # 2. --- Create ZIP Archive ---
-        # shutil.make_archive handles creating the zip file from the directory content
-        shutil.make_archive(zip_base, 'zip', source_dir)
+        # Members are compressed across all cores, same layout as shutil.make_archive
         zip_path = zip_base + '.zip'
+        with metrics.stage("archive", base_name) as stage:
+            write_zip_stream(source_dir, zip_path, deduplicate=deduplicate, policy=compression_policy,
+                             repack_packages=repack_packages, package_filter=package_filter, scan_rules=scan_rules)
         
-        if not os.path.exists(zip_path):
-            raise Exception("ZIP creation failed unexpectedly.")
+            if not os.path.exists(zip_path):
+                raise Exception("ZIP creation failed unexpectedly.")
+            stage.bytes = os.path.getsize(zip_path)
             
         print(utilities.color(f"[ARCHIVE] ZIP Archive created successfully at: {zip_path}", "GREEN"))
 
         # 3. --- BASE64 ENCODING ---
-        base64_output_path = zip_base + ".base64.txt"
-        
         print(utilities.color(f"[ENCODE] Starting Base64 encoding of {os.path.basename(zip_path)}...", "CYAN"))
 
+        if part_size:
+            # Each part is a byte range of the ZIP, encoded in its own worker process
+            with metrics.stage("encode", base_name) as stage:
+                part_paths = volumes.encode_parts(zip_path, zip_base, part_size, codec=codec)
+                stage.bytes = os.path.getsize(zip_path)
+            print(utilities.color(f"[ENCODE] Base64 encoding complete. {len(part_paths)} part(s) saved to: {dest_folder}", "GREEN"))
+            os.remove(zip_path)
+            return zip_path, part_paths
+
         # Call the encoder module function to perform the Base64 conversion
-        encoder.encode_file_to_base64(zip_path, base64_output_path)
+        hasher = integrity.BlockHasher()
+        with metrics.stage("encode", base_name) as stage:
+            if not encoder.encode_file_to_base64(zip_path, base64_output_path, hasher=hasher, codec=codec):
+                raise Exception("Base64 encoding failed.")
+            stage.bytes = hasher.size
+        integrity.write_manifest(integrity.manifest_path_for(base64_output_path), hasher, base64_output_path)
         
         print(utilities.color(f"[ENCODE] Base64 encoding complete. File saved to: {base64_output_path}", "GREEN"))
 
@@ -0,0 +1,1247 @@
+# ==============================================================================
+# WHALE-PUUP Benchmark Script (benchmark.py)
+# Offline benchmarks for the download, archive, and encode stages. Everything
+# runs against local stub servers and synthetic data; no internet is required.
+#
+# Usage:
+#   python benchmark.py                 (run every benchmark)
+#   python benchmark.py download        (run a single benchmark by name)
+# ==============================================================================
+
+import io
+import os
+import base64
+import json
+import hashlib
+import sys
+import time
+import random
+import zipfile
+import threading
+import http.server
+import metrics
+import stub_feed
+import utilities
+
+# Input sizes for the file-based benchmarks, overridable with e.g.
+# WHALE_PUUP_BENCH_SIZES=10M,256M for a quicker run.
+DEFAULT_BENCH_SIZES = "10M,1G,4G"
+
+# --- Synthetic Data Helpers ---
+
+def bench_sizes():
+    """Returns the configured benchmark input sizes in bytes."""
+    return [utilities.parse_size(s) for s in os.environ.get("WHALE_PUUP_BENCH_SIZES", DEFAULT_BENCH_SIZES).split(',') if s.strip()]
+
+def format_size(size):
+    for unit, factor in (("G", 1024 ** 3), ("M", 1024 ** 2), ("K", 1024)):
+        if size >= factor:
+            return f"{size / factor:g}{unit}"
+    return str(size)
+
+def write_random_file(file_path, size, block_size=8 * 1024 * 1024):
+    """Writes a file of pseudo-random (incompressible) bytes, reusing one random block."""
+    block = os.urandom(min(size, block_size))
+    with open(file_path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+
+def make_fake_nupkg(package_id, payload_size=64 * 1024, seed=0):
+    """
+    Builds an in-memory .nupkg (ZIP) with a nuspec and one pseudo-random DLL payload.
+
+    Args:
+        package_id (str): Package ID written into the nuspec and file names.
+        payload_size (int): Size in bytes of the fake DLL payload.
+        seed (int): Seed for the payload generator, for reproducible bytes.
+
+    Returns:
+        bytes: The raw bytes of the .nupkg archive.
+    """
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{package_id}.nuspec", f"<package><metadata><id>{package_id}</id><version>1.0.0</version></metadata></package>")
+        zf.writestr(f"lib/netstandard2.0/{package_id}.dll", rng.randbytes(payload_size))
+    return buffer.getvalue()
+
+def make_text_block(size, seed=0):
+    """Returns pseudo-random word text: compressible, but not trivially so."""
+    rng = random.Random(seed)
+    words = [''.join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))) for _ in range(4096)]
+    text = bytearray()
+    while len(text) < size:
+        text += ' '.join(rng.choices(words, k=1024)).encode() + b'\n'
+    return bytes(text[:size])
+
+def make_synthetic_tree(root, small_count=3000, small_size=16 * 1024, large_count=3, large_size=48 * 1024 * 1024):
+    """
+    Creates a tree of many small text files spread over folders plus a few large ones.
+
+    Returns:
+        int: Total bytes written.
+    """
+    block = make_text_block(4 * 1024 * 1024)
+    total = 0
+    for i in range(small_count):
+        folder = os.path.join(root, f"pkg{i % 50:02d}", "lib", "net8.0")
+        os.makedirs(folder, exist_ok=True)
+        offset = (i * 7919) % (len(block) - small_size)
+        with open(os.path.join(folder, f"file{i}.xml"), 'wb') as f:
+            f.write(block[offset:offset + small_size])
+        total += small_size
+    for i in range(large_count):
+        with open(os.path.join(root, f"large{i}.bin"), 'wb') as f:
+            written = 0
+            while written < large_size:
+                chunk = block[:large_size - written]
+                f.write(chunk)
+                written += len(chunk)
+        total += large_size
+    return total
+
+# --- Local Stub HTTP Server ---
+
+class LocalFeedServer:
+    """
+    A threaded local HTTP server that serves a folder of .nupkg files as a NuGet v3
+    feed: a service index at /v3/index.json, a flat container (version lists and
+    packages) and registration indexes carrying each package's SHA-512, so full
+    NuGet mode runs against it offline. Metadata responses carry an ETag and answer
+    a matching If-None-Match with 304, as nuget.org does.
+
+    Use as a context manager; `service_index_url` is suitable for --feed.
+    """
+
+    def __init__(self, folder, latency=0.0):
+        """
+        Args:
+            folder (str): A folder feed (see feeds.FolderFeed) to serve.
+            latency (float): Seconds to sleep before answering each request.
+        """
+        import feeds
+        self.source = feeds.FolderFeed(folder)
+        self.latency = latency
+        self.request_count = 0
+        self.not_modified = 0
+        self.metadata_bytes_sent = 0
+        self.bytes_sent = 0
+        self._documents = {} # Metadata path -> body, built on first request
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def _metadata(self, path):
+        """Returns the JSON body served at path, or None if there is none."""
+        import feeds
+        parts = path.strip('/').split('/')
+        if path == "/v3/index.json":
+            document = {"version": "3.0.0", "resources": [
+                {"@id": f"{self.base_url}/v3-flatcontainer/", "@type": "PackageBaseAddress/3.0.0"},
+                {"@id": f"{self.base_url}/v3/registration/", "@type": "RegistrationsBaseUrl/3.6.0"}]}
+        elif parts[0] == "v3-flatcontainer" and len(parts) == 3 and parts[2] == "index.json":
+            versions = [feeds.normalize_version(v) for v in self.source.versions(parts[1])]
+            document = {"versions": versions} if versions else None
+        elif parts[:2] == ["v3", "registration"] and len(parts) == 4 and parts[3] == "index.json":
+            try:
+                entries = self.source.registration(parts[2])
+            except ValueError:
+                return None
+            leaves = []
+            for version, entry in entries.items():
+                if "packageHash" not in entry:
+                    with open(self.source.package_path(parts[2], version), 'rb') as f:
+                        entry["packageHash"] = base64.b64encode(hashlib.sha512(f.read()).digest()).decode()
+                leaves.append({"catalogEntry": entry})
+            document = {"count": 1, "items": [{"count": len(leaves), "items": leaves}]}
+        else:
+            return None
+        return json.dumps(document).encode() if document else None
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                parts = self.path.strip('/').split('/')
+                is_package = parts[0] == "v3-flatcontainer" and len(parts) == 4
+                if is_package:
+                    package_path = stub.source.package_path(parts[1], parts[2])
+                    body = None
+                    if package_path:
+                        with open(package_path, 'rb') as f:
+                            body = f.read()
+                else:
+                    with stub._lock:
+                        if self.path not in stub._documents:
+                            stub._documents[self.path] = stub._metadata(self.path)
+                        body = stub._documents[self.path]
+                if body is None:
+                    self.send_error(404)
+                    return
+
+                etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    with stub._lock:
+                        stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream" if is_package else "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except OSError:
+                    self.close_connection = True
+                    return
+                with stub._lock:
+                    stub.bytes_sent += len(body)
+                    if not is_package:
+                        stub.metadata_bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                pass # Keep benchmark output clean
+
+        return Handler
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def service_index_url(self):
+        return f"{self.base_url}/v3/index.json"
+
+    def __enter__(self):
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+# --- Output Helpers ---
+
+class _Quiet:
+    """Context manager that silences stdout so per-package progress lines don't swamp results."""
+
+    def __enter__(self):
+        self._stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def __exit__(self, exc_type, exc, tb):
+        sys.stdout.close()
+        sys.stdout = self._stdout
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size in MB of this process or of its largest
+    worker process, whichever is higher, or None where unsupported.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None # Windows
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_isolated(func, *args):
+    """
+    Runs func(*args) in a fresh spawned process so its peak RSS is measured on its own.
+
+    Returns:
+        tuple: (elapsed seconds, peak RSS in MB or None, func's return value).
+    """
+    import multiprocessing
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(_timed_call, (func,) + args)
+
+def _timed_call(func, *args):
+    with _Quiet():
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+    return elapsed, peak_rss_mb(), result
+
+def print_header(title):
+    print(utilities.color("\n" + "="*50, "MAGENTA"))
+    print(utilities.color(f"BENCHMARK: {title}", "MAGENTA"))
+    print(utilities.color("="*50, "MAGENTA"))
+
+# ==============================================================================
+# --- Benchmarks ---
+# ==============================================================================
+
+def bench_download(package_count=48, payload_size=64 * 1024, latency=0.05, worker_counts=(1, 2, 4, 8, 16)):
+    """Measures download_packages throughput against a stub server as the worker count grows."""
+    import downloader
+
+    print_header(f"download ({package_count} packages, {latency * 1000:.0f} ms simulated latency)")
+    packages = {f"Stub.Package{i}": make_fake_nupkg(f"Stub.Package{i}", payload_size, seed=i) for i in range(package_count)}
+
+    with stub_feed.StubNuGetServer(packages, latency=latency) as server:
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            with _Quiet():
+                result_dir = downloader.download_packages(list(packages), max_workers=workers, feed=server.feed)
+            elapsed = time.perf_counter() - start
+            if result_dir is None:
+                print(utilities.color(f"  workers={workers:<3} FAILED", "RED"))
+                continue
+            utilities.cleanup(result_dir)
+            baseline = baseline or elapsed
+            print(f"  workers={workers:<3} {elapsed:7.3f} s  {package_count / elapsed:8.1f} pkg/s  speedup x{baseline / elapsed:.1f}")
+
+def bench_cache(package_count=24, payload_size=256 * 1024, latency=0.05):
+    """Compares a cold (empty cache) NuGet download run with a warm one."""
+    import shutil
+    import tempfile
+    import cache
+    import downloader
+
+    print_header(f"cache ({package_count} packages, {latency * 1000:.0f} ms simulated latency)")
+    packages = {f"Stub.Package{i}": make_fake_nupkg(f"Stub.Package{i}", payload_size, seed=i) for i in range(package_count)}
+    cache_dir = tempfile.mkdtemp(prefix="whale_puup_bench_cache_")
+
+    try:
+        with stub_feed.StubNuGetServer(packages, latency=latency) as server:
+            for label in ("cold", "warm"):
+                package_cache = cache.PackageCache(cache_dir=cache_dir)
+                requests_before = server.request_count
+                start = time.perf_counter()
+                with _Quiet():
+                    result_dir = downloader.download_packages(list(packages), feed=server.feed,
+                                                              cache=package_cache)
+                elapsed = time.perf_counter() - start
+                utilities.cleanup(result_dir)
+                print(f"  {label:<5} {elapsed:7.3f} s  {server.request_count - requests_before:3d} HTTP request(s)  "
+                      f"hits={package_cache.hits} misses={package_cache.misses} "
+                      f"saved={package_cache.bytes_saved / (1024 * 1024):.1f} MB")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def bench_codec():
+    """Reports encode/decode throughput (MB/s of raw data) and peak RSS per input size."""
+    import shutil
+    import tempfile
+    import encoder
+
+    print_header("codec (streaming Base64 encode/decode)")
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_codec_")
+    try:
+        for size in bench_sizes():
+            raw_path = os.path.join(work_dir, "input.bin")
+            text_path = os.path.join(work_dir, "input.base64.txt")
+            out_path = os.path.join(work_dir, "output.bin")
+            write_random_file(raw_path, size)
+
+            for label, func, args in (
+                ("encode", encoder.encode_file_to_base64, (raw_path, text_path)),
+                ("encode/76", encoder.encode_file_to_base64, (raw_path, text_path, 76)),
+                ("decode/76", encoder.decode_file_from_base64, (text_path, out_path)),
+            ):
+                elapsed, rss, ok = run_isolated(func, *args)
+                rss_text = f"{rss:7.1f} MB" if rss is not None else "    n/a"
+                status = "" if ok else utilities.color("  FAILED", "RED")
+                print(f"  {format_size(size):>5} {label:<10} {elapsed:8.2f} s  {size / elapsed / (1024 * 1024):8.1f} MB/s  "
+                      f"peak RSS {rss_text}{status}")
+            for path in (raw_path, text_path, out_path):
+                os.remove(path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def bench_codecs(size=64 * 1024 * 1024, line_length=76):
+    """
+    Output size vs. CPU cost of each text codec: encode, streaming decode and
+    parallel decode throughput (MB/s of raw data) on incompressible data.
+    """
+    import shutil
+    import tempfile
+    import encoder
+    import textcodec
+
+    print_header(f"codecs ({format_size(size)}, {line_length}-column lines; {os.cpu_count() or 1} CPU(s) available)")
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_codecs_")
+    raw_path = os.path.join(work_dir, "input.bin")
+    text_path = os.path.join(work_dir, "input.base64.txt")
+    out_path = os.path.join(work_dir, "output.bin")
+    try:
+        write_random_file(raw_path, size)
+        print(f"  {'codec':<8} {'text size':>10} {'overhead':>9} {'encode':>12} {'decode':>12} {'parallel':>12}")
+        for name, codec in textcodec.CODECS.items():
+            encode_seconds, _, ok = run_isolated(encoder.encode_file_to_base64, raw_path, text_path, line_length,
+                                                 encoder.ENCODE_BLOCK_SIZE, None, name)
+            text_size = os.path.getsize(text_path)
+            rates = []
+            for func in (encoder.decode_file_from_base64, encoder.decode_file_parallel):
+                elapsed, _, decoded = run_isolated(func, text_path, out_path)
+                ok = ok and decoded and _same_file(raw_path, out_path)
+                rates.append(size / elapsed / (1024 * 1024))
+                os.remove(out_path)
+            status = "" if ok else utilities.color("  FAILED", "RED")
+            print(f"  {name:<8} {format_size(text_size):>10} {(text_size / size - 1) * 100:8.1f}% "
+                  f"{size / encode_seconds / (1024 * 1024):7.1f} MB/s {rates[0]:7.1f} MB/s {rates[1]:7.1f} MB/s{status}")
+            os.remove(text_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def physical_memory_bytes():
+    """Returns total physical memory in bytes, or None where unknown."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def naive_decode(input_path, output_path):
+    """The read-everything-then-decode baseline: the whole text and result are held in memory."""
+    import binascii
+    with open(input_path, 'rb') as f:
+        text = f.read()
+    with open(output_path, 'wb') as f:
+        f.write(binascii.a2b_base64(text))
+    return True
+
+def bench_decode():
+    """Compares naive, streaming and memory-mapped parallel decoding of wrapped Base64 text."""
+    import shutil
+    import tempfile
+    import encoder
+
+    print_header(f"decode (76-column Base64 text; {os.cpu_count() or 1} CPU(s) available)")
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_decode_")
+    memory = physical_memory_bytes()
+    try:
+        for size in bench_sizes():
+            raw_path = os.path.join(work_dir, "input.bin")
+            text_path = os.path.join(work_dir, "input.base64.txt")
+            out_path = os.path.join(work_dir, "output.bin")
+            write_random_file(raw_path, size)
+            encoder.encode_file_to_base64(raw_path, text_path, 76)
+
+            for label, func in (("naive", naive_decode),
+                                ("streaming", encoder.decode_file_from_base64),
+                                ("parallel", encoder.decode_file_parallel)):
+                # The naive decoder holds the text and the result at once (~2.4x the data size)
+                if func is naive_decode and memory and size * 2.4 > memory * 0.8:
+                    print(f"  {format_size(size):>5} {label:<10} skipped (needs ~{format_size(int(size * 2.4))} of RAM)")
+                    continue
+                elapsed, rss, ok = run_isolated(func, text_path, out_path)
+                rss_text = f"{rss:7.1f} MB" if rss is not None else "    n/a"
+                status = "" if ok and _same_file(raw_path, out_path) else utilities.color("  FAILED", "RED")
+                print(f"  {format_size(size):>5} {label:<10} {elapsed:8.2f} s  {size / elapsed / (1024 * 1024):8.1f} MB/s  "
+                      f"peak RSS {rss_text}{status}")
+                os.remove(out_path)
+            for path in (raw_path, text_path):
+                os.remove(path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _same_file(path_a, path_b, block_size=8 * 1024 * 1024):
+    with open(path_a, 'rb') as a, open(path_b, 'rb') as b:
+        while True:
+            block_a, block_b = a.read(block_size), b.read(block_size)
+            if block_a != block_b:
+                return False
+            if not block_a:
+                return True
+
+def bench_compress():
+    """Compares shutil.make_archive with the parallel ZIP writer on a synthetic tree."""
+    import shutil
+    import tempfile
+    import zipwriter
+
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_zip_")
+    try:
+        source_dir = os.path.join(work_dir, "tree")
+        total = make_synthetic_tree(source_dir)
+        print_header(f"compress ({format_size(total)} synthetic tree, many small files + a few large ones)")
+        zip_base = os.path.join(work_dir, "out")
+
+        start = time.perf_counter()
+        shutil.make_archive(zip_base, 'zip', source_dir)
+        baseline = time.perf_counter() - start
+        print(f"  shutil.make_archive  {baseline:7.2f} s  {total / baseline / (1024 * 1024):7.1f} MB/s  "
+              f"size {format_size(os.path.getsize(zip_base + '.zip'))}")
+
+        cpu_count = os.cpu_count() or 1
+        print(f"  ({cpu_count} CPU(s) available; speedup is capped by the core count)")
+        for workers in sorted({1, 2, 4, cpu_count}):
+            start = time.perf_counter()
+            zipwriter.write_zip_parallel(zipwriter.collect_members(source_dir), zip_base + '.zip', max_workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"  parallel workers={workers:<3} {elapsed:7.2f} s  {total / elapsed / (1024 * 1024):7.1f} MB/s  "
+                  f"size {format_size(os.path.getsize(zip_base + '.zip'))}  speedup x{baseline / elapsed:.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _legacy_download_extract(session, url, work_dir, package_id):
+    """The original write-to-disk-then-reopen flow, kept here as the comparison baseline."""
+    nupkg_path = os.path.join(work_dir, f"{package_id}.nupkg")
+    with session.get(url, stream=True) as response:
+        response.raise_for_status()
+        with open(nupkg_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                f.write(chunk)
+    with zipfile.ZipFile(nupkg_path, 'r') as zip_ref:
+        zip_ref.extractall(os.path.join(work_dir, package_id))
+    os.remove(nupkg_path)
+
+def bench_extract(sizes=("50K", "1M", "20M", "200M"), repeats=3):
+    """Per-package download+extract latency: legacy temp-file flow vs. spooled streaming."""
+    import shutil
+    import tempfile
+    import downloader
+
+    print_header("extract (per-package download + extract latency)")
+    packages = {f"Stub.Size{size}": make_fake_nupkg(f"Stub.Size{size}", utilities.parse_size(size)) for size in sizes}
+
+    with stub_feed.StubNuGetServer(packages) as server:
+        session = downloader.create_session(1)
+        for size in sizes:
+            package_id = f"Stub.Size{size}"
+            timings = {}
+            for label in ("legacy 8K", "spooled"):
+                best = None
+                for _ in range(repeats):
+                    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_extract_")
+                    start = time.perf_counter()
+                    with _Quiet():
+                        if label == "spooled":
+                            ok = downloader._download_single_package(session, package_id, work_dir, server.feed)
+                        else:
+                            _legacy_download_extract(session, server.package_url + package_id, work_dir, package_id)
+                            ok = True
+                    elapsed = time.perf_counter() - start
+                    shutil.rmtree(work_dir, ignore_errors=True)
+                    if not ok:
+                        raise RuntimeError(f"download of {package_id} failed")
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[label] = best
+            legacy, spooled = timings["legacy 8K"], timings["spooled"]
+            print(f"  {size:>5}  legacy {legacy * 1000:8.1f} ms   spooled {spooled * 1000:8.1f} ms   "
+                  f"x{legacy / spooled:.2f}")
+        session.close()
+
+def bench_resolve(node_count=200, latency=0.02):
+    """Resolves a synthetic dependency graph, comparing per-level concurrency with one worker."""
+    import resolver
+
+    print_header(f"resolve ({node_count}-node dependency graph, {latency * 1000:.0f} ms simulated latency)")
+    registrations = stub_feed.make_registration_graph(node_count)
+
+    with stub_feed.StubNuGetServer({}, latency=latency, registrations=registrations) as server:
+        for workers in (1, 16):
+            dep_resolver = resolver.DependencyResolver(feed=server.feed, max_workers=workers)
+            start = time.perf_counter()
+            closure = dep_resolver.resolve(["Graph.Node0"])
+            elapsed = time.perf_counter() - start
+            errors = sum(1 for deps in closure.values() if deps and deps[0].startswith("Error"))
+            print(f"  workers={workers:<3} {elapsed:7.3f} s  {len(closure)} package version(s)  "
+                  f"{dep_resolver.request_count} request(s)  {dep_resolver.round_trips} round trip(s)  errors={errors}")
+
+            start = time.perf_counter()
+            dep_resolver.resolve(["Graph.Node0"])
+            print(f"  workers={workers:<3} re-resolve with memoized metadata: {time.perf_counter() - start:7.3f} s  "
+                  f"{dep_resolver.request_count} request(s) total")
+
+def make_package_bundle(root, package_count=24, shared_count=6, shared_size=768 * 1024, unique_size=256 * 1024, seed=0):
+    """
+    Builds an extracted multi-package bundle in which packages ship the same
+    shared DLLs, license and icon (as real NuGet dependency sets do).
+
+    Returns:
+        int: Total bytes written.
+    """
+    rng = random.Random(seed)
+    shared = [rng.randbytes(shared_size) for _ in range(shared_count)]
+    license_text = make_text_block(4 * 1024, seed)
+    icon = rng.randbytes(16 * 1024)
+    total = 0
+    for index in range(package_count):
+        lib_dir = os.path.join(root, f"Bundle.Package{index}", "lib", "netstandard2.0")
+        os.makedirs(lib_dir)
+        files = {os.path.join(lib_dir, f"Bundle.Package{index}.dll"): rng.randbytes(unique_size),
+                 os.path.join(root, f"Bundle.Package{index}", "LICENSE.txt"): license_text,
+                 os.path.join(root, f"Bundle.Package{index}", "icon.png"): icon}
+        # Each package depends on a few of the shared libraries
+        for shared_index in rng.sample(range(shared_count), 3):
+            files[os.path.join(lib_dir, f"Shared.Library{shared_index}.dll")] = shared[shared_index]
+        for file_path, data in files.items():
+            with open(file_path, 'wb') as f:
+                f.write(data)
+            total += len(data)
+    return total
+
+def bench_dedup():
+    """Archives a multi-package bundle with and without deduplication, then restores it."""
+    import shutil
+    import tempfile
+    import archiver
+    import dedup
+    import zipwriter
+
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_dedup_")
+    try:
+        source_dir = os.path.join(work_dir, "bundle")
+        total = make_package_bundle(source_dir)
+        print_header(f"dedup ({format_size(total)} bundle of 24 packages sharing DLLs, licenses and icons)")
+
+        sizes = {}
+        for deduplicate in (False, True):
+            zip_path = os.path.join(work_dir, f"bundle_{deduplicate}.zip")
+            start = time.perf_counter()
+            with _Quiet():
+                archiver.write_zip_stream(source_dir, zip_path, deduplicate=deduplicate)
+            elapsed = time.perf_counter() - start
+            sizes[deduplicate] = os.path.getsize(zip_path)
+            print(f"  dedup={str(deduplicate):<5}  {elapsed:7.2f} s  archive {format_size(sizes[deduplicate])}")
+
+        kept, duplicates, stats = dedup.plan_dedup(zipwriter.collect_members(source_dir))
+        dedup.print_report(stats)
+        print(f"  archive size reduction: {(1 - sizes[True] / sizes[False]) * 100:.0f}% "
+              f"({len(duplicates)} duplicate file(s), {stats['hashed_files']} file(s) hashed)")
+
+        start = time.perf_counter()
+        dedup.restore_archive(zip_path)
+        elapsed = time.perf_counter() - start
+        with zipfile.ZipFile(zip_path) as zf:
+            bad = zf.testzip()
+            restored = sum(1 for info in zf.infolist() if not info.is_dir())
+        print(f"  restore      {elapsed:7.2f} s  {restored} file(s) after restore, "
+              f"size {format_size(os.path.getsize(zip_path))}, integrity {'OK' if bad is None else 'FAILED: ' + bad}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def make_nuget_bundle(root, package_count=16, dll_size=1536 * 1024, seed=0):
+    """
+    Builds an extracted NuGet bundle with the mix of content real packages ship:
+    assemblies (code mixed with string tables), XML docs, symbols, PNG icons and
+    nested .nupkg/.zip files, the last two already compressed.
+
+    Returns:
+        int: Total bytes written.
+    """
+    rng = random.Random(seed)
+    text = make_text_block(4 * 1024 * 1024, seed)
+    nested = make_fake_nupkg("Nested.Package", payload_size=512 * 1024, seed=seed)
+
+    def mixed(size):
+        # Alternating runs of random bytes and text deflate to roughly half, like a DLL
+        data = bytearray()
+        while len(data) < size:
+            data += rng.randbytes(2048)
+            offset = rng.randrange(len(text) - 2048)
+            data += text[offset:offset + 2048]
+        return bytes(data[:size])
+
+    total = 0
+    for index in range(package_count):
+        package_dir = os.path.join(root, f"Bundle.Package{index}")
+        lib_dir = os.path.join(package_dir, "lib", "net8.0")
+        os.makedirs(lib_dir)
+        offset = rng.randrange(len(text) - dll_size // 2)
+        files = {os.path.join(lib_dir, f"Bundle.Package{index}.dll"): mixed(dll_size),
+                 os.path.join(lib_dir, f"Bundle.Package{index}.pdb"): mixed(dll_size // 2),
+                 os.path.join(lib_dir, f"Bundle.Package{index}.xml"): text[offset:offset + dll_size // 2],
+                 os.path.join(package_dir, "icon.png"): rng.randbytes(64 * 1024),
+                 os.path.join(package_dir, f"bundle.package{index}.1.0.0.nupkg"): nested,
+                 os.path.join(package_dir, "tools", "payload.zip"): rng.randbytes(dll_size)}
+        os.makedirs(os.path.join(package_dir, "tools"))
+        for file_path, data in files.items():
+            with open(file_path, 'wb') as f:
+                f.write(data)
+            total += len(data)
+    return total
+
+def bench_policy():
+    """
+    Archives a NuGet bundle under every compression policy and reports time, size
+    and the trade-off against the legacy deflate-everything policy. Set
+    WHALE_PUUP_BENCH_BUNDLE to an extracted bundle folder to use real packages.
+    """
+    import shutil
+    import tempfile
+    import archiver
+    import compression
+
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_policy_")
+    try:
+        source_dir = os.environ.get("WHALE_PUUP_BENCH_BUNDLE")
+        if source_dir:
+            total = sum(os.path.getsize(os.path.join(d, f)) for d, _, names in os.walk(source_dir) for f in names)
+            print_header(f"policy ({format_size(total)} bundle at {source_dir})")
+        else:
+            source_dir = os.path.join(work_dir, "bundle")
+            total = make_nuget_bundle(source_dir)
+            print_header(f"policy ({format_size(total)} synthetic NuGet bundle: DLLs, docs, symbols, icons, nested packages)")
+
+        results = {}
+        for name in compression.POLICIES:
+            zip_path = os.path.join(work_dir, f"{name}.zip")
+            start = time.perf_counter()
+            archiver.write_zip_stream(source_dir, zip_path, max_workers=1, policy=name)
+            elapsed = time.perf_counter() - start
+            with zipfile.ZipFile(zip_path) as zf:
+                stored = sum(1 for info in zf.infolist() if not info.is_dir() and info.compress_type == zipfile.ZIP_STORED)
+            results[name] = (elapsed, os.path.getsize(zip_path), stored)
+            os.remove(zip_path)
+
+        base_time, base_size, _ = results["legacy"]
+        print("  (one worker, so times compare CPU cost per policy)")
+        for name, (elapsed, size, stored) in results.items():
+            print(f"  {name:<8} {elapsed:7.2f} s  {total / elapsed / (1024 * 1024):7.1f} MB/s  "
+                  f"size {format_size(size):>7} ({size / total * 100:5.1f}% of input, {stored:3d} stored)  "
+                  f"vs legacy: time {(elapsed / base_time - 1) * 100:+5.0f}%, size {(size / base_size - 1) * 100:+5.1f}%")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def bench_resume(package_size=150 * 1024 * 1024, cut_at=0.95):
+    """
+    Downloads a large package through a stub server that drops the connection at
+    95%, comparing bytes re-sent and time with and without retry/resume.
+    """
+    import shutil
+    import tempfile
+    import downloader
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        zf.writestr("Big.Package.nuspec", "<package><metadata><id>Big.Package</id><version>1.0.0</version></metadata></package>")
+        zf.writestr("lib/net8.0/Big.Package.dll", random.Random(0).randbytes(package_size))
+    body = buffer.getvalue()
+    cut = int(len(body) * cut_at)
+    fast_retry = downloader.DEFAULT_RETRY._replace(backoff_base=0.05, backoff_max=0.5)
+    no_retry = fast_retry._replace(max_attempts=1)
+    partial_dir = tempfile.mkdtemp(prefix="whale_puup_bench_partial_")
+    print_header(f"resume ({format_size(len(body))} package, connection dropped at {cut_at:.0%})")
+
+    def run(faults, retry, use_partials):
+        with stub_feed.StubNuGetServer({"Big.Package": body}, faults=faults) as stub, _Quiet():
+            start = time.perf_counter()
+            result = downloader.download_packages(["Big.Package"], feed=stub.feed, retry=retry,
+                                                  partial_dir=partial_dir if use_partials else None)
+            elapsed = time.perf_counter() - start
+            if result:
+                shutil.rmtree(result, ignore_errors=True)
+            return bool(result), elapsed, stub.bytes_sent
+
+    try:
+        scenarios = [
+            ("no fault", [({}, fast_retry, False)]),
+            ("fail, rerun from zero", [({"Big.Package": [("cut", cut)]}, no_retry, False), ({}, fast_retry, False)]),
+            ("retry + Range resume", [({"Big.Package": [("cut", cut)]}, fast_retry, False)]),
+            ("fail, rerun resumes", [({"Big.Package": [("cut", cut)]}, no_retry, True), ({}, fast_retry, True)]),
+        ]
+        for name, runs in scenarios:
+            outcomes = [run(*args) for args in runs]
+            seconds = sum(o[1] for o in outcomes)
+            sent = sum(o[2] for o in outcomes)
+            print(f"  {name:<22} {'ok' if outcomes[-1][0] else 'FAILED':<6} {seconds:7.2f} s  "
+                  f"sent {format_size(sent):>8} ({sent / len(body):.2f}x the package)")
+    finally:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+
+def make_multi_target_nupkg(package_id, frameworks=("net462", "netstandard2.0", "net6.0", "net8.0"),
+                            dll_size=1024 * 1024, seed=0):
+    """
+    Builds an in-memory .nupkg shaped like a real multi-targeted package: an
+    assembly, XML docs and symbols per framework, plus OPC metadata and a signature.
+
+    Returns:
+        bytes: The raw bytes of the .nupkg archive.
+    """
+    rng = random.Random(seed)
+    docs = make_text_block(dll_size // 2, seed)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{package_id}.nuspec", f"<package><metadata><id>{package_id}</id><version>1.0.0</version></metadata></package>")
+        zf.writestr("_rels/.rels", make_text_block(1024, seed))
+        zf.writestr("[Content_Types].xml", make_text_block(512, seed))
+        zf.writestr(f"package/services/metadata/core-properties/{rng.randrange(1 << 32):x}.psmdcp", make_text_block(1024, seed))
+        zf.writestr(".signature.p7s", rng.randbytes(9 * 1024))
+        for framework in frameworks:
+            zf.writestr(f"lib/{framework}/{package_id}.dll", rng.randbytes(dll_size // 2) + docs[:dll_size // 2])
+            zf.writestr(f"lib/{framework}/{package_id}.xml", docs)
+            zf.writestr(f"lib/{framework}/{package_id}.pdb", rng.randbytes(dll_size // 4))
+    return buffer.getvalue()
+
+def bench_filter(package_count=12):
+    """
+    Downloads, extracts and encodes multi-targeted packages with and without
+    framework filtering, comparing extracted bytes, Base64 size and time.
+    """
+    import shutil
+    import tempfile
+    import archiver
+    import downloader
+    import package_filter
+
+    packages = {f"Multi.Package{i}": make_multi_target_nupkg(f"Multi.Package{i}", seed=i) for i in range(package_count)}
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_filter_")
+    print_header(f"filter ({package_count} packages targeting net462, netstandard2.0, net6.0 and net8.0)")
+    variants = [
+        ("everything", None),
+        ("net8.0", package_filter.PackageFilter(["net8.0"])),
+        ("net8.0, stripped", package_filter.PackageFilter(["net8.0"], ["metadata", "signature", "symbols", "docs"])),
+    ]
+    try:
+        baseline = None
+        with stub_feed.StubNuGetServer(packages) as stub:
+            for name, extract_filter in variants:
+                recorder = metrics.start()
+                start = time.perf_counter()
+                with _Quiet():
+                    download_dir = downloader.download_packages(list(packages), feed=stub.feed,
+                                                                partial_dir=None, package_filter=extract_filter)
+                    _, base64_path = archiver.archive_and_encode_packages(download_dir, work_dir)
+                elapsed = time.perf_counter() - start
+                extracted = sum(r["bytes"] for r in recorder.records if r["stage"] == "extract")
+                encode_seconds = sum(r["seconds"] for r in recorder.records if r["stage"] == "archive+encode")
+                base64_size = os.path.getsize(base64_path)
+                baseline = baseline or base64_size
+                print(f"  {name:<18} extracted {format_size(extracted):>8}  Base64 {format_size(base64_size):>8} "
+                      f"({base64_size / baseline * 100:5.1f}%)  archive+encode {encode_seconds:6.2f} s  total {elapsed:6.2f} s")
+                shutil.rmtree(download_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def make_many_file_nupkg(package_id, file_count=600, file_size=6 * 1024, seed=0):
+    """Builds an in-memory .nupkg of many small, compressible files (content, build props, resources)."""
+    text = make_text_block(file_size * 4, seed)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{package_id}.nuspec", f"<package><metadata><id>{package_id}</id><version>1.0.0</version></metadata></package>")
+        for i in range(file_count):
+            start = (i * 977) % (len(text) - file_size)
+            zf.writestr(f"content/folder{i % 20}/file{i}.txt", f"{package_id} {i}\n".encode() + text[start:start + file_size])
+    return buffer.getvalue()
+
+def bench_repack(package_count=10, file_count=600):
+    """
+    NuGet-mode archiving of many-file packages: extract to a temp tree, archive it
+    and delete it (the old path) vs. copying members straight from each .nupkg.
+    """
+    import shutil
+    import tempfile
+    import archiver
+    import downloader
+
+    packages = {f"Many.Files{i}": make_many_file_nupkg(f"Many.Files{i}", file_count, seed=i) for i in range(package_count)}
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_repack_")
+    print_header(f"repack ({package_count} packages x {file_count} files)")
+    print(f"  {'path':<18} {'download':>9} {'archive':>9} {'cleanup':>9} {'total':>9} {'temp files':>11} {'Base64':>9}")
+    try:
+        with stub_feed.StubNuGetServer(packages) as stub:
+            for name, repack_packages in (("extract+archive", False), ("repack", True)):
+                with _Quiet():
+                    start = time.perf_counter()
+                    download_dir = downloader.download_packages(list(packages), feed=stub.feed,
+                                                                partial_dir=None, extract=not repack_packages)
+                    downloaded = time.perf_counter()
+                    temp_files = sum(len(files) for _, _, files in os.walk(download_dir))
+                    _, base64_path = archiver.archive_and_encode_packages(download_dir, work_dir,
+                                                                          repack_packages=repack_packages)
+                    archived = time.perf_counter()
+                    shutil.rmtree(download_dir)
+                    finished = time.perf_counter()
+                print(f"  {name:<18} {downloaded - start:8.2f}s {archived - downloaded:8.2f}s {finished - archived:8.2f}s "
+                      f"{finished - start:8.2f}s {temp_files:11d} {format_size(os.path.getsize(base64_path)):>9}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def bench_pipeline(package_count=16, dll_size=1536 * 1024, bandwidth=6 * 1024 * 1024, workers=4):
+    """
+    End-to-end NuGet mode over a throttled feed: every download finishing before
+    archiving starts (sequential) vs. repacking and encoding while later packages
+    are still downloading (pipelined).
+    """
+    import shutil
+    import tempfile
+    import archiver
+    import downloader
+    import pipeline
+
+    packages = {f"Pipeline.Package{i}": make_multi_target_nupkg(f"Pipeline.Package{i}", dll_size=dll_size, seed=i)
+                for i in range(package_count)}
+    total = sum(len(data) for data in packages.values())
+    work_dir = tempfile.mkdtemp(prefix="whale_puup_bench_pipeline_")
+    print_header(f"pipeline ({package_count} packages, {format_size(total)}, {workers} connections "
+                 f"at {format_size(bandwidth)}/s each)")
+    try:
+        with stub_feed.StubNuGetServer(packages, latency=0.02, bandwidth=bandwidth) as stub:
+            for policy in ("default", "bzip2"):
+                timings = {}
+                for name in ("sequential", "pipelined"):
+                    download_dir = tempfile.mkdtemp(prefix="whale_puup_")
+                    start = time.perf_counter()
+                    with _Quiet():
+                        if name == "sequential":
+                            shutil.rmtree(download_dir)
+                            download_dir = downloader.download_packages(list(packages), workers, feed=stub.feed,
+                                                                        partial_dir=None, extract=False)
+                            archiver.archive_and_encode_packages(download_dir, work_dir, compression_policy=policy,
+                                                                 repack_packages=True)
+                        else:
+                            pipeline.archive_packages_pipelined(list(packages), download_dir, work_dir, workers,
+                                                                feed=stub.feed, compression_policy=policy,
+                                                                partial_dir=None)
+                    timings[name] = time.perf_counter() - start
+                    shutil.rmtree(download_dir)
+                gain = (1 - timings["pipelined"] / timings["sequential"]) * 100
+                print(f"  {policy:<8} sequential {timings['sequential']:6.2f} s  pipelined {timings['pipelined']:6.2f} s  "
+                      f"({gain:4.1f}% less end-to-end time)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def bench_collect(package_count=2000, package_size=48 * 1024):
+    """
+    archiver.extract_nupkg_packages over a temp_downloads-style tree: one copy at a
+    time with a line per package (as before), pooled copies, and links.
+    """
+    import shutil
+    import tempfile
+    import archiver
+
+    root = tempfile.mkdtemp(prefix="whale_puup_bench_collect_")
+    source = os.path.join(root, "temp_downloads")
+    payload = os.urandom(package_size)
+    for i in range(package_count):
+        folder = os.path.join(source, f"Collect.Package{i}")
+        os.makedirs(folder)
+        with open(os.path.join(folder, f"Collect.Package{i}.nupkg"), "wb") as f:
+            f.write(payload)
+    print_header(f"collect ({package_count} packages x {format_size(package_size)})")
+    try:
+        for name, link_mode, workers, verbose in (("copy, 1 thread", "copy", 1, True),
+                                                  (f"copy, {archiver.COPY_WORKERS} threads", "copy", archiver.COPY_WORKERS, False),
+                                                  ("link", "auto", archiver.COPY_WORKERS, False)):
+            destination = os.path.join(root, "collected")
+            with _Quiet():
+                start = time.perf_counter()
+                archiver.extract_nupkg_packages(source, destination, link_mode, workers, verbose)
+                elapsed = time.perf_counter() - start
+            shutil.rmtree(destination)
+            print(f"  {name:<18} {elapsed:7.2f} s  {package_count / elapsed:8.0f} files/s  "
+                  f"{format_size(package_count * package_size / elapsed)}/s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def make_feed_folder(root, package_count=40, versions_per_package=3, dll_size=128 * 1024, seed=0):
+    """
+    Writes a folder feed of 'Feed.Package<i>' packages in several versions, each
+    depending on the next package. Even-numbered packages use the hierarchical
+    layout 'nuget add' writes (with .sha512 files), the rest sit side by side.
+
+    Returns:
+        list: The package IDs.
+    """
+    rng = random.Random(seed)
+    package_ids = [f"Feed.Package{i}" for i in range(package_count)]
+    for i, package_id in enumerate(package_ids):
+        for minor in range(versions_per_package):
+            version = f"1.{minor}.0"
+            dependency = (f'<group targetFramework="net8.0"><dependency id="{package_ids[i + 1]}" version="1.0.0" /></group>'
+                          if i + 1 < package_count else "")
+            nuspec = (f'<?xml version="1.0" encoding="utf-8"?><package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd">'
+                      f'<metadata><id>{package_id}</id><version>{version}</version>'
+                      f'<dependencies>{dependency}</dependencies></metadata></package>')
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr(f"{package_id}.nuspec", nuspec)
+                zf.writestr(f"lib/net8.0/{package_id}.dll", rng.randbytes(dll_size))
+            data = buffer.getvalue()
+            if i % 2 == 0:
+                folder = os.path.join(root, package_id.lower(), version)
+                os.makedirs(folder, exist_ok=True)
+                stem = os.path.join(folder, f"{package_id.lower()}.{version}")
+                with open(stem + ".nupkg.sha512", 'w') as f:
+                    f.write(base64.b64encode(hashlib.sha512(data).digest()).decode())
+            else:
+                stem = os.path.join(root, f"{package_id}.{version}")
+            with open(stem + ".nupkg", 'wb') as f:
+                f.write(data)
+    return package_ids
+
+def bench_feed(package_count=40, latency=0.02, repeats=3):
+    """
+    Full NuGet mode (resolve, download, verify, repack, encode) offline: from a
+    folder feed read straight from disk, and from the same packages served as a v3
+    feed by LocalFeedServer, first with an empty metadata cache and then with a
+    warm one whose unchanged indexes are revalidated with If-None-Match. Times are
+    the best of repeats runs; request counts are per run.
+    """
+    import shutil
+    import tempfile
+    import feeds
+    import jobs
+
+    root = tempfile.mkdtemp(prefix="whale_puup_bench_feed_")
+    folder = os.path.join(root, "feed")
+    package_ids = make_feed_folder(folder, package_count)
+    metadata_dir = os.path.join(root, "metadata")
+    print_header(f"feed ({package_count} packages, full NuGet mode, {latency * 1000:.0f} ms simulated latency)")
+    try:
+        with LocalFeedServer(folder, latency=latency) as server:
+            for name, source, cold in (("folder", folder, False), ("v3, cold metadata", server.service_index_url, True),
+                                       ("v3, warm metadata", server.service_index_url, False)):
+                best = None
+                for _ in range(repeats):
+                    if cold:
+                        shutil.rmtree(metadata_dir, ignore_errors=True)
+                    requests_before, not_modified_before = server.request_count, server.not_modified
+                    metadata_before = server.metadata_bytes_sent
+                    context = jobs.JobContext(use_cache=False, feed=source,
+                                              metadata_cache=feeds.MetadataCache(metadata_dir))
+                    start = time.perf_counter()
+                    with _Quiet():
+                        try:
+                            jobs.run_nuget_job(package_ids, os.path.join(root, "out"), context)
+                        finally:
+                            context.close()
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                print(f"  {name:<18} {best:7.2f} s  {server.request_count - requests_before:4d} request(s)  "
+                      f"{server.not_modified - not_modified_before:4d} x 304  "
+                      f"{(server.metadata_bytes_sent - metadata_before) / 1024:7.0f} KB metadata sent")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def make_scan_tree(root, project_count=20, source_files=40, package_files=600, seed=0):
+    """
+    Writes a folder shaped like a working copy: per project, source files plus
+    bin/ and obj/ build output, and at the root a .git folder and a node_modules
+    tree of many small files (the folders scanner.DEFAULT_EXCLUDES leaves out).
+
+    Returns:
+        int: The number of files written.
+    """
+    rng = random.Random(seed)
+    text = make_text_block(64 * 1024, seed)
+    written = 0
+
+    def write(path, data):
+        nonlocal written
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        written += 1
+
+    for p in range(project_count):
+        project = os.path.join(root, f"src/Project{p}")
+        for i in range(source_files):
+            start = rng.randrange(len(text) - 4096)
+            write(os.path.join(project, f"Folder{i % 5}/Class{i}.cs"), text[start:start + rng.randint(512, 4096)])
+        for build in ("bin/Debug/net8.0", "obj/Debug/net8.0"):
+            for i in range(8):
+                write(os.path.join(project, build, f"Project{p}.{i}.dll"), rng.randbytes(32 * 1024))
+    for i in range(package_files * project_count // 4):
+        write(os.path.join(root, f"node_modules/pkg{i % 200}/lib/file{i}.js"), text[:rng.randint(256, 2048)])
+    for i in range(package_files):
+        write(os.path.join(root, f".git/objects/{i % 256:02x}/{i:038x}"), rng.randbytes(1024))
+    return written
+
+def bench_scan(project_count=20, repeats=3):
+    """
+    Folder-mode listing and archiving of a working-copy tree: os.walk (as
+    zipwriter.collect_members lists) vs. the parallel scandir scanner with 1 and
+    8 threads, without rules and with the default excludes pruning .git, bin, obj
+    and node_modules; then a full archive+encode with and without the excludes.
+    Times are the best of repeats runs.
+    """
+    import shutil
+    import tempfile
+    import archiver
+    import scanner
+    import zipwriter
+
+    root = tempfile.mkdtemp(prefix="whale_puup_bench_scan_")
+    source = os.path.join(root, "tree")
+    file_count = make_scan_tree(source, project_count)
+    rules = scanner.ScanRules(scanner.DEFAULT_EXCLUDES)
+    print_header(f"scan ({file_count} files: {project_count} projects with bin/obj, .git and node_modules)")
+
+    def best_of(func):
+        best = result = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    try:
+        for name, lister in (("os.walk", lambda: zipwriter.collect_members(source)),
+                             ("scandir, 1 thread", lambda: scanner.scan_tree(source, max_workers=1)[0]),
+                             ("scandir, 8 threads", lambda: scanner.scan_tree(source, max_workers=8)[0]),
+                             ("scandir + excludes", lambda: scanner.scan_tree(source, rules)[0])):
+            seconds, members = best_of(lister)
+            print(f"  {name:<20} {seconds * 1000:8.1f} ms  {sum(1 for m in members if not m.is_dir):6d} file(s)  "
+                  f"{format_size(sum(m.size for m in members)):>9}")
+        out = os.path.join(root, "out")
+        baseline = None
+        for name, scan_rules in (("archive everything", None), ("archive + excludes", rules)):
+            os.makedirs(out, exist_ok=True)
+            with _Quiet():
+                seconds, (_, base64_path) = best_of(lambda: archiver.archive_and_encode_packages(
+                    source, out, scan_rules=scan_rules))
+            size = os.path.getsize(base64_path)
+            baseline = baseline or size
+            print(f"  {name:<20} {seconds:8.2f} s   Base64 {format_size(size):>9} ({size / baseline * 100:5.1f}%)")
+            shutil.rmtree(out, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def bench_browse(member_count=200, member_size=1024 * 1024):
+    """
+    Getting one DLL back out of an encoded bundle: decoding the whole archive and
+    opening the ZIP (what decode mode does) vs. random access through
+    browse.EncodedArchive, which decodes only the central directory and the member.
+    Reports the encoded text each path reads.
+    """
+    import shutil
+    import tempfile
+    import archiver
+    import browse
+    import encoder
+
+    root = tempfile.mkdtemp(prefix="whale_puup_bench_browse_")
+    source = os.path.join(root, "bundle")
+    rng = random.Random(0)
+    for i in range(member_count):
+        folder = os.path.join(source, f"Bundle.Package{i}", "lib", "net8.0")
+        os.makedirs(folder)
+        with open(os.path.join(folder, f"Bundle.Package{i}.dll"), 'wb') as f:
+            f.write(rng.randbytes(member_size))
+    wanted = f"Bundle.Package{member_count // 2}/lib/net8.0/Bundle.Package{member_count // 2}.dll"
+    try:
+        with _Quiet():
+            _, base64_path = archiver.archive_and_encode_packages(source, root)
+        input_size = os.path.getsize(base64_path)
+        print_header(f"browse (one {format_size(member_size)} member of a {format_size(input_size)} Base64 bundle)")
+
+        start = time.perf_counter()
+        zip_path = os.path.join(root, "decoded.zip")
+        with _Quiet():
+            encoder.decode_file_parallel(base64_path, zip_path)
+        with zipfile.ZipFile(zip_path) as zf:
+            data = zf.read(wanted)
+        elapsed = time.perf_counter() - start
+        print(f"  {'full decode':<16} {elapsed:7.3f} s  read {format_size(input_size):>9} of text")
+
+        start = time.perf_counter()
+        with browse.EncodedArchive(base64_path) as archive:
+            written, _ = archive.extract(archive.select([wanted]), os.path.join(root, "members"))
+            text_read = archive.text_bytes_read
+        elapsed = time.perf_counter() - start
+        with open(written[0], 'rb') as f:
+            assert f.read() == data
+        print(f"  {'random access':<16} {elapsed:7.3f} s  read {format_size(text_read):>9} of text")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# What a process has to load before each mode can start working: 'main' for the
+# menu, plus the modules jobs.py imports in that mode's entry point.
+STARTUP_MODES = {
+    "menu": "import main",
+    "nuget": "import main, jobs, archiver, downloader, resolver, cache",
+    "folder": "import main, jobs, archiver",
+    "decode": "import main, jobs, dedup, encoder, integrity, volumes",
+}
+
+def _startup_seconds(command, pycache_prefix=None):
+    """Runs command in a fresh process and returns its wall-clock seconds."""
+    import subprocess
+    options = ["-X", f"pycache_prefix={pycache_prefix}"] if pycache_prefix else []
+    start = time.perf_counter()
+    subprocess.run(command[:1] + options + command[1:], cwd=os.path.dirname(os.path.abspath(__file__)),
+                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+def bench_startup(repeats=7):
+    """
+    Process start-up time per mode. Cold runs get an empty bytecode cache, so every
+    module (standard library and requests included) is compiled from source, as on
+    the first run after an install; the OS file cache stays warm. Warm runs reuse
+    the cache. Set WHALE_PUUP_BENCH_EXE to a built whale-puup executable to time
+    its start-up too (its first run counts as cold).
+    """
+    import shutil
+    import tempfile
+    import statistics
+
+    print_header(f"startup (median of {repeats} runs)")
+    print(f"  {'mode':<8} {'cold':>9} {'warm':>9}")
+    for mode, statement in STARTUP_MODES.items():
+        command = [sys.executable, "-c", statement]
+        cold = []
+        for _ in range(max(1, repeats // 2)):
+            prefix = tempfile.mkdtemp(prefix="whale_puup_bench_pycache_")
+            try:
+                cold.append(_startup_seconds(command, prefix))
+            finally:
+                shutil.rmtree(prefix, ignore_errors=True)
+        _startup_seconds(command)
+        warm = [_startup_seconds(command) for _ in range(repeats)]
+        print(f"  {mode:<8} {statistics.median(cold) * 1000:7.1f}ms {statistics.median(warm) * 1000:7.1f}ms")
+
+    exe_path = os.environ.get("WHALE_PUUP_BENCH_EXE")
+    if exe_path:
+        command = [exe_path, "--help"]
+        cold = _startup_seconds(command)
+        warm = [_startup_seconds(command) for _ in range(repeats)]
+        print(f"  {'exe':<8} {cold * 1000:7.1f}ms {statistics.median(warm) * 1000:7.1f}ms  ({exe_path} --help)")
+
+BENCHMARKS = {
+    "download": bench_download,
+    "cache": bench_cache,
+    "codec": bench_codec,
+    "codecs": bench_codecs,
+    "decode": bench_decode,
+    "compress": bench_compress,
+    "extract": bench_extract,
+    "resolve": bench_resolve,
+    "dedup": bench_dedup,
+    "policy": bench_policy,
+    "resume": bench_resume,
+    "filter": bench_filter,
+    "startup": bench_startup,
+    "repack": bench_repack,
+    "pipeline": bench_pipeline,
+    "collect": bench_collect,
+    "feed": bench_feed,
+    "scan": bench_scan,
+    "browse": bench_browse,
+}
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(utilities.color(f"Unknown benchmark '{name}'. Choose from: {', '.join(BENCHMARKS)}", "RED"))
+            return 1
+    for name in names:
+        BENCHMARKS[name]()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,187 @@
+# ==============================================================================
+# WHALE-PUUP Browse Module (browse.py)
+# Lists and extracts single members of an encoded archive (a .base64.txt file
+# or a split set) without decoding the whole archive. zipfile reads the archive
+# through a file object that decodes on demand (encoder.EncodedReader): it finds
+# the central directory at the end of the text, then seeks straight to each
+# wanted member, so only the tail and the members asked for are ever decoded.
+# ==============================================================================
+
+import io
+import os
+import json
+import fnmatch
+import shutil
+import zipfile
+import collections
+import dedup
+import encoder
+import utilities
+import volumes
+
+# --- Configuration ---
+# Decoded bytes buffered per read from the text. zipfile reads headers a few
+# bytes at a time, and every refill costs a seek into the text.
+READ_BUFFER_SIZE = 64 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# One logical member. Deduplicated copies share their blob (the ZipInfo that
+# holds the data) with the first copy.
+Entry = collections.namedtuple("Entry", ["arcname", "size", "compress_size", "date_time", "is_dir", "blob"])
+
+def _target_path(output_dir, arcname):
+    """Returns where a member is extracted to, with drive, empty, '.' and '..' parts dropped (as ZipFile.extract does)."""
+    parts = [part for part in os.path.splitdrive(arcname)[1].replace('\\', '/').split('/')
+             if part not in ('', '.', '..')]
+    return os.path.join(output_dir, *parts) if parts else None
+
+def _matches(arcname, pattern):
+    """A member matches its exact name, a glob ('*' spans folders), or a folder above it."""
+    pattern = pattern.replace('\\', '/')
+    return (arcname == pattern or fnmatch.fnmatchcase(arcname, pattern)
+            or arcname.startswith(pattern.rstrip('/') + '/'))
+
+class EncodedArchive:
+    """
+    An encoded archive opened for random access. Opening it decodes only the end
+    of central directory record and the central directory; members are decoded
+    when they are extracted. Deduplicated archives list and extract every copy,
+    as if dedup.restore_archive had run.
+    """
+
+    def __init__(self, input_path):
+        """
+        Args:
+            input_path (str or list): A .base64.txt file; for split output, any one
+                                      part, a folder of parts, or a list of part files.
+
+        Raises:
+            ValueError: If a split set is incomplete, the text cannot be read at
+                        random (irregular line wrapping), or the dedup index is unusable.
+            zipfile.BadZipFile: If the decoded data is not a ZIP archive.
+        """
+        input_paths = [input_path] if isinstance(input_path, str) else list(input_path)
+        if len(input_paths) > 1 or os.path.isdir(input_paths[0]) or volumes.is_part_file(input_paths[0]):
+            part_paths = input_paths if len(input_paths) > 1 else volumes.find_parts(input_paths[0])
+            self._raw = volumes.PartSetReader(part_paths)
+            self.input_size = sum(os.path.getsize(path) for path in part_paths)
+        else:
+            self._raw = encoder.EncodedReader(input_paths[0])
+            self.input_size = os.path.getsize(input_paths[0])
+        try:
+            self.zip = zipfile.ZipFile(io.BufferedReader(self._raw, READ_BUFFER_SIZE))
+            self._duplicates = self._read_dedup_index()
+        except BaseException:
+            self._raw.close()
+            raise
+
+    def _read_dedup_index(self):
+        """Returns {copy arcname: blob arcname} from the dedup index, or {} if there is none."""
+        if dedup.INDEX_ARCNAME not in self.zip.NameToInfo:
+            return {}
+        index = json.loads(self.zip.read(dedup.INDEX_ARCNAME).decode('utf-8'))
+        if index.get("version") != dedup.INDEX_VERSION:
+            raise ValueError(f"Unsupported dedup index version: {index.get('version')}")
+        missing = [blob for blob in index["files"].values() if blob not in self.zip.NameToInfo]
+        if missing:
+            raise ValueError(f"Dedup index refers to a missing blob: {missing[0]}")
+        return index["files"]
+
+    @property
+    def text_bytes_read(self):
+        """Bytes of encoded text read so far."""
+        return self._raw.text_bytes_read
+
+    @property
+    def archive_size(self):
+        """Size of the decoded archive."""
+        return self._raw.size
+
+    def entries(self):
+        """
+        Lists every logical member in archive order, each deduplicated copy right
+        after its blob, without the dedup index.
+
+        Returns:
+            list[Entry]: The members.
+        """
+        dependents = {}
+        for arcname, blob in self._duplicates.items():
+            dependents.setdefault(blob, []).append(arcname)
+        entries = []
+        for info in self.zip.infolist():
+            if info.filename == dedup.INDEX_ARCNAME:
+                continue
+            for arcname in [info.filename] + dependents.get(info.filename, []):
+                entries.append(Entry(arcname, info.file_size, info.compress_size, info.date_time, info.is_dir(), info))
+        return entries
+
+    def select(self, patterns):
+        """
+        Returns the entries matching any of patterns: exact member names, globs
+        ('lib/*/Foo.dll'; '*' also spans folders) or folders ('Newtonsoft.Json/').
+
+        Raises:
+            ValueError: If a pattern matches no member.
+        """
+        entries = self.entries()
+        for pattern in patterns:
+            if not any(_matches(entry.arcname, pattern) for entry in entries):
+                raise ValueError(f"No member of the archive matches '{pattern}'")
+        return [entry for entry in entries if any(_matches(entry.arcname, pattern) for pattern in patterns)]
+
+    def extract(self, entries, output_dir):
+        """
+        Extracts entries under output_dir, decoding only their bytes. Each member's
+        CRC-32 is checked as it is read; a file that fails is removed.
+
+        Args:
+            entries (list[Entry]): Members to extract, e.g. from select.
+            output_dir (str): Folder the member paths are recreated under.
+
+        Returns:
+            tuple (list, int): The paths written (files only) and their total size.
+        """
+        written = []
+        total = 0
+        for entry in entries:
+            target = _target_path(output_dir, entry.arcname)
+            if target is None:
+                continue
+            if entry.is_dir:
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                with self.zip.open(entry.blob) as source, open(target, 'wb') as out:
+                    shutil.copyfileobj(source, out, COPY_CHUNK_SIZE)
+            except BaseException:
+                if os.path.exists(target):
+                    os.remove(target)
+                raise
+            written.append(target)
+            total += entry.size
+        return written, total
+
+    def close(self):
+        self.zip.close()
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def print_listing(archive, entries=None):
+    """Prints a size / compressed / date / name table of the archive's members and a total line."""
+    entries = archive.entries() if entries is None else entries
+    print(f"{'Size':>12} {'Compressed':>12}  {'Modified':<16}  Name")
+    for entry in entries:
+        modified = "%04d-%02d-%02d %02d:%02d" % entry.date_time[:5]
+        copy = " (dedup copy)" if entry.arcname != entry.blob.filename else ""
+        print(f"{entry.size:>12} {entry.compress_size:>12}  {modified:<16}  {entry.arcname}{copy}")
+    files = [entry for entry in entries if not entry.is_dir]
+    print(utilities.color(f"[BROWSE] {len(files)} file(s), {sum(e.size for e in files) / (1024 * 1024):.1f} MB; "
+                          f"read {archive.text_bytes_read / (1024 * 1024):.2f} MB of "
+                          f"{archive.input_size / (1024 * 1024):.1f} MB of encoded text.", "BLUE"))
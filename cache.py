@@ -0,0 +1,231 @@
+# ==============================================================================
+# WHALE-PUUP Package Cache Module (cache.py)
+# Persistent, content-addressed on-disk cache for downloaded .nupkg files.
+# ==============================================================================
+
+import os
+import json
+import time
+import shutil
+import threading
+import utilities
+
+# --- Configuration ---
+# Cache location can be overridden with the WHALE_PUUP_CACHE_DIR environment variable.
+DEFAULT_CACHE_DIR = os.environ.get(
+    "WHALE_PUUP_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".whale_puup", "package_cache")
+)
+# Total size of cached blobs before least-recently-used entries are evicted.
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+# How long an unpinned ("latest") package ID keeps resolving to the version that was
+# last downloaded before the feed is asked again. Matches NuGet's own HTTP cache window.
+LATEST_ALIAS_TTL_SECONDS = 30 * 60
+
+INDEX_FILENAME = "index.json"
+LATEST = "latest"
+
+class PackageCache:
+    """
+    Content-addressed cache of .nupkg files.
+
+    Blobs are stored once under blobs/<sha512[:2]>/<sha512>.nupkg. A JSON index maps
+    "<id>/<version>" keys (lowercased, like NuGet's own layout) to the blob digest,
+    its size, when it was last used, and how long it originally took to download.
+    Unpinned requests are recorded as "<id>/latest" aliases with a short TTL.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES,
+                 latest_ttl=LATEST_ALIAS_TTL_SECONDS):
+        """
+        Args:
+            cache_dir (str): Root directory of the cache (created if missing).
+            max_bytes (int): Size limit for stored blobs; LRU entries are evicted past it.
+            latest_ttl (float): Seconds an unpinned package ID may be served from cache.
+        """
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, INDEX_FILENAME)
+        self.max_bytes = max_bytes
+        self.latest_ttl = latest_ttl
+
+        # --- Counters for the current run ---
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.seconds_saved = 0.0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._dirty = False # Access times changed since the index was last written
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    # --- Index persistence ---
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            index.setdefault("packages", {})
+            index.setdefault("blobs", {})
+            return index
+        except (FileNotFoundError, ValueError):
+            return {"packages": {}, "blobs": {}}
+
+    def _save_index(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(temp_path, self.index_path)
+        self._dirty = False
+
+    @staticmethod
+    def _key(package_id, version):
+        return f"{package_id.lower()}/{(version or LATEST).lower()}"
+
+    def _blob_path(self, sha512):
+        return os.path.join(self.blob_dir, sha512[:2], f"{sha512}.nupkg")
+
+    @staticmethod
+    def blob_digest(blob_path):
+        """Returns the hex SHA-512 of a blob returned by lookup (blobs are named by it)."""
+        return os.path.basename(blob_path).split('.')[0]
+
+    # --- Public API ---
+
+    def lookup(self, package_id, version=None):
+        """
+        Finds a cached .nupkg without touching the network. The hit's access time is
+        only written to the index by the next store or flush, not once per lookup.
+
+        Args:
+            package_id (str): The NuGet package ID.
+            version (str, optional): A pinned version, or None for the latest alias.
+
+        Returns:
+            str or None: Path to the cached blob on a hit, or None on a miss.
+        """
+        with self._lock:
+            entry = self._index["packages"].get(self._key(package_id, version))
+            blob = self._index["blobs"].get(entry["sha512"]) if entry else None
+            now = time.time()
+
+            fresh = entry is not None and (version or now - entry["stored"] <= self.latest_ttl)
+            blob_path = self._blob_path(entry["sha512"]) if blob else None
+
+            if not fresh or blob_path is None or not os.path.isfile(blob_path):
+                self.misses += 1
+                return None
+
+            blob["last_access"] = now
+            self.hits += 1
+            self.bytes_saved += blob["size"]
+            self.seconds_saved += blob.get("download_seconds", 0.0)
+            self._dirty = True
+            return blob_path
+
+    def store(self, package_id, version, resolved_version, fileobj, sha512, download_seconds=0.0):
+        """
+        Writes a freshly downloaded .nupkg into the cache and indexes it.
+
+        Args:
+            package_id (str): The NuGet package ID.
+            version (str or None): The version that was requested (None for latest).
+            resolved_version (str or None): The version read from the package's nuspec.
+            fileobj: Seekable binary file object holding the package bytes.
+            sha512 (str): Hex SHA-512 of the package, computed while it was received.
+            download_seconds (float): How long the download took, for time-saved stats.
+
+        Returns:
+            str: Path of the cached blob.
+        """
+        blob_path = self._blob_path(sha512)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+
+        # Identical content may already be stored
+        if sha512 not in self._index["blobs"] or not os.path.isfile(blob_path):
+            temp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            fileobj.seek(0)
+            with open(temp_path, 'wb') as f:
+                shutil.copyfileobj(fileobj, f, 1024 * 1024)
+            os.replace(temp_path, blob_path)
+        size = os.path.getsize(blob_path)
+
+        with self._lock:
+            now = time.time()
+            self._index["blobs"][sha512] = {
+                "size": size,
+                "last_access": now,
+                "download_seconds": download_seconds,
+            }
+            entry = {"sha512": sha512, "stored": now}
+            self._index["packages"][self._key(package_id, version)] = entry
+            if resolved_version:
+                self._index["packages"][self._key(package_id, resolved_version)] = dict(entry)
+
+            self._evict(keep=sha512)
+            self._save_index()
+        return blob_path
+
+    def discard(self, blob_path):
+        """
+        Drops a blob that lookup returned but that turned out to be damaged (or not
+        the published package), with every index entry that points at it. The
+        lookup that returned it is counted as a miss.
+        """
+        sha512 = self.blob_digest(blob_path)
+        with self._lock:
+            blob = self._index["blobs"].pop(sha512, None)
+            if blob is not None:
+                self.hits -= 1
+                self.misses += 1
+                self.bytes_saved -= blob["size"]
+                self.seconds_saved -= blob.get("download_seconds", 0.0)
+            packages = self._index["packages"]
+            for key in [k for k, e in packages.items() if e["sha512"] == sha512]:
+                del packages[key]
+            try:
+                os.remove(blob_path)
+            except OSError:
+                pass # Already gone, or in use; store writes it again either way
+            self._save_index()
+
+    def _evict(self, keep=None):
+        """Removes least-recently-used blobs until the cache fits in max_bytes. Caller holds the lock."""
+        blobs = self._index["blobs"]
+        total = sum(b["size"] for b in blobs.values())
+        for sha512 in sorted(blobs, key=lambda s: blobs[s]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if sha512 == keep:
+                continue
+            try:
+                os.remove(self._blob_path(sha512))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue # Blob is in use (e.g. open on Windows); try the next one
+            total -= blobs.pop(sha512)["size"]
+            self.evictions += 1
+
+        # Drop index entries whose blob is gone
+        packages = self._index["packages"]
+        for key in [k for k, e in packages.items() if e["sha512"] not in blobs]:
+            del packages[key]
+
+    def flush(self):
+        """Writes the index if lookups have changed it since it was last written."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def report(self):
+        """Prints the hit/miss/bytes-saved counters for this run and flushes the index."""
+        self.flush()
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        print(utilities.color(
+            f"[CACHE] {self.hits} hit(s), {self.misses} miss(es) ({hit_rate:.0f}% hit rate), "
+            f"{self.bytes_saved / (1024 * 1024):.1f} MB and ~{self.seconds_saved:.1f} s of download saved, "
+            f"{self.evictions} eviction(s).", "BLUE"))
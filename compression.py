@@ -0,0 +1,145 @@
+# ==============================================================================
+# WHALE-PUUP Compression Policy Module (compression.py)
+# Decides, file by file, how each archive member is compressed: which method,
+# at which level, and whether to skip compression for content that will not
+# shrink (packages, images, archives) so no CPU is spent on it.
+# ==============================================================================
+
+import os
+import zlib
+import zipfile
+
+# --- Configuration ---
+# Extensions whose content is already compressed. Members with these are stored.
+# .dll/.exe are not listed: managed assemblies usually deflate to about half.
+INCOMPRESSIBLE_EXTENSIONS = frozenset({
+    ".nupkg", ".snupkg", ".zip", ".jar", ".apk", ".vsix", ".whl", ".cab", ".msi",
+    ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst", ".br", ".lz4",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico",
+    ".mp3", ".mp4", ".m4a", ".ogg", ".webm", ".woff", ".woff2",
+})
+# Bytes read from the start of a file to estimate how well it compresses.
+SAMPLE_SIZE = 64 * 1024
+# Files whose sample deflates to more than this fraction of its size are stored.
+SAMPLE_MAX_RATIO = 0.92
+# Files smaller than this are always compressed (the sample would be the whole file).
+SAMPLE_MIN_FILE_SIZE = 2 * SAMPLE_SIZE
+
+METHODS = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+class CompressionPolicy:
+    """
+    Chooses the ZIP compression method and level for each member.
+
+    Policies are plain picklable objects, because the choice is made in the
+    compression worker processes, where the file is read anyway.
+    """
+
+    def __init__(self, method="deflate", level=None, store_extensions=INCOMPRESSIBLE_EXTENSIONS,
+                 sample=True, store_if_larger=True):
+        """
+        Args:
+            method (str): 'deflate', 'bzip2', 'lzma' or 'store' (a key of METHODS).
+            level (int, optional): Compression level for the method (zlib 0-9, bzip2
+                                   1-9); None uses the method's default. LZMA members
+                                   always use zipfile's default settings.
+            store_extensions (iterable): Lowercase extensions (with dot) always stored.
+            sample (bool): Deflate the first SAMPLE_SIZE bytes of larger files at
+                           level 1 and store them if the sample barely shrinks.
+            store_if_larger (bool): Store a member whose compressed form came out
+                                    no smaller than the file.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown compression method '{method}' (choose from {', '.join(METHODS)})")
+        self.method = method
+        self.compress_type = METHODS[method]
+        self.level = level
+        self.store_extensions = frozenset(store_extensions)
+        self.sample = sample
+        self.store_if_larger = store_if_larger
+
+    def __repr__(self):
+        return f"CompressionPolicy(method={self.method!r}, level={self.level!r}, sample={self.sample!r})"
+
+    def choose(self, file_path, size):
+        """
+        Returns (compress_type, level) for one file.
+
+        Args:
+            file_path (str): The file to be archived.
+            size (int): Its size in bytes.
+        """
+        if self.compress_type == zipfile.ZIP_STORED or size == 0:
+            return zipfile.ZIP_STORED, None
+        if os.path.splitext(file_path)[1].lower() in self.store_extensions:
+            return zipfile.ZIP_STORED, None
+        if self.sample and size >= SAMPLE_MIN_FILE_SIZE and not sample_compresses(file_path):
+            return zipfile.ZIP_STORED, None
+        return self.compress_type, self.level
+
+    def repack_choice(self, name, compress_type):
+        """
+        Decides how to carry over a member that is already compressed inside another
+        ZIP (e.g. a .nupkg) without looking at its content.
+
+        Members whose method the policy would use anyway are copied as they are, and
+        so are deflated members of kinds the policy would store: copying costs less
+        than inflating them. Deflate levels are not re-applied to copied members.
+
+        Args:
+            name (str): The member's name; its extension is checked against store_extensions.
+            compress_type (int): The member's current zipfile method.
+
+        Returns:
+            tuple or None: None to copy the compressed bytes unchanged, otherwise the
+                           (compress_type, level) to recompress the member with.
+        """
+        if self.compress_type == zipfile.ZIP_STORED:
+            return None if compress_type == zipfile.ZIP_STORED else (zipfile.ZIP_STORED, None)
+        if compress_type == self.compress_type:
+            return None
+        if compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) and \
+                os.path.splitext(name)[1].lower() in self.store_extensions:
+            return None
+        return self.compress_type, self.level
+
+def sample_compresses(file_path, sample_size=SAMPLE_SIZE, max_ratio=SAMPLE_MAX_RATIO):
+    """Returns True if the start of file_path deflates to at most max_ratio of its size."""
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_size)
+    if not sample:
+        return False
+    return len(zlib.compress(sample, 1)) <= len(sample) * max_ratio
+
+# Named policies selectable from the CLI and job files.
+POLICIES = {
+    # Every member deflated at the default level, as shutil.make_archive did
+    "legacy": CompressionPolicy("deflate", store_extensions=(), sample=False, store_if_larger=False),
+    "default": CompressionPolicy("deflate"),
+    "fast": CompressionPolicy("deflate", level=1),
+    "max": CompressionPolicy("deflate", level=9),
+    "bzip2": CompressionPolicy("bzip2", level=9),
+    "lzma": CompressionPolicy("lzma"),
+    "store": CompressionPolicy("store"),
+}
+DEFAULT_POLICY = POLICIES["default"]
+
+def get_policy(policy=None):
+    """
+    Returns a CompressionPolicy for a policy name, a policy object, or None (the default).
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if policy is None:
+        return DEFAULT_POLICY
+    if isinstance(policy, CompressionPolicy):
+        return policy
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown compression policy '{policy}' (choose from {', '.join(POLICIES)})")
+    return POLICIES[policy]
@@ -0,0 +1,169 @@
+# ==============================================================================
+# WHALE-PUUP Deduplication Module (dedup.py)
+# Stores each unique file once in an archive, with a small index that maps the
+# paths of identical copies back to it, and expands such archives after decoding.
+# ==============================================================================
+
+import os
+import json
+import hashlib
+import zipfile
+import concurrent.futures
+import utilities
+import zipwriter
+
+# --- Configuration ---
+# Archive member holding the index. Archives without it are ordinary ZIPs.
+INDEX_ARCNAME = ".whale_puup_dedup.json"
+INDEX_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+HASH_WORKERS = 4
+# Fixed timestamp for the index member so identical inputs give identical archives.
+INDEX_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+def _sha256_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def plan_dedup(members):
+    """
+    Finds files with identical content among archive members.
+
+    Only files that share their size with another file are hashed, so bundles
+    with few duplicates cost little more than a directory walk. The first member
+    (in archive order) with a given content becomes the blob that is stored;
+    later copies are dropped and recorded in the index instead.
+
+    Args:
+        members (list[zipwriter.Member]): Members in archive order.
+
+    Returns:
+        tuple (list, dict, dict): The members to store, the index mapping each
+                                  dropped arcname to its blob's arcname, and stats.
+    """
+    by_size = {}
+    for member in members:
+        if not member.is_dir and member.size > 0:
+            by_size.setdefault(member.size, []).append(member)
+    candidates = [m for group in by_size.values() if len(group) > 1 for m in group]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        digests = dict(zip((m.arcname for m in candidates), pool.map(_sha256_file, (m.path for m in candidates))))
+
+    blobs = {} # sha256 -> arcname of the stored copy
+    duplicates = {}
+    kept = []
+    stats = {"files": 0, "duplicate_files": 0, "hashed_files": len(candidates),
+             "logical_bytes": 0, "stored_bytes": 0}
+
+    for member in members:
+        if member.is_dir:
+            kept.append(member)
+            continue
+        stats["files"] += 1
+        stats["logical_bytes"] += member.size
+        digest = digests.get(member.arcname)
+        if digest is not None and digest in blobs:
+            duplicates[member.arcname] = blobs[digest]
+            stats["duplicate_files"] += 1
+            continue
+        if digest is not None:
+            blobs[digest] = member.arcname
+        stats["stored_bytes"] += member.size
+        kept.append(member)
+
+    return kept, duplicates, stats
+
+def index_entry(duplicates, stats):
+    """Builds the (ZipInfo, bytes) pair for the index member."""
+    zinfo = zipfile.ZipInfo(INDEX_ARCNAME, date_time=INDEX_DATE_TIME)
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    data = json.dumps({"version": INDEX_VERSION, "files": duplicates, "stats": stats}, indent=1)
+    return zinfo, data.encode('utf-8')
+
+def write_zip_dedup(members, fileobj, max_workers=None, policy=None):
+    """
+    Writes members like zipwriter.write_zip_parallel, storing duplicate files once.
+
+    The result is a valid ZIP in which every blob sits at the path of its first
+    copy; the other copies are listed in INDEX_ARCNAME and are put back by
+    restore_archive.
+
+    Args:
+        members (list[zipwriter.Member]): What to archive, e.g. from collect_members.
+        fileobj: A writable binary stream, or a path, for the archive.
+        max_workers (int, optional): Compression processes; defaults to the CPU count.
+        policy (compression.CompressionPolicy, optional): Passed to write_zip_parallel.
+
+    Returns:
+        dict: Dedup stats (files, duplicate files, logical and stored bytes).
+    """
+    kept, duplicates, stats = plan_dedup(members)
+    extra_files = [index_entry(duplicates, stats)] if duplicates else []
+    zipwriter.write_zip_parallel(kept, fileobj, max_workers, policy, extra_files=extra_files)
+    return stats
+
+def restore_archive(zip_path):
+    """
+    Expands a deduplicated ZIP in place so every logical path is present again.
+
+    Duplicates are written by copying their blob's compressed bytes, so nothing is
+    recompressed. ZIP files without an index are left untouched.
+
+    Args:
+        zip_path (str): A decoded ZIP file.
+
+    Returns:
+        dict or None: The stats recorded at archive time, or None if zip_path
+                      was not deduplicated.
+    """
+    with zipfile.ZipFile(zip_path) as src:
+        if INDEX_ARCNAME not in src.NameToInfo:
+            return None
+        index = json.loads(src.read(INDEX_ARCNAME).decode('utf-8'))
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported dedup index version: {index.get('version')}")
+
+        dependents = {}
+        for arcname, blob in index["files"].items():
+            dependents.setdefault(blob, []).append(arcname)
+
+        temp_path = zip_path + ".restore.tmp"
+        try:
+            with open(zip_path, 'rb') as src_fp, zipfile.ZipFile(temp_path, 'w') as dst:
+                for info in src.infolist():
+                    if info.filename == INDEX_ARCNAME:
+                        continue
+                    offset = zipwriter.raw_data_offset(src_fp, info)
+                    compressed = zipwriter.CompressedFile(info.CRC, info.file_size, info.compress_size, None, None, None,
+                                                          info.compress_type)
+                    payload_writer = (lambda out, o=offset, n=info.compress_size:
+                                      zipwriter.copy_raw_payload(src_fp, o, n, out))
+                    # Each copy follows its blob so the archive keeps a natural order
+                    for filename in [info.filename] + dependents.pop(info.filename, []):
+                        zipwriter.write_raw_member(dst, zipwriter.copy_info(info, filename), compressed, payload_writer)
+
+            if dependents:
+                missing = next(iter(dependents))
+                raise ValueError(f"Dedup index refers to a missing blob: {missing}")
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    os.replace(temp_path, zip_path)
+    return index.get("stats", {})
+
+def print_report(stats):
+    """Prints the dedup ratio and size reduction for one archive."""
+    logical = stats.get("logical_bytes", 0)
+    stored = stats.get("stored_bytes", 0)
+    ratio = (logical / stored) if stored else 1.0
+    saved = ((logical - stored) / logical * 100) if logical else 0.0
+    print(utilities.color(
+        f"[DEDUP] {stats.get('duplicate_files', 0)} of {stats.get('files', 0)} file(s) were duplicates; "
+        f"{logical / (1024 * 1024):.1f} MB of file data stored as {stored / (1024 * 1024):.1f} MB "
+        f"(dedup ratio {ratio:.2f}:1, {saved:.0f}% smaller).", "BLUE"))
@@ -4,86 +4,596 @@
 # ==============================================================================
 
 import os
+import re
+import time
+import random
+import shutil
+import hashlib
+import itertools
+import collections
+import concurrent.futures
 import tempfile
 import zipfile
+import functools
 import requests
 import json
+import feeds
+import integrity
+import metrics
+import package_filter as filters
+import repack
 import utilities
 
-# NuGet public API endpoint for package details
-NUGET_API_URL = "https://api.nuget.org/v3/registration-flat/"
-NUGET_PACKAGE_URL = "https://www.nuget.org/api/v2/package/"
+# Where packages come from (nuget.org by default) is chosen with a feed; see feeds.py.
 
-def download_packages(package_list):
+# Number of packages fetched concurrently; the HTTP connection pool is sized to match.
+DEFAULT_MAX_WORKERS = 8
+# Bytes read from the HTTP response per iteration.
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Packages up to this size are buffered in memory and extracted without touching
+# disk; larger ones spill over to a temporary file automatically.
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+# --- Retry and Resume ---
+# Failed requests are retried with exponential backoff and full jitter: attempt n
+# waits a random time up to min(backoff_max, backoff_base * 2**n) seconds.
+# timeout is (connect, read) seconds; the read timeout applies between bytes.
+RetryPolicy = collections.namedtuple("RetryPolicy", ["max_attempts", "timeout", "backoff_base", "backoff_max"])
+DEFAULT_RETRY = RetryPolicy(max_attempts=6, timeout=(10, 60), backoff_base=0.5, backoff_max=30.0)
+# HTTP statuses worth retrying; anything else (e.g. 404) fails at once.
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# Bytes received before a download finally failed are kept here, so the next run
+# continues with a Range request instead of starting over. Override with
+# WHALE_PUUP_PARTIAL_DIR.
+DEFAULT_PARTIAL_DIR = os.environ.get(
+    "WHALE_PUUP_PARTIAL_DIR",
+    os.path.join(os.path.expanduser("~"), ".whale_puup", "partial_downloads")
+)
+PARTIAL_SUFFIX = ".nupkg.partial"
+
+def create_session(max_workers=DEFAULT_MAX_WORKERS):
     """
-    Downloads and extracts a list of NuGet packages into a temporary directory.
+    Creates a requests Session whose connection pool is sized for the worker count,
+    so concurrent downloads reuse keep-alive connections instead of reconnecting.
 
     Args:
-        package_list (list): List of NuGet package ID strings (e.g., ['Newtonsoft.Json']).
+        max_workers (int): Number of threads that will share the session.
 
     Returns:
-        str or None: The path to the temporary directory containing extracted packages,
-                     or None if any critical download fails.
+        requests.Session: A session with a pooled HTTP(S) adapter mounted.
     """
-    
-    # Create a temporary directory to hold the downloads
-    temp_download_dir = tempfile.mkdtemp(prefix="whale_puup_")
-    print(utilities.color(f"[DOWNLOAD] Created temporary directory: {temp_download_dir}", "YELLOW"))
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-    all_successful = True
-    
-    for package_id in package_list:
+def parse_package_spec(package_spec):
+    """
+    Splits a package spec into its ID and optional pinned version.
+
+    Accepts 'Newtonsoft.Json' (latest) or 'Newtonsoft.Json@13.0.3' (pinned).
+
+    Returns:
+        tuple (str, str or None): The package ID and the version, if one was given.
+    """
+    package_id, _, version = package_spec.partition('@')
+    return package_id.strip(), (version.strip() or None)
+
+def read_nuspec_version(zip_ref):
+    """Returns the <version> from the .nuspec inside an open .nupkg, or None if absent."""
+    nuspec = feeds.read_nuspec(zip_ref)
+    match = re.search(rb'<version>\s*([^<\s]+)\s*</version>', nuspec) if nuspec else None
+    return match.group(1).decode('utf-8') if match else None
+
+def backoff_delay(attempt, retry=DEFAULT_RETRY, retry_after=None):
+    """
+    Returns the seconds to wait before retry number attempt (1-based), using full
+    jitter so concurrent workers that failed together do not retry together. A
+    server's Retry-After (in seconds) is honored up to backoff_max.
+    """
+    delay = random.uniform(0, min(retry.backoff_max, retry.backoff_base * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, min(float(retry_after), retry.backoff_max))
+        except ValueError:
+            pass # An HTTP date; the jittered delay is used instead
+    return delay
+
+class _HashingSink:
+    """Appends to a file object while keeping the SHA-512 of everything in it."""
+
+    def __init__(self, fileobj, hashed=True):
+        self.fileobj = fileobj
+        self.hashed = hashed
+        self.digest = hashlib.sha512() if hashed else None
+
+    def write(self, data):
+        self.fileobj.write(data)
+        if self.digest:
+            self.digest.update(data)
+
+    def tell(self):
+        return self.fileobj.tell()
+
+    def reset(self):
+        """Discards everything written so far (the server sent a fresh full response)."""
+        self.fileobj.seek(0)
+        self.fileobj.truncate()
+        self.digest = hashlib.sha512() if self.hashed else None
+
+    def absorb_existing(self, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        """Hashes bytes already in the file (a resumed partial) and moves to its end."""
+        self.fileobj.seek(0)
+        for chunk in iter(lambda: self.fileobj.read(chunk_size), b''):
+            if self.digest:
+                self.digest.update(chunk)
+
+def _content_range(response):
+    """Parses 'Content-Range: bytes start-end/total' into (start, total or None)."""
+    match = re.match(r'bytes (\d+)-\d+/(\d+|\*)', response.headers.get("Content-Range", ""))
+    if not match:
+        return None, None
+    return int(match.group(1)), (None if match.group(2) == '*' else int(match.group(2)))
+
+def fetch_resumable(session, url, sink, chunk_size=DOWNLOAD_CHUNK_SIZE, retry=DEFAULT_RETRY, state=None, label=None):
+    """
+    Streams url into sink, retrying failed attempts and resuming each from the last
+    byte received with a Range request.
+
+    A resumed request carries If-Range with the validator (strong ETag or
+    Last-Modified) of the first response, so if the file changed on the server the
+    full new body comes back and replaces what was received. A server that ignores
+    Range is handled the same way.
+
+    Args:
+        session (requests.Session): Session used for every attempt.
+        url (str): What to download.
+        sink (_HashingSink): Destination; may already hold a partial download.
+        chunk_size (int): Bytes read from the response per iteration.
+        retry (RetryPolicy): Attempts, timeouts and backoff.
+        state (dict, optional): {'validator', 'total'} of a partial from an earlier
+                                run; updated in place as responses arrive.
+        label (str, optional): Name used in retry messages.
+
+    Returns:
+        dict: The state, plus 'attempts' and 'resumed_bytes' (bytes not re-sent).
+
+    Raises:
+        requests.exceptions.RequestException: When the last attempt fails, or at once
+                                              for errors that retrying cannot fix.
+    """
+    state = state if state is not None else {}
+    state.setdefault("validator", None)
+    state.setdefault("total", None)
+    state["attempts"] = 0
+    state["resumed_bytes"] = 0
+    label = label or url
+
+    while True:
+        state["attempts"] += 1
+        position = sink.tell()
+        headers = {}
+        if position:
+            headers["Range"] = f"bytes={position}-"
+            if state["validator"]:
+                headers["If-Range"] = state["validator"]
         try:
-            print(utilities.color(f"\n[INFO] Processing package: {package_id}", "CYAN"))
+            with session.get(url, stream=True, headers=headers, timeout=retry.timeout) as response:
+                if response.status_code == 416 and position:
+                    if position == state["total"]:
+                        return state # Everything had already arrived
+                    sink.reset() # The partial no longer fits the file; start over
+                    continue
+                response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+
+                start, total = _content_range(response) if response.status_code == 206 else (0, None)
+                if response.status_code == 206 and start == position:
+                    state["resumed_bytes"] += position
+                else:
+                    if position:
+                        sink.reset() # Full body: Range ignored or the file changed
+                    length = response.headers.get("Content-Length")
+                    total = int(length) if length and "Content-Encoding" not in response.headers else None
+                etag = response.headers.get("ETag")
+                state["validator"] = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified")
+                state["total"] = total
+
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    sink.write(chunk)
+            if state["total"] is not None and sink.tell() < state["total"]:
+                raise requests.exceptions.ChunkedEncodingError(
+                    f"connection closed after {sink.tell()} of {state['total']} bytes")
+            return state
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError, requests.exceptions.HTTPError) as e:
+            response = getattr(e, "response", None)
+            if isinstance(e, requests.exceptions.HTTPError) and response.status_code not in RETRY_STATUSES:
+                raise
+            if state["attempts"] >= retry.max_attempts:
+                raise
+            delay = backoff_delay(state["attempts"], retry,
+                                  response.headers.get("Retry-After") if response is not None else None)
+            print(utilities.color(f"[RETRY] {label}: {e.__class__.__name__} after {sink.tell()} bytes; "
+                                  f"attempt {state['attempts'] + 1} of {retry.max_attempts} in {delay:.1f} s", "YELLOW"))
+            time.sleep(delay)
+
+def _partial_paths(partial_dir, package_id, version):
+    base = os.path.join(partial_dir, f"{package_id.lower()}@{(version or 'latest').lower()}{PARTIAL_SUFFIX}")
+    return base, base + ".json"
+
+def _open_partial(partial_dir, package_id, version):
+    """
+    Opens a partial download kept by an earlier run.
+
+    Returns:
+        tuple (file, dict) or (None, None): The partial opened for appending and its
+                                            saved state, or None if there is none.
+    """
+    data_path, state_path = _partial_paths(partial_dir, package_id, version)
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        return open(data_path, 'r+b'), {"validator": state.get("validator"), "total": state.get("total")}
+    except (OSError, ValueError):
+        return None, None
+
+def _keep_partial(partial_dir, package_id, version, package_file, state):
+    """Saves what was received of a failed download, with its validator, for the next run."""
+    data_path, state_path = _partial_paths(partial_dir, package_id, version)
+    os.makedirs(partial_dir, exist_ok=True)
+    if getattr(package_file, "name", None) != data_path:
+        package_file.seek(0)
+        with open(data_path, 'wb') as f:
+            for chunk in iter(lambda: package_file.read(DOWNLOAD_CHUNK_SIZE), b''):
+                f.write(chunk)
+    with open(state_path, 'w') as f:
+        json.dump({"validator": state.get("validator"), "total": state.get("total")}, f)
+
+def _drop_partial(partial_dir, package_id, version):
+    for path in _partial_paths(partial_dir, package_id, version):
+        if os.path.exists(path):
+            os.remove(path)
+
+def _verify_package(package_id, version, sha512_hex, verifier):
+    """
+    Compares a package's SHA-512 with the hash NuGet publishes for that version.
 
-            # 1. --- Discover Latest Version ---
-            # We assume a fixed, latest version for simplicity, but a more complex
-            # utility would use the registration API to find a specific version.
-            # For this utility, we'll try to download without specifying version first.
+    Returns:
+        bool: False only on a mismatch; a package without a published hash passes
+              with a warning.
+    """
+    expected = verifier(package_id, version) if version else None
+    if expected is None:
+        print(utilities.color(f"[VERIFY] No published SHA-512 for {package_id} {version or ''}; not verified.", "YELLOW"))
+        return True
+    if not integrity.nuget_hash_matches(sha512_hex, expected):
+        print(utilities.color(f"[ERROR] {package_id} {version} does not match NuGet's published SHA-512; discarding it.", "RED"))
+        return False
+    print(utilities.color(f"[VERIFY] {package_id} {version} matches NuGet's published SHA-512.", "GREEN"))
+    return True
+
+def _sha512_file(path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    digest = hashlib.sha512()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _open_cached_package(cache, blob_path, package_id, version, verifier):
+    """
+    Opens a cached .nupkg once it is checked: its bytes must still hash to the
+    digest it is stored under and open as a ZIP and, with a verifier, match the
+    published SHA-512. A blob that fails is discarded from the cache.
+
+    Returns:
+        file or None: The blob opened for reading, or None if it was discarded.
+    """
+    sha512_hex = _sha512_file(blob_path)
+    package_file = open(blob_path, 'rb')
+    try:
+        if sha512_hex != cache.blob_digest(blob_path):
+            raise zipfile.BadZipFile("its bytes no longer match the hash it is stored under")
+        with zipfile.ZipFile(package_file, 'r') as zip_ref:
+            resolved_version = read_nuspec_version(zip_ref) or version
+        if verifier is None or _verify_package(package_id, resolved_version, sha512_hex, verifier):
+            return package_file
+        reason = "it does not match the published SHA-512"
+    except zipfile.BadZipFile as e:
+        reason = str(e)
+    package_file.close()
+    cache.discard(blob_path)
+    print(utilities.color(f"[CACHE] Discarded the cached {package_id} ({reason}); downloading it again", "YELLOW"))
+    return None
+
+def _download_single_package(session, package_spec, temp_download_dir, feed, cache=None,
+                             chunk_size=DOWNLOAD_CHUNK_SIZE, spool_max_bytes=SPOOL_MAX_BYTES, verifier=None,
+                             retry=DEFAULT_RETRY, partial_dir=DEFAULT_PARTIAL_DIR, package_filter=None,
+                             extract=True):
+    """
+    Downloads and extracts one NuGet package into temp_download_dir/<package_id>,
+    or keeps it whole as temp_download_dir/<package_id>.nupkg for repacking.
+
+    Args:
+        session (requests.Session): Shared pooled session used for the request.
+        package_spec (str): The NuGet package ID, optionally pinned as 'Id@Version'.
+        temp_download_dir (str): The shared temporary download directory.
+        feed (feeds.Feed): Where the package comes from.
+        cache (cache.PackageCache, optional): Cache consulted before the network (not
+                                              used for local feeds).
+        chunk_size (int): Bytes read from the response per iteration.
+        spool_max_bytes (int): Largest package buffered in memory rather than on disk.
+        verifier (callable, optional): verifier(package_id, version) returns NuGet's
+                                       published packageHash (Base64 SHA-512) or None.
+        retry (RetryPolicy): Attempts, timeouts and backoff for the download.
+        partial_dir (str, optional): Where an incomplete download is kept for the
+                                     next run to resume; None disables this.
+        package_filter (package_filter.PackageFilter, optional): Extract only the
+                                                                 members it selects.
+        extract (bool): Extract the package; if False, save the .nupkg instead (a
+                        cached one is hard-linked where possible).
 
+    Returns:
+        bool: True if the package was downloaded and extracted (or saved), False otherwise.
+    """
+    package_id, version = parse_package_spec(package_spec)
+    package_file = None
+    resumed_partial = False
+    fetched = False
+    try:
+        print(utilities.color(f"\n[INFO] Processing package: {package_spec}", "CYAN"))
+
+        # 1. --- Check the Local Package Cache ---
+        start = time.perf_counter()
+        nupkg_path = cache.lookup(package_id, version) if cache and not feed.local else None
+        if nupkg_path:
+            # A damaged or mismatching blob is discarded and the package downloaded instead
+            package_file = _open_cached_package(cache, nupkg_path, package_id, version, verifier)
+            nupkg_path = nupkg_path if package_file else None
+
+        if nupkg_path:
+            print(utilities.color(f"[CACHE] Using cached .nupkg: {nupkg_path}", "GREEN"))
+            metrics.recorder().record("cache", time.perf_counter() - start, os.path.getsize(nupkg_path), package_id)
+        elif feed.local:
+            # 2. --- Read the Package Straight From a Folder Feed ---
+            nupkg_path = feed.package_path(package_id, version)
+            if nupkg_path is None:
+                print(utilities.color(f"[ERROR] {package_spec} is not in the feed {feed.label}", "RED"))
+                return False
+            print(utilities.color(f"[FEED] Using {nupkg_path}", "GREEN"))
+            package_file = open(nupkg_path, 'rb')
+            if verifier:
+                with zipfile.ZipFile(package_file, 'r') as zip_ref:
+                    resolved_version = read_nuspec_version(zip_ref) or version
+                if not _verify_package(package_id, resolved_version, _sha512_file(nupkg_path), verifier):
+                    package_file.close()
+                    return False
+            metrics.recorder().record("feed", time.perf_counter() - start, os.path.getsize(nupkg_path), package_id)
+        else:
             # 2. --- Construct Download URL ---
-            # Nuget V2 style URL is often used for direct downloads
-            download_url = f"{NUGET_PACKAGE_URL}{package_id}"
-            
-            # The output path for the downloaded .nupkg (which is a ZIP file)
-            output_nupkg_path = os.path.join(temp_download_dir, f"{package_id}.nupkg")
+            # The feed maps the package to a URL; without a version it finds the latest
+            # release (a v3 feed reads its version list, revalidated in the metadata cache).
+            download_url = feed.package_url(package_id, version, functools.partial(feed.fetch, session))
             
             # 3. --- Perform Download ---
+            # The .nupkg (a ZIP file) is received into a spooled buffer: small packages
+            # stay in memory, large ones roll over to a temp file in the download dir.
+            # When caching or verifying, the SHA-512 is computed as the bytes arrive so the
+            # package is never re-read. Dropped connections are resumed with Range
+            # requests; if every retry fails, the bytes received are kept in partial_dir
+            # and the next run continues from there.
             print(utilities.color(f"[DOWNLOAD] Fetching from: {download_url}...", "YELLOW"))
-            
-            response = requests.get(download_url, stream=True)
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
 
-            with open(output_nupkg_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            print(utilities.color(f"[DOWNLOAD] Successfully saved .nupkg to: {output_nupkg_path}", "GREEN"))
+            package_file, state = _open_partial(partial_dir, package_id, version) if partial_dir else (None, None)
+            resumed_partial = package_file is not None
+            if not resumed_partial:
+                package_file = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes, dir=temp_download_dir)
+            sink = _HashingSink(package_file, hashed=bool(cache or verifier))
+            if resumed_partial:
+                sink.absorb_existing()
+                print(utilities.color(f"[RESUME] Continuing {package_id} from byte {sink.tell()} of an earlier run", "YELLOW"))
 
-            # 4. --- Extract Package ---
-            extract_dir = os.path.join(temp_download_dir, package_id)
-            os.makedirs(extract_dir, exist_ok=True)
-            
-            print(utilities.color(f"[EXTRACT] Extracting package contents...", "YELLOW"))
-            
-            # .nupkg files are standard ZIP archives
-            with zipfile.ZipFile(output_nupkg_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
+            state = state or {}
+            start = time.perf_counter()
+            try:
+                fetch_resumable(session, download_url, sink, chunk_size, retry, state, label=package_id)
+            except requests.exceptions.RequestException:
+                if partial_dir and sink.tell():
+                    _keep_partial(partial_dir, package_id, version, package_file, state)
+                    print(utilities.color(f"[RESUME] Kept {sink.tell()} bytes of {package_id}; "
+                                          f"the next run resumes from there", "YELLOW"))
+                package_file.close()
+                raise
+            fetched = True
+            digest = sink.digest
+            download_seconds = time.perf_counter() - start
+            metrics.recorder().record("download", download_seconds, package_file.tell(), package_id)
             
-            print(utilities.color(f"[EXTRACT] Extraction complete to: {extract_dir}", "GREEN"))
+            print(utilities.color(f"[DOWNLOAD] Successfully received {package_id} ({package_file.tell()} bytes)", "GREEN"))
 
-            # 5. --- Cleanup .nupkg ---
-            os.remove(output_nupkg_path)
-            
-        except requests.exceptions.RequestException as req_e:
-            print(utilities.color(f"[ERROR] Failed to download {package_id} (Network/HTTP Error): {req_e}", "RED"))
-            all_successful = False
-        except zipfile.BadZipFile:
-            print(utilities.color(f"[ERROR] Failed to extract {package_id}: Downloaded file is corrupted or not a valid ZIP.", "RED"))
-            all_successful = False
-        except Exception as e:
-            print(utilities.color(f"[ERROR] An unexpected error occurred while processing {package_id}: {e}", "RED"))
-            all_successful = False
+            if cache or verifier:
+                package_file.seek(0)
+                with zipfile.ZipFile(package_file, 'r') as zip_ref:
+                    resolved_version = read_nuspec_version(zip_ref)
+            if verifier and not _verify_package(package_id, resolved_version or version, digest.hexdigest(), verifier):
+                package_file.close()
+                if resumed_partial:
+                    _drop_partial(partial_dir, package_id, version)
+                return False
+            if cache:
+                cache.store(package_id, version, resolved_version, package_file, digest.hexdigest(), download_seconds)
+
+        if not extract:
+            # 4. --- Keep the Package Whole for repack.py ---
+            package_path = os.path.join(temp_download_dir, package_id + repack.PACKAGE_SUFFIX)
+            with package_file:
+                if nupkg_path:
+                    try:
+                        os.link(nupkg_path, package_path)
+                    except OSError: # Different volume, or links not supported
+                        shutil.copyfile(nupkg_path, package_path)
+                else:
+                    package_file.seek(0)
+                    with open(package_path, 'wb') as out:
+                        shutil.copyfileobj(package_file, out, 1024 * 1024)
+            if resumed_partial:
+                _drop_partial(partial_dir, package_id, version)
+            return True
+
+        # 4. --- Extract Package ---
+        extract_dir = os.path.join(temp_download_dir, package_id)
+        os.makedirs(extract_dir, exist_ok=True)
+        
+        print(utilities.color(f"[EXTRACT] Extracting package contents...", "YELLOW"))
+        
+        # .nupkg files are standard ZIP archives; the buffer is released on close
+        with package_file, metrics.stage("extract", package_id) as stage:
+            package_file.seek(0)
+            with zipfile.ZipFile(package_file, 'r') as zip_ref:
+                if package_filter:
+                    # Members that are filtered out are never decompressed
+                    filter_stats = package_filter.extract(zip_ref, extract_dir, package_id)
+                    stage.bytes = filter_stats.kept_bytes
+                    filters.print_report(filter_stats, package_id)
+                else:
+                    zip_ref.extractall(extract_dir)
+                    stage.bytes = sum(info.file_size for info in zip_ref.infolist())
+        if resumed_partial:
+            _drop_partial(partial_dir, package_id, version)
+        
+        print(utilities.color(f"[EXTRACT] Extraction complete to: {extract_dir}", "GREEN"))
+        return True
+        
+    except requests.exceptions.RequestException as req_e:
+        print(utilities.color(f"[ERROR] Failed to download {package_spec} (Network/HTTP Error): {req_e}", "RED"))
+    except zipfile.BadZipFile:
+        print(utilities.color(f"[ERROR] Failed to extract {package_spec}: Downloaded file is corrupted or not a valid ZIP.", "RED"))
+    except Exception as e:
+        print(utilities.color(f"[ERROR] An unexpected error occurred while processing {package_spec}: {e}", "RED"))
+    if package_file is not None:
+        package_file.close()
+    if resumed_partial and fetched:
+        # The partial now holds the whole (unusable) package; kept, every later run
+        # would resume at its end and fail the same way
+        _drop_partial(partial_dir, package_id, version)
+    return False
+
+def iter_downloads(package_list, temp_download_dir, window, max_workers=DEFAULT_MAX_WORKERS, session=None,
+                   feed=None, cache=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                   spool_max_bytes=SPOOL_MAX_BYTES, verifier=None, retry=DEFAULT_RETRY,
+                   partial_dir=DEFAULT_PARTIAL_DIR, package_filter=None, extract=True):
+    """
+    Downloads packages concurrently into temp_download_dir and yields each result in
+    list order, as soon as it and every package before it have finished.
+
+    At most window packages are downloading or waiting to be consumed at any time:
+    the next download starts only when the caller takes a result. A slow consumer
+    therefore holds the downloads back instead of letting finished packages pile up.
+    Closing the generator early cancels the downloads that have not started.
+
+    Args:
+        package_list (list): Package IDs, optionally pinned as 'Id@Version'.
+        temp_download_dir (str): Where packages are extracted or saved.
+        window (int): Packages in flight or finished but not yet consumed.
+        max_workers (int): Downloads running at the same time (at most window).
+        session (requests.Session, optional): Session to reuse; one is created (and
+                                              closed afterwards) if omitted.
+        Others: As for download_packages.
+
+    Yields:
+        tuple (str, bool): The package spec and whether it was downloaded and
+                           extracted (or saved).
+    """
+    window = max(1, window)
+    max_workers = max(1, min(max_workers, window, len(package_list) or 1))
+    feed = feeds.get_feed(feed)
+    owns_session = session is None
+    if owns_session:
+        session = create_session(max_workers)
+
+    def download(package_spec):
+        return _download_single_package(session, package_spec, temp_download_dir, feed, cache, chunk_size,
+                                        spool_max_bytes, verifier, retry, partial_dir, package_filter, extract)
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    pending = collections.deque()
+    specs = iter(package_list)
+    try:
+        for package_spec in itertools.islice(specs, window):
+            pending.append((package_spec, pool.submit(download, package_spec)))
+        while pending:
+            package_spec, future = pending.popleft()
+            succeeded = future.result()
+            next_spec = next(specs, None)
+            if next_spec is not None:
+                pending.append((next_spec, pool.submit(download, next_spec)))
+            yield package_spec, succeeded
+    finally:
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+        if owns_session:
+            session.close()
+
+def download_packages(package_list, max_workers=DEFAULT_MAX_WORKERS, session=None, feed=None,
+                      cache=None, chunk_size=DOWNLOAD_CHUNK_SIZE, spool_max_bytes=SPOOL_MAX_BYTES, verifier=None,
+                      retry=DEFAULT_RETRY, partial_dir=DEFAULT_PARTIAL_DIR, package_filter=None,
+                      extract=True):
+    """
+    Downloads and extracts a list of NuGet packages into a temporary directory.
+
+    Packages are fetched concurrently by a bounded thread pool that shares a single
+    pooled HTTP session. When a cache is given, hits are extracted straight from the
+    cache without a network request and only misses are fetched. Interrupted
+    transfers are retried with backoff and resumed from the last byte received.
+    The result is still all-or-nothing: if any package fails, the whole temporary
+    directory is removed, but the bytes received of a failed download are kept in
+    partial_dir so the next run does not fetch them again.
+
+    Args:
+        package_list (list): List of NuGet package ID strings (e.g., ['Newtonsoft.Json']),
+                             optionally pinned to a version ('Newtonsoft.Json@13.0.3').
+        max_workers (int): Maximum number of packages downloaded at the same time.
+        session (requests.Session, optional): Session to reuse. One is created
+                                              (and closed afterwards) if omitted.
+        feed (feeds.Feed or str, optional): Where packages come from: a feed, or a
+                                            source for feeds.get_feed (nuget.org if None).
+        cache (cache.PackageCache, optional): Persistent package cache to use.
+        chunk_size (int): Bytes read from each HTTP response per iteration.
+        spool_max_bytes (int): Packages up to this size are extracted straight from
+                               memory instead of being written to disk first.
+        verifier (callable, optional): verifier(package_id, version) returns NuGet's
+                                       published SHA-512 (e.g. DependencyResolver.package_hash);
+                                       packages that do not match it fail the run.
+        retry (RetryPolicy): Attempts, per-request timeouts and backoff.
+        partial_dir (str, optional): Where incomplete downloads are kept between runs
+                                     (None to discard them).
+        package_filter (package_filter.PackageFilter, optional): Keep only some target
+                                                                 frameworks and drop
+                                                                 metadata, signatures,
+                                                                 symbols or docs.
+        extract (bool): Extract each package into '<package_id>/'. If False, each is
+                        saved whole as '<package_id>.nupkg' instead, for
+                        archiver.archive_and_encode_packages(repack_packages=True);
+                        package_filter is then applied while repacking.
+
+    Returns:
+        str or None: The path to the temporary directory containing extracted (or
+                     saved) packages, or None if any critical download fails.
+    """
+    
+    # Create a temporary directory to hold the downloads
+    temp_download_dir = tempfile.mkdtemp(prefix="whale_puup_")
+    print(utilities.color(f"[DOWNLOAD] Created temporary directory: {temp_download_dir}", "YELLOW"))
+
+    # Every result is taken as soon as it is ready, so a window of the whole list
+    # never holds a download back
+    results = [succeeded for _, succeeded in iter_downloads(
+        package_list, temp_download_dir, len(package_list), max_workers, session, feed, cache, chunk_size,
+        spool_max_bytes, verifier, retry, partial_dir, package_filter, extract)]
+
+    all_successful = all(results)
             
     if all_successful:
         # Return the path to the directory containing all the extracted packages
@@ -91,4 +601,4 @@ def download_packages(package_list):
     else:
         # If any package failed, clean up the temp directory and return None
         utilities.cleanup(temp_download_dir)
-        return None
\ No newline at end of file
+        return None
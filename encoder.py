@@ -0,0 +1,708 @@
+# ==============================================================================
+# WHALE-PUUP Encoder Module (encoder.py)
+# Handles streaming Base64 encoding of binary files to text and decoding back,
+# or Base85 / Ascii85 where smaller output is worth the CPU (see textcodec.py).
+# All functions work in fixed-size blocks, so memory use is constant no matter
+# how large the input is. Decoding detects the codec from the text itself.
+# ==============================================================================
+
+import io
+import os
+import mmap
+import hashlib
+import itertools
+import binascii
+import concurrent.futures
+import integrity
+import textcodec
+import utilities
+
+# --- Configuration ---
+# Raw bytes encoded per block. A multiple of every codec's group size (3 bytes for
+# Base64, 4 for Base85) so that every block except the last encodes without
+# padding and encoded blocks concatenate cleanly.
+ENCODE_BLOCK_SIZE = 3 * 256 * 1024
+# Characters decoded per block; rounded down to a whole number of groups.
+DECODE_BLOCK_SIZE = 4 * 256 * 1024
+# Characters per output line; 0 writes the whole encoding on a single line.
+DEFAULT_LINE_LENGTH = 0
+LINE_ENDING = b"\n"
+# Input bytes per task in the parallel decoder; bounds each worker's memory.
+PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+# How far past its range a parallel decode task reads to complete its last quantum.
+_BOUNDARY_PROBE = 64
+
+# Bytes dropped from the input before decoding (spaces, tabs, CR, LF, VT, FF).
+# None of them occur in any codec's alphabet.
+_WHITESPACE = b" \t\r\n\x0b\x0c"
+
+class _TextSink:
+    """Writes encoded Base64 text to a binary file, optionally wrapping it into lines."""
+
+    def __init__(self, out, line_length=DEFAULT_LINE_LENGTH):
+        self._out = out
+        self.line_length = line_length
+        self._column = 0
+
+    def write(self, text):
+        if not self.line_length:
+            self._out.write(text)
+            return
+        length = self.line_length
+        position = 0
+
+        # Complete the line left open by the previous write
+        if self._column:
+            position = min(length - self._column, len(text))
+            self._out.write(text[:position])
+            self._column += position
+            if self._column < length:
+                return
+            self._out.write(LINE_ENDING)
+            self._column = 0
+
+        # Emit all full lines with a single join, then keep the tail open
+        full_end = position + (len(text) - position) // length * length
+        if full_end > position:
+            lines = [text[i:i + length] for i in range(position, full_end, length)]
+            lines.append(b"")
+            self._out.write(LINE_ENDING.join(lines))
+        if full_end < len(text):
+            self._out.write(text[full_end:])
+            self._column = len(text) - full_end
+
+    def finish(self):
+        """Terminates the last partial line so wrapped output always ends with a newline."""
+        if self.line_length and self._column:
+            self._out.write(LINE_ENDING)
+            self._column = 0
+
+class Base64StreamWriter:
+    """
+    A write-only binary stream that Base64-encodes (or, with another codec,
+    Base85-encodes) everything written to it and appends the text to an output
+    file, one fixed-size block at a time.
+
+    Memory use is bounded by ENCODE_BLOCK_SIZE regardless of how much is written,
+    which lets producers such as zipfile.ZipFile write straight into the encoder
+    without an intermediate file. The stream is not seekable, so ZipFile falls back
+    to data descriptors, which every ZIP reader understands.
+    """
+
+    def __init__(self, output_path, block_size=ENCODE_BLOCK_SIZE, line_length=DEFAULT_LINE_LENGTH, hasher=None,
+                 codec=None):
+        """
+        Args:
+            output_path (str): Path of the Base64 text file to create.
+            block_size (int): Bytes buffered per encode; rounded down to a whole
+                              number of the codec's groups.
+            line_length (int): Wrap output at this many characters (0 disables wrapping).
+            hasher (integrity.BlockHasher, optional): Fed every raw byte written.
+            codec (str or textcodec.Codec, optional): A textcodec.CODECS name; Base64 if None.
+        """
+        self.codec = textcodec.get_codec(codec)
+        group = self.codec.raw_group
+        self.block_size = max(group, block_size - block_size % group)
+        self._out = open(output_path, 'wb')
+        self._out.write(self.codec.header())
+        self._sink = _TextSink(self._out, line_length)
+        self._pending = bytearray()
+        self._position = 0
+        self._hasher = hasher
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        """Returns the number of raw bytes written so far (ZipFile uses this for offsets)."""
+        return self._position
+
+    def write(self, data):
+        if self._hasher:
+            self._hasher.update(data)
+        self._pending += data
+        self._position += len(data)
+        if len(self._pending) >= self.block_size:
+            aligned = len(self._pending) - len(self._pending) % self.block_size
+            view = memoryview(self._pending)
+            for start in range(0, aligned, self.block_size):
+                self._sink.write(self.codec.encode(view[start:start + self.block_size]))
+            view.release()
+            del self._pending[:aligned]
+        return len(data)
+
+    def flush(self):
+        self._out.flush()
+
+    def close(self):
+        """Encodes the final partial block (with padding) and closes the output file."""
+        if self.closed:
+            return
+        if self._pending:
+            self._sink.write(self.codec.encode(bytes(self._pending)))
+            self._pending.clear()
+        self._sink.finish()
+        self._out.close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def _read_full(f, buffer):
+    """Fills buffer from f, looping over short reads. Returns the byte count (less only at EOF)."""
+    view = memoryview(buffer)
+    total = 0
+    while total < len(buffer):
+        count = f.readinto(view[total:])
+        if not count:
+            break
+        total += count
+    view.release()
+    return total
+
+def encode_file_to_base64(input_path, output_path, line_length=DEFAULT_LINE_LENGTH, block_size=ENCODE_BLOCK_SIZE,
+                          hasher=None, codec=None):
+    """
+    Encodes a binary file into a Base64 text file in constant memory.
+
+    The input is read into one reusable group-aligned buffer, so each block encodes
+    independently and the concatenated output equals a one-shot encoding.
+
+    Args:
+        input_path (str): The binary file to encode (e.g., a ZIP archive).
+        output_path (str): The Base64 .txt file to create.
+        line_length (int): Wrap output at this many characters (0 disables wrapping).
+        block_size (int): Bytes encoded per block; rounded down to a whole number of groups.
+        hasher (integrity.BlockHasher, optional): Fed every byte as it is encoded.
+        codec (str or textcodec.Codec, optional): A textcodec.CODECS name; Base64 if None.
+
+    Returns:
+        bool: True on success, False if the file could not be encoded.
+    """
+    codec = textcodec.get_codec(codec)
+    block_size = max(codec.raw_group, block_size - block_size % codec.raw_group)
+    buffer = bytearray(block_size)
+
+    try:
+        with open(input_path, 'rb') as f_in, open(output_path, 'wb') as f_out:
+            f_out.write(codec.header())
+            sink = _TextSink(f_out, line_length)
+            view = memoryview(buffer)
+            while True:
+                count = _read_full(f_in, buffer)
+                if not count:
+                    break
+                if hasher:
+                    hasher.update(view[:count])
+                sink.write(codec.encode(view[:count]))
+                if count < block_size:
+                    break
+            view.release()
+            sink.finish()
+        return True
+
+    except OSError as e:
+        print(utilities.color(f"[ERROR] {codec.label} encoding of {input_path} failed: {e}", "RED"))
+        return False
+
+def decode_blocks(f_in, block_size=DECODE_BLOCK_SIZE, codec=None):
+    """
+    Yields the decoded bytes of Base64 text read from f_in, one block at a time.
+
+    Whitespace is ignored; characters left over after the last complete group
+    (4 characters for Base64, 5 for Base85) carry into the next block.
+
+    Args:
+        f_in: Binary file object positioned at the first character (past any header).
+        block_size (int): Characters read per block.
+        codec (textcodec.Codec, optional): The text's codec; Base64 if None.
+
+    Raises:
+        binascii.Error: If the text is not valid in the codec.
+    """
+    codec = textcodec.get_codec(codec)
+    group = codec.text_group
+    block_size = max(group, block_size - block_size % group)
+    buffer = bytearray(block_size)
+    carry = b""
+
+    while True:
+        count = _read_full(f_in, buffer)
+        if not count:
+            break
+        text = carry + buffer[:count].translate(None, _WHITESPACE)
+        aligned = len(text) - len(text) % group
+        yield codec.decode(text[:aligned])
+        carry = text[aligned:]
+
+    if carry:
+        if codec.padded:
+            raise binascii.Error(f"input ends with {len(carry)} stray character(s) (length is not a multiple of {group})")
+        yield codec.decode(carry) # The shortened final group
+
+def decode_file_from_base64(input_path, output_path, block_size=DECODE_BLOCK_SIZE, manifest=None):
+    """
+    Decodes a Base64 text file back into the original binary file in constant memory.
+
+    Whitespace anywhere in the input (line wrapping, CRLF line endings, trailing
+    newlines) is ignored. Text is read into one reusable buffer; characters left
+    over after the last complete group carry into the next block. The codec is
+    taken from the header, if the text has one (see textcodec.read_header).
+
+    Args:
+        input_path (str): The Base64 .txt file to decode.
+        output_path (str): The binary file (e.g., a ZIP archive) to create.
+        block_size (int): Characters read per block; rounded down to a whole number of groups.
+        manifest (dict, optional): Integrity manifest written at encode time. Each
+                                   block is checked as soon as it is decoded, and
+                                   decoding stops at the first mismatch.
+
+    Returns:
+        bool: True on success, False if the input is not valid Base64 (or its codec),
+              does not match the manifest, or I/O failed.
+    """
+    hasher = integrity.BlockHasher(manifest["block_size"], manifest["blocks"]) if manifest else None
+    codec = textcodec.BASE64
+    try:
+        with open(input_path, 'rb') as f_in, open(output_path, 'wb') as f_out:
+            codec = textcodec.read_header(f_in)[0]
+            for data in decode_blocks(f_in, block_size, codec):
+                if hasher:
+                    hasher.update(data)
+                f_out.write(data)
+        if hasher:
+            integrity.check_complete(hasher, manifest)
+        return True
+
+    except integrity.IntegrityError as e:
+        print(utilities.color(f"[ERROR] {input_path} failed its integrity check: {e}", "RED"))
+        return False
+    except binascii.Error as e:
+        print(utilities.color(f"[ERROR] {input_path} is not valid {codec.label}: {e}", "RED"))
+        return False
+    except ValueError as e: # Unknown codec in the header
+        print(utilities.color(f"[ERROR] {input_path}: {e}", "RED"))
+        return False
+    except OSError as e:
+        print(utilities.color(f"[ERROR] {codec.label} decoding of {input_path} failed: {e}", "RED"))
+        return False
+
+def _text_offset(char_index, line_length, header_size=0):
+    """Maps an index into the encoded character stream to a file offset, given line wrapping."""
+    if not line_length:
+        return header_size + char_index
+    return header_size + char_index + (char_index // line_length) * len(LINE_ENDING)
+
+def copy_base64_range(input_path, start, length, out, line_length=DEFAULT_LINE_LENGTH, block_size=DECODE_BLOCK_SIZE):
+    """
+    Decodes only bytes [start, start + length) of the data encoded in a Base64 file.
+
+    Every 3 raw bytes map to exactly 4 characters (4 to 5 in Base85), so the
+    covering groups can be located with a seek instead of decoding everything
+    before them. The codec is taken from the file's header, if it has one.
+
+    Args:
+        input_path (str): Base64 text file written by this module.
+        start (int): Offset of the first wanted byte in the decoded data.
+        length (int): Number of bytes to decode.
+        out: Binary file object the decoded bytes are written to.
+        line_length (int): Line wrapping the file was written with (0 if unwrapped).
+        block_size (int): Characters read per block; rounded down to a whole number of groups.
+
+    Raises:
+        binascii.Error: If the range runs past the end of the input or is not valid
+                        in the file's codec.
+    """
+    with open(input_path, 'rb') as f:
+        codec, header_size = textcodec.read_header(f)
+        raw_group, text_group = codec.raw_group, codec.text_group
+        block_size = max(text_group, block_size - block_size % text_group)
+        char_pos = start // raw_group * text_group
+        char_end = (start + length + raw_group - 1) // raw_group * text_group
+        skip = start % raw_group
+        remaining = length
+        carry = b""
+
+        f.seek(_text_offset(char_pos, line_length, header_size))
+        while remaining > 0:
+            text = f.read(min(block_size, char_end - char_pos)).translate(None, _WHITESPACE)
+            if text:
+                text = carry + text[:char_end - char_pos - len(carry)]
+                aligned = len(text) - len(text) % text_group
+                data = codec.decode(text[:aligned])
+                char_pos += aligned
+                carry = text[aligned:]
+            elif carry and not codec.padded:
+                data, carry = codec.decode(carry), b"" # The shortened final group
+            else:
+                raise binascii.Error(f"{input_path} ends before the requested range")
+
+            dropped = min(skip, len(data))
+            data = data[dropped:dropped + remaining]
+            skip -= dropped
+            out.write(data)
+            remaining -= len(data)
+
+# ==============================================================================
+# --- Parallel Decoding ---
+# ==============================================================================
+
+class _LayoutMismatch(Exception):
+    """Raised by a decode task whose range holds a different number of characters than predicted."""
+
+def _predict_chars(offset, line_chars, eol_size):
+    """Encoded characters before byte offset (past the header) in a file wrapped at line_chars (0 = unwrapped)."""
+    if not line_chars:
+        return offset
+    full_lines, remainder = divmod(offset, line_chars + eol_size)
+    return full_lines * line_chars + min(remainder, line_chars)
+
+def _detect_layout(input_path, header_size=0):
+    """
+    Guesses the line layout from the first line after the header, as written by this module.
+
+    Returns:
+        tuple (int, int): Characters per line (0 if the first line is the whole text)
+                          and the line ending's size (1 for LF, 2 for CRLF).
+    """
+    with open(input_path, 'rb') as f:
+        f.seek(header_size)
+        line = f.readline(DECODE_BLOCK_SIZE)
+    if not line.endswith(b"\n"):
+        return 0, 1
+    eol_size = 2 if line.endswith(b"\r\n") else 1
+    return len(line) - eol_size, eol_size
+
+def _text_end(input_path, input_size):
+    """Returns the offset just past the last non-whitespace byte (ignoring a final newline)."""
+    with open(input_path, 'rb') as f:
+        f.seek(max(0, input_size - 64))
+        tail = f.read()
+    return input_size - (len(tail) - len(tail.rstrip(_WHITESPACE)))
+
+def _count_chars(input_path, start, end):
+    """Worker entry point: counts the encoded characters (non-whitespace bytes) in a byte range."""
+    with open(input_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return len(mm[start:end].translate(None, _WHITESPACE))
+
+def _write_at(fd, offset, data):
+    """Writes data at offset in an open file descriptor without relying on a shared file position."""
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(fd, view, offset)
+        else: # Windows: each task opens its own descriptor, so seeking is safe
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+def _decode_range(input_path, output_path, start, end, char_index, char_count=None, expected_digest=None,
+                  codec_name="base64", block_size=DECODE_BLOCK_SIZE):
+    """
+    Worker entry point: decodes the whole groups that begin in bytes [start, end) of
+    the input and writes them at their place in the output.
+
+    char_index is the number of encoded characters before start. Characters of a
+    group that began in the previous range are skipped, and a group left open
+    at the end is completed by reading just past end (or, at the end of Base85
+    text, decoded as the shortened final group). The range is processed in
+    cache-sized blocks. If char_count is given and the range turns out to hold a
+    different number of characters, _LayoutMismatch is raised (after writing), since
+    every later range would then be misplaced. If expected_digest is given, the
+    SHA-256 of the decoded bytes must match it or integrity.IntegrityError is raised.
+    """
+    codec = textcodec.get_codec(codec_name)
+    raw_group, text_group = codec.raw_group, codec.text_group
+    lead = -char_index % text_group
+    out_offset = (char_index + lead) // text_group * raw_group
+    digest = hashlib.sha256() if expected_digest else None
+    seen = 0
+    carry = b""
+    fd = os.open(output_path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+    try:
+        with open(input_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for block_start in range(start, end, block_size):
+                text = mm[block_start:min(block_start + block_size, end)].translate(None, _WHITESPACE)
+                seen += len(text)
+                if lead:
+                    dropped = min(lead, len(text))
+                    text = text[dropped:]
+                    lead -= dropped
+                text = carry + text
+                aligned = len(text) - len(text) % text_group
+                data = codec.decode(text[:aligned])
+                carry = text[aligned:]
+                if digest:
+                    digest.update(data)
+                _write_at(fd, out_offset, data)
+                out_offset += len(data)
+
+            # Complete the last group from the start of the next range
+            position = end
+            needed = -len(carry) % text_group if carry else 0
+            while needed and position < len(mm):
+                extra = mm[position:position + _BOUNDARY_PROBE].translate(None, _WHITESPACE)[:needed]
+                carry += extra
+                needed -= len(extra)
+                position += _BOUNDARY_PROBE
+        if needed and codec.padded:
+            raise binascii.Error(f"input length is not a multiple of {text_group}")
+        if carry:
+            data = codec.decode(carry)
+            if digest:
+                digest.update(data)
+            _write_at(fd, out_offset, data)
+    finally:
+        os.close(fd)
+
+    if char_count is not None and seen != char_count:
+        raise _LayoutMismatch(start)
+    if digest and digest.hexdigest() != expected_digest:
+        raise integrity.IntegrityError(f"decoded bytes from offset {(char_index + text_group - 1) // text_group * raw_group} "
+                                       f"do not match the manifest")
+    return seen
+
+def _preallocate(input_path, output_path, input_size, total_chars, manifest=None, codec=textcodec.BASE64):
+    """
+    Creates output_path at the decoded size implied by total_chars and the input's
+    padding, after checking that size against the manifest if there is one.
+    """
+    tail = b""
+    if total_chars:
+        with open(input_path, 'rb') as f:
+            f.seek(max(0, input_size - 4096))
+            tail = f.read().translate(None, _WHITESPACE)
+    output_size = codec.decoded_size(total_chars, tail)
+    if manifest and output_size != manifest["size"]:
+        raise integrity.IntegrityError(f"input decodes to {output_size} bytes but the manifest records {manifest['size']}")
+    with open(output_path, 'wb') as f:
+        f.truncate(output_size)
+
+def decode_file_parallel(input_path, output_path, max_workers=None, chunk_size=PARALLEL_CHUNK_SIZE, manifest=None):
+    """
+    Decodes a Base64 text file (or one in another codec, named by its header)
+    using all cores, in bounded memory.
+
+    The input is memory-mapped and cut into ranges of whole character groups, and
+    each range is decoded by a pool worker that writes its bytes straight to their
+    offset in the preallocated output with a positional write. Range positions are
+    predicted from the first line's length, which holds for everything this module
+    writes (unwrapped, or wrapped with LF or CRLF). Each worker checks the
+    prediction against its range; if any range disagrees (irregular whitespace), a
+    counting pass places byte ranges exactly and the whole output is decoded again.
+
+    With a manifest, ranges are cut on its block boundaries so each worker checks
+    its block's SHA-256 as it finishes, and decoding stops at the first mismatch.
+    (Input with irregular whitespace is checked by reading the output once more.)
+
+    Args:
+        input_path (str): The Base64 .txt file to decode.
+        output_path (str): The binary file (e.g., a ZIP archive) to create.
+        max_workers (int, optional): Decoding processes; defaults to the CPU count.
+                                     With one worker, ranges are decoded in-process.
+        chunk_size (int): Input characters per task (without a manifest).
+        manifest (dict, optional): Integrity manifest written at encode time.
+
+    Returns:
+        bool: True on success, False if the input is not valid Base64, does not match
+              the manifest, or I/O failed.
+    """
+    pool = None
+    codec = textcodec.BASE64
+    try:
+        input_size = os.path.getsize(input_path)
+        codec, header_size = textcodec.detect(input_path)
+        raw_group, text_group = codec.raw_group, codec.text_group
+        line_chars, eol_size = _detect_layout(input_path, header_size)
+        text_end = _text_end(input_path, input_size)
+        total_chars = _predict_chars(max(0, text_end - header_size), line_chars, eol_size)
+
+        # 1. --- Cut Group-Aligned Ranges From the Predicted Line Layout ---
+        if manifest:
+            chunk_chars = manifest["block_size"] // raw_group * text_group
+        else:
+            chunk_chars = max(text_group, chunk_size - chunk_size % text_group)
+        char_starts = list(range(0, total_chars, chunk_chars))
+        char_counts = [min(chunk_chars, total_chars - c) for c in char_starts]
+        starts = [header_size + c + (c // line_chars * eol_size if line_chars else 0) for c in char_starts]
+        ends = starts[1:] + [input_size]
+        expected = list(manifest["blocks"]) if manifest else [None] * len(starts)
+        if manifest and len(expected) != len(starts):
+            expected = [None] * len(starts) # Size mismatch; _preallocate reports it
+
+        max_workers = min(max_workers or os.cpu_count() or 1, max(1, len(starts)))
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        run = pool.map if pool else map
+        paths = lambda count: ([input_path] * count, [output_path] * count)
+        codecs = lambda count: [codec.name] * count
+
+        try:
+            if codec.valid_length(total_chars):
+                # A size that disagrees with the manifest may just be a wrong layout guess
+                _preallocate(input_path, output_path, input_size, total_chars, codec=codec)
+                if manifest and os.path.getsize(output_path) != manifest["size"]:
+                    raise _LayoutMismatch(0)
+                for _ in run(_decode_range, *paths(len(starts)), starts, ends, char_starts, char_counts, expected,
+                             codecs(len(starts))):
+                    pass
+                return True
+        except _LayoutMismatch:
+            pass
+
+        # 2. --- Irregular Whitespace: Count Characters, Then Decode ---
+        starts = list(range(header_size, input_size, chunk_size))
+        ends = starts[1:] + [input_size]
+        counts = list(run(_count_chars, paths(len(starts))[0], starts, ends))
+        _preallocate(input_path, output_path, input_size, sum(counts), manifest, codec)
+        char_indexes = list(itertools.accumulate([0] + counts[:-1]))
+        nones = [None] * len(starts)
+        for _ in run(_decode_range, *paths(len(starts)), starts, ends, char_indexes, nones, nones, codecs(len(starts))):
+            pass
+        if manifest:
+            integrity.verify_file(output_path, manifest)
+        return True
+
+    except integrity.IntegrityError as e:
+        print(utilities.color(f"[ERROR] {input_path} failed its integrity check: {e}", "RED"))
+        return False
+    except binascii.Error as e:
+        print(utilities.color(f"[ERROR] {input_path} is not valid {codec.label}: {e}", "RED"))
+        return False
+    except ValueError as e: # Unknown codec in the header
+        print(utilities.color(f"[ERROR] {input_path}: {e}", "RED"))
+        return False
+    except OSError as e:
+        print(utilities.color(f"[ERROR] {codec.label} decoding of {input_path} failed: {e}", "RED"))
+        return False
+    finally:
+        if pool:
+            # Drop queued ranges after a failure instead of decoding them anyway
+            pool.shutdown(cancel_futures=True)
+
+# ==============================================================================
+# --- Random Access ---
+# ==============================================================================
+
+class EncodedReader(io.RawIOBase):
+    """
+    A read-only, seekable file of the data encoded in a text file, decoding only
+    the character groups each read covers.
+
+    Byte offsets map to file offsets by arithmetic, from the codec's group sizes
+    and the line layout of the first line (as in decode_file_parallel), so a read
+    anywhere in a file of any size costs a seek and a read of about 4/3 of the
+    bytes returned. Wrap it in io.BufferedReader when reads are small (zipfile
+    reads headers a few bytes at a time).
+
+    Input with irregular line wrapping (e.g. re-wrapped by an editor) cannot be
+    mapped this way and is rejected when opened; decode it in full instead.
+    """
+
+    def __init__(self, input_path, size=None, header_size=None, codec=None, block_size=DECODE_BLOCK_SIZE):
+        """
+        Args:
+            input_path (str): Text file written by this module (or one part of a split set).
+            size (int, optional): Decoded size, if known (part headers record it);
+                                  otherwise worked out from the end of the text.
+            header_size (int, optional): Bytes before the text, if known (e.g. a part
+                                         header's size); otherwise the codec header
+                                         is read to find it.
+            codec (textcodec.Codec or str, optional): The text's codec. With
+                                                      header_size given, None means
+                                                      Base64; otherwise the codec
+                                                      header decides.
+            block_size (int): Most characters decoded per read.
+
+        Raises:
+            ValueError: If the codec header is unknown, or the text's length does not
+                        fit its first line's layout.
+        """
+        super().__init__()
+        self.input_path = input_path
+        if header_size is None:
+            detected, header_size = textcodec.detect(input_path)
+            codec = codec or detected
+        self.codec = textcodec.get_codec(codec)
+        self._header_size = header_size
+        self._line_chars, self._eol_size = _detect_layout(input_path, header_size)
+        self._block_bytes = max(1, block_size // self.codec.text_group) * self.codec.raw_group
+        self._position = 0
+        self.text_bytes_read = 0
+
+        # Characters in the whole text, from where the last one sits
+        text_end = _text_end(input_path, os.path.getsize(input_path))
+        self._total_chars = _predict_chars(max(0, text_end - header_size), self._line_chars, self._eol_size)
+        self._file = open(input_path, 'rb')
+        try:
+            if size is None:
+                if not self.codec.valid_length(self._total_chars):
+                    raise ValueError("irregular line wrapping")
+                self._file.seek(max(header_size, text_end - 8))
+                size = self.codec.decoded_size(self._total_chars, self._file.read(text_end - self._file.tell()))
+            elif self.codec.encoded_size(size) != self._total_chars:
+                raise ValueError("irregular line wrapping")
+        except (ValueError, binascii.Error) as e:
+            self._file.close()
+            raise ValueError(f"{input_path} cannot be read at random ({e}); decode it in full instead")
+        self.size = size
+
+    def _file_offset(self, char_index):
+        if not self._line_chars:
+            return self._header_size + char_index
+        return self._header_size + char_index + char_index // self._line_chars * self._eol_size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def readinto(self, b):
+        """Decodes up to len(b) bytes (at most one block) at the current position into b."""
+        count = min(len(b), self.size - self._position, self._block_bytes)
+        if count <= 0:
+            return 0
+        raw_group, text_group = self.codec.raw_group, self.codec.text_group
+        first_group = self._position // raw_group
+        char_start = first_group * text_group
+        char_end = min(-(-(self._position + count) // raw_group) * text_group, self._total_chars)
+        start = self._file_offset(char_start)
+        self._file.seek(start)
+        raw_text = self._file.read(self._file_offset(char_end) - start)
+        self.text_bytes_read += len(raw_text)
+        text = raw_text.translate(None, _WHITESPACE)
+        if len(text) != char_end - char_start:
+            raise binascii.Error(f"{self.input_path} has irregular line wrapping near offset {start}")
+        skip = self._position - first_group * raw_group
+        data = self.codec.decode(text)[skip:skip + count]
+        if len(data) != count:
+            raise binascii.Error(f"{self.input_path} ends before offset {self._position + count}")
+        b[:count] = data
+        self._position += count
+        return count
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
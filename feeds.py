@@ -0,0 +1,478 @@
+# ==============================================================================
+# WHALE-PUUP Feeds Module (feeds.py)
+# Where NuGet mode gets packages and their metadata from: nuget.org (the
+# default), any NuGet v3 feed (its service index, or just its flat container),
+# a v2 endpoint, or a local folder of .nupkg files read straight from disk.
+# Metadata documents are kept on disk with their ETag and revalidated with
+# If-None-Match, so an index that has not changed costs one 304 response.
+# ==============================================================================
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import zipfile
+import xml.etree.ElementTree as ElementTree
+import utilities
+
+# --- Configuration ---
+NUGET_ORG_PACKAGE_URL = "https://www.nuget.org/api/v2/package/"
+# V3 registration base URL; '<id-lowercase>/index.json' is appended.
+NUGET_ORG_REGISTRATION_URL = "https://api.nuget.org/v3/registration5-gz-semver2/"
+# Feed used when none is given (a folder or URL, as for --feed). Unset means nuget.org.
+DEFAULT_FEED = os.environ.get("WHALE_PUUP_FEED") or None
+# Metadata cache location can be overridden with WHALE_PUUP_METADATA_DIR.
+DEFAULT_METADATA_DIR = os.environ.get(
+    "WHALE_PUUP_METADATA_DIR",
+    os.path.join(os.path.expanduser("~"), ".whale_puup", "metadata_cache")
+)
+REQUEST_TIMEOUT_SECONDS = 30
+
+# Service index resource types, most preferred first
+PACKAGE_BASE_TYPES = ("PackageBaseAddress/3.0.0",)
+REGISTRATION_TYPES = ("RegistrationsBaseUrl/3.6.0", "RegistrationsBaseUrl/3.4.0", "RegistrationsBaseUrl/3.0.0-rc",
+                      "RegistrationsBaseUrl")
+PACKAGE_SUFFIX = ".nupkg"
+HASH_SUFFIX = ".nupkg.sha512" # Written next to each package by 'nuget add' (Base64 SHA-512)
+
+def normalize_version(version):
+    """
+    Returns NuGet's normalized form of a version, lowercased as flat-container paths
+    are: '1.0' -> '1.0.0', '1.0.0.0' -> '1.0.0', '2.1.0-Beta+build5' -> '2.1.0-beta'.
+    """
+    version = version.strip().split('+')[0]
+    core, dash, prerelease = version.partition('-')
+    try:
+        numbers = [str(int(n)) for n in core.split('.')]
+    except ValueError:
+        return version.lower() # Not a version NuGet would normalize; compare as given
+    numbers = (numbers + ["0", "0"])[:max(3, len(numbers))]
+    if len(numbers) == 4 and numbers[3] == "0":
+        numbers = numbers[:3]
+    return '.'.join(numbers) + (dash + prerelease).lower()
+
+def latest_version(versions):
+    """Returns the latest stable version in versions (the latest prerelease if none is stable), or None."""
+    import resolver # resolver imports this module; its version ordering is only needed here
+    versions = sorted(versions, key=resolver.version_key)
+    stable = [v for v in versions if not resolver.is_prerelease(v)]
+    return (stable or versions or [None])[-1]
+
+def read_nuspec(zip_ref):
+    """Returns the raw .nuspec at the root of an open .nupkg, or None if absent."""
+    for name in zip_ref.namelist():
+        if name.endswith('.nuspec') and '/' not in name:
+            return zip_ref.read(name)
+    return None
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1] # Nuspecs use several schema namespaces; match on local names
+
+def catalog_entry_from_nuspec(nuspec):
+    """
+    Builds a registration-style catalog entry (id, version and dependencyGroups, as
+    resolver.py reads them) from the bytes of a .nuspec.
+
+    Raises:
+        ValueError: If the nuspec cannot be parsed or lacks an id or version.
+    """
+    try:
+        metadata = next(el for el in ElementTree.fromstring(nuspec).iter() if _local_name(el.tag) == "metadata")
+        fields = {_local_name(child.tag): child for child in metadata}
+        package_id, version = fields["id"].text.strip(), fields["version"].text.strip()
+    except (ElementTree.ParseError, StopIteration, KeyError, AttributeError) as e:
+        raise ValueError(f"not a valid nuspec ({e.__class__.__name__})")
+    groups = []
+    dependencies = fields.get("dependencies")
+    if dependencies is not None:
+        dependency = lambda el: {"id": el.get("id"), "range": el.get("version", "")}
+        ungrouped = []
+        for child in dependencies:
+            if _local_name(child.tag) == "group":
+                groups.append({"targetFramework": child.get("targetFramework", ""),
+                               "dependencies": [dependency(d) for d in child if _local_name(d.tag) == "dependency"]})
+            elif _local_name(child.tag) == "dependency":
+                ungrouped.append(dependency(child))
+        if ungrouped:
+            groups.append({"targetFramework": "", "dependencies": ungrouped})
+    return {"id": package_id, "version": version, "dependencyGroups": groups}
+
+def read_registration(index_url, fetch):
+    """
+    Reads every listed version's catalog entry from a V3 registration index,
+    following pages that are kept out of line (as for large packages).
+
+    Args:
+        index_url (str): The package's registration index.
+        fetch (callable): fetch(url) returns the document's bytes.
+
+    Returns:
+        dict: Version -> catalog entry.
+    """
+    index = json.loads(fetch(index_url))
+    entries = {}
+    for page in index.get("items", []):
+        leaves = page.get("items")
+        if leaves is None: # Large packages keep their pages out of line
+            leaves = json.loads(fetch(page["@id"])).get("items", [])
+        for leaf in leaves:
+            entry = leaf["catalogEntry"]
+            if entry.get("listed", True):
+                entries[entry["version"]] = entry
+    return entries
+
+# ==============================================================================
+# --- Metadata Cache ---
+# ==============================================================================
+
+class MetadataCache:
+    """
+    On-disk cache of feed metadata documents (service indexes, version lists,
+    registration pages), one file per URL holding a JSON header line (URL, ETag,
+    Last-Modified) followed by the body.
+
+    Every lookup still asks the feed, but with If-None-Match / If-Modified-Since,
+    so a document that has not changed comes back as an empty 304 and is read from
+    disk. A cached copy is therefore never stale.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_METADATA_DIR, timeout=REQUEST_TIMEOUT_SECONDS):
+        """
+        Args:
+            cache_dir (str): Directory of cached documents (created if missing).
+            timeout (float): Seconds to wait for each response.
+        """
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+
+        # --- Counters for the current run ---
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_fetched = 0
+        self.bytes_reused = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _load(self, path, url):
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return (header, body) if header.get("url") == url else (None, None)
+
+    def _store(self, path, url, etag, last_modified, body):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps({"url": url, "etag": etag, "last_modified": last_modified}).encode('utf-8') + b"\n")
+            f.write(body)
+        os.replace(temp_path, path)
+
+    def get(self, session, url):
+        """
+        Returns the body of url, revalidating a cached copy if there is one.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails or the feed
+                                                  answers with an error status.
+        """
+        path = self._path(url)
+        header, body = self._load(path, url)
+        headers = {}
+        if header:
+            if header.get("etag"):
+                headers["If-None-Match"] = header["etag"]
+            if header.get("last_modified"):
+                headers["If-Modified-Since"] = header["last_modified"]
+
+        response = session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and body is not None:
+            with self._lock:
+                self.requests += 1
+                self.not_modified += 1
+                self.bytes_reused += len(body)
+            return body
+        response.raise_for_status()
+        body = response.content
+        with self._lock:
+            self.requests += 1
+            self.bytes_fetched += len(body)
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if etag or last_modified: # Without a validator the copy could never be revalidated
+            self._store(path, url, etag, last_modified, body)
+        return body
+
+    def report(self):
+        """Prints the request/304/bytes counters for this run."""
+        print(utilities.color(
+            f"[FEED] {self.requests} metadata request(s), {self.not_modified} unchanged (304); "
+            f"{self.bytes_fetched / 1024:.0f} KB fetched, {self.bytes_reused / 1024:.0f} KB reused from the "
+            f"metadata cache.", "BLUE"))
+
+# ==============================================================================
+# --- Feeds ---
+# ==============================================================================
+
+class Feed:
+    """
+    A source of packages and their metadata.
+
+    HTTP feeds give the URL a package is downloaded from (package_url); local feeds
+    give its path on disk instead (package_path). Either way, registration returns
+    the catalog entries the dependency resolver reads. Methods that need metadata
+    take fetch, a callable fetch(url) returning a document's bytes (see
+    Feed.fetch), so callers decide how requests are made and counted.
+    """
+
+    local = False
+
+    def __init__(self, label, metadata=None):
+        """
+        Args:
+            label (str): Display name for messages.
+            metadata (MetadataCache, optional): Cache that metadata requests revalidate.
+        """
+        self.label = label
+        self.metadata = metadata
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.label!r})"
+
+    def fetch(self, session, url):
+        """Returns the bytes of a metadata document, through the metadata cache if there is one."""
+        if self.metadata is not None:
+            return self.metadata.get(session, url)
+        response = session.get(url, timeout=REQUEST_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.content
+
+    def registration(self, package_id, fetch):
+        """
+        Returns {version: catalog entry} for every listed version of a package.
+
+        Raises:
+            ValueError: If the feed has no metadata for the package.
+            requests.exceptions.RequestException: If fetching it fails.
+        """
+        raise NotImplementedError
+
+    def package_url(self, package_id, version, fetch):
+        """Returns the download URL of a package version (the latest if version is None)."""
+        raise NotImplementedError
+
+    def package_path(self, package_id, version):
+        """Returns the path of a package version in a local feed (the latest if version is None), or None."""
+        raise NotImplementedError
+
+class V2Feed(Feed):
+    """
+    A NuGet v2 download endpoint ('<url><id>/<version>', which resolves the latest
+    version itself when none is given), with an optional V3 registration base for
+    metadata. nuget.org is served this way by default.
+    """
+
+    def __init__(self, package_url, registration_url=None, metadata=None):
+        super().__init__(package_url, metadata)
+        self.base_url = package_url
+        self.registration_url = registration_url
+
+    def registration(self, package_id, fetch):
+        if not self.registration_url:
+            raise ValueError(f"{self.label} publishes no registration metadata")
+        return read_registration(f"{self.registration_url}{package_id.lower()}/index.json", fetch)
+
+    def package_url(self, package_id, version, fetch):
+        return f"{self.base_url}{package_id}" + (f"/{version}" if version else "")
+
+class V3Feed(Feed):
+    """
+    A NuGet v3 feed. Packages are downloaded from its flat container
+    (PackageBaseAddress: '<base><id>/<version>/<id>.<version>.nupkg', with
+    '<base><id>/index.json' listing the versions) and metadata is read from its
+    registration resource. Given a service index, both are looked up there on
+    first use; given only a flat-container URL, packages still download but the
+    feed has no registration metadata.
+    """
+
+    def __init__(self, service_index_url=None, package_base_url=None, registration_url=None, metadata=None):
+        """
+        Args:
+            service_index_url (str, optional): The feed's '.../index.json'.
+            package_base_url (str, optional): Flat-container base URL, if known.
+            registration_url (str, optional): Registration base URL, if known.
+            metadata (MetadataCache, optional): Cache that metadata requests revalidate.
+        """
+        super().__init__(service_index_url or package_base_url, metadata)
+        self.service_index_url = service_index_url
+        self._package_base_url = _with_slash(package_base_url)
+        self._registration_url = _with_slash(registration_url)
+        self._discovered = not service_index_url
+        self._lock = threading.Lock()
+
+    def _discover(self, fetch):
+        """Reads the flat-container and registration base URLs from the service index, once."""
+        with self._lock:
+            if self._discovered:
+                return
+            resources = {}
+            for resource in json.loads(fetch(self.service_index_url)).get("resources", []):
+                types = resource.get("@type", [])
+                for resource_type in [types] if isinstance(types, str) else types:
+                    resources.setdefault(resource_type, resource.get("@id"))
+            self._package_base_url = self._package_base_url or _with_slash(
+                next((resources[t] for t in PACKAGE_BASE_TYPES if t in resources), None))
+            self._registration_url = self._registration_url or _with_slash(
+                next((resources[t] for t in REGISTRATION_TYPES if t in resources), None))
+            if not self._package_base_url:
+                raise ValueError(f"{self.label} lists no PackageBaseAddress (flat container) resource")
+            self._discovered = True
+
+    def versions(self, package_id, fetch):
+        """Returns every version in the flat container's version list (normalized, lowercase)."""
+        self._discover(fetch)
+        return json.loads(fetch(f"{self._package_base_url}{package_id.lower()}/index.json")).get("versions", [])
+
+    def registration(self, package_id, fetch):
+        self._discover(fetch)
+        if not self._registration_url:
+            raise ValueError(f"{self.label} publishes no registration metadata")
+        return read_registration(f"{self._registration_url}{package_id.lower()}/index.json", fetch)
+
+    def package_url(self, package_id, version, fetch):
+        self._discover(fetch)
+        lower = package_id.lower()
+        if version is None:
+            version = latest_version(self.versions(package_id, fetch))
+            if version is None:
+                raise ValueError(f"{self.label} has no versions of {package_id}")
+        version = normalize_version(version)
+        return f"{self._package_base_url}{lower}/{version}/{lower}.{version}{PACKAGE_SUFFIX}"
+
+class FolderFeed(Feed):
+    """
+    A folder of .nupkg files, read straight from disk. Both common layouts work:
+    packages side by side ('<id>.<version>.nupkg') and the hierarchical layout
+    'nuget add' writes ('<id>/<version>/<id>.<version>.nupkg', whose .sha512 file
+    is published as the package's hash). Metadata comes from each package's nuspec.
+    """
+
+    local = True
+
+    def __init__(self, folder):
+        folder = os.path.abspath(os.path.expanduser(folder))
+        super().__init__(folder)
+        self.folder = folder
+        self._packages = None # id-lowercase -> {version: path}
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        """Indexes the folder's packages by ID and version, once."""
+        with self._lock:
+            if self._packages is not None:
+                return self._packages
+            packages = {}
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(PACKAGE_SUFFIX) \
+                            and not entry.name.lower().endswith(".symbols" + PACKAGE_SUFFIX):
+                        split = _split_package_name(entry.name[:-len(PACKAGE_SUFFIX)])
+                        if split:
+                            packages.setdefault(split[0].lower(), {})[split[1]] = entry.path
+                    elif entry.is_dir():
+                        with os.scandir(entry.path) as versions:
+                            for version_dir in versions:
+                                path = os.path.join(version_dir.path, f"{entry.name}.{version_dir.name}{PACKAGE_SUFFIX}")
+                                if version_dir.is_dir() and os.path.isfile(path):
+                                    packages.setdefault(entry.name.lower(), {})[version_dir.name] = path
+            self._packages = packages
+            return packages
+
+    def _versions(self, package_id):
+        versions = self._scan().get(package_id.lower())
+        if not versions:
+            raise ValueError(f"{package_id} is not in {self.label}")
+        return versions
+
+    def versions(self, package_id, fetch=None):
+        """Returns every version of a package in the folder (empty if there is none)."""
+        return list(self._scan().get(package_id.lower(), {}))
+
+    def registration(self, package_id, fetch=None):
+        entries = {}
+        for path in self._versions(package_id).values():
+            try:
+                with zipfile.ZipFile(path) as zip_ref:
+                    entry = catalog_entry_from_nuspec(read_nuspec(zip_ref) or b"")
+            except (OSError, zipfile.BadZipFile, ValueError) as e:
+                raise ValueError(f"{path} is not a readable package ({e})")
+            hash_path = path[:-len(PACKAGE_SUFFIX)] + HASH_SUFFIX
+            if os.path.isfile(hash_path):
+                with open(hash_path, 'r') as f:
+                    entry["packageHash"] = f.read().strip()
+            entries[entry["version"]] = entry
+        return entries
+
+    def package_path(self, package_id, version):
+        try:
+            versions = self._versions(package_id)
+        except ValueError:
+            return None
+        if version is None:
+            return versions[latest_version(versions)]
+        wanted = normalize_version(version)
+        return next((path for v, path in versions.items() if normalize_version(v) == wanted), None)
+
+def _with_slash(url):
+    return url if not url or url.endswith('/') else url + '/'
+
+def _split_package_name(stem):
+    """Splits '<id>.<version>' at the first dot that starts a version. Returns (id, version) or None."""
+    parts = stem.split('.')
+    for i in range(1, len(parts)):
+        version = '.'.join(parts[i:])
+        if parts[i].isdigit() and all(p.isdigit() for p in version.split('-')[0].split('+')[0].split('.')):
+            return '.'.join(parts[:i]), version
+    return None
+
+def get_feed(feed=None, metadata=None):
+    """
+    Returns a Feed for a feed object, a source string, or None (DEFAULT_FEED, or nuget.org).
+
+    Source strings are read as: 'nuget.org'; a folder (or file:// URL) of .nupkg
+    files; an http(s) URL ending in '.json', taken as a v3 service index; a URL
+    containing '/api/v2', taken as a v2 endpoint; any other http(s) URL, taken as
+    a v3 flat container.
+
+    Args:
+        feed (Feed or str, optional): The feed or its source.
+        metadata (MetadataCache, optional): Cache for the new feed's metadata requests.
+
+    Raises:
+        ValueError: If the source is neither a folder nor a URL.
+    """
+    if isinstance(feed, Feed):
+        return feed
+    source = (feed or DEFAULT_FEED or "nuget.org").strip()
+    if source.lower() == "nuget.org":
+        return V2Feed(NUGET_ORG_PACKAGE_URL, NUGET_ORG_REGISTRATION_URL, metadata)
+    if source.startswith("file://"):
+        source = source[len("file://"):]
+    if source.startswith(("http://", "https://")):
+        if source.split('?')[0].endswith(".json"):
+            return V3Feed(service_index_url=source, metadata=metadata)
+        if "/api/v2" in source:
+            base = _with_slash(source)
+            return V2Feed(base if base.endswith("/package/") else base + "package/", metadata=metadata)
+        return V3Feed(package_base_url=source, metadata=metadata)
+    if os.path.isdir(os.path.expanduser(source)):
+        return FolderFeed(source)
+    raise ValueError(f"Unknown feed '{source}' (use nuget.org, a folder of .nupkg files, "
+                     f"a v3 service index or flat-container URL, or a v2 URL)")
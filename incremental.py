@@ -0,0 +1,184 @@
+# ==============================================================================
+# WHALE-PUUP Incremental Archive Module (incremental.py)
+# Rebuilds a streamed Base64 archive of a folder, reusing the compressed bytes of
+# unchanged files from the previous run instead of recompressing them.
+# ==============================================================================
+
+import os
+import json
+import hashlib
+import zipfile
+import encoder
+import integrity
+import scanner
+import utilities
+import zipwriter
+
+# --- Configuration ---
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def manifest_path_for(base64_output_path):
+    """Returns the manifest path that sits next to a .base64.txt output file."""
+    base = base64_output_path
+    for suffix in (".txt", ".base64"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return base + MANIFEST_SUFFIX
+
+def _sha256_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path, base64_path):
+    """
+    Loads the previous run's manifest if it still describes base64_path.
+
+    The manifest records the size, mtime and line wrapping of the Base64 file it was
+    written with; if that file has been replaced or edited since, its recorded offsets
+    can't be trusted and an empty manifest is returned, which forces a full rebuild.
+
+    Returns:
+        dict: arcname -> member record, or {} if there is no usable manifest.
+    """
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        st = os.stat(base64_path)
+    except (OSError, ValueError):
+        return {}
+
+    if (manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("line_length") != encoder.DEFAULT_LINE_LENGTH
+            or manifest.get("base64_size") != st.st_size
+            or manifest.get("base64_mtime_ns") != st.st_mtime_ns):
+        return {}
+    return manifest.get("members", {})
+
+def archive_incremental(source_dir, base64_output_path, max_workers=None, policy=None, codec=None, scan_rules=None):
+    """
+    Archives source_dir into base64_output_path, recompressing only what changed.
+
+    A file is reused when its size and mtime match the manifest, or when its size
+    matches and its SHA-256 still does (e.g. it was only touched). Reused members
+    are copied from the previous Base64 file by decoding just their byte range.
+    New and changed files are compressed in parallel; deleted files are dropped.
+    The new manifest is written next to the output once the archive is complete,
+    along with the integrity manifest of the archive bytes.
+
+    Args:
+        source_dir (str): The folder to archive.
+        base64_output_path (str): The .base64.txt file to create or update.
+        max_workers (int, optional): Compression processes; defaults to the CPU count.
+        policy (compression.CompressionPolicy or str, optional): For new and changed
+                                                                 files; reused members
+                                                                 keep their method.
+        codec (str, optional): A textcodec.CODECS name for the output; Base64 if None.
+                               Members are reused whatever codec the previous
+                               output was written in.
+        scan_rules (scanner.ScanRules, optional): Paths to leave out; files that were
+                                                  archived before and are now excluded
+                                                  count as deleted.
+
+    Returns:
+        dict: Work counters (reused/compressed/deleted files and bytes, files hashed)
+              and the archive size in archive_bytes.
+    """
+    manifest_path = manifest_path_for(base64_output_path)
+    previous = load_manifest(manifest_path, base64_output_path)
+    line_length = encoder.DEFAULT_LINE_LENGTH
+    previous_path = base64_output_path + ".prev"
+
+    stats = {"reused_files": 0, "reused_bytes": 0, "compressed_files": 0, "compressed_bytes": 0,
+             "deleted_files": 0, "hashed_files": 0}
+    members = scanner.collect_members(source_dir, scan_rules)
+    mtimes_by_arcname = {}
+    reuse = {}
+
+    # 1. --- Decide Which Members Can Be Reused ---
+    for member in members:
+        if member.is_dir:
+            continue
+        # The scanner already stat'ed every file; only members listed some other way need it
+        mtime_ns = member.mtime_ns if member.mtime_ns is not None else os.stat(member.path).st_mtime_ns
+        mtimes_by_arcname[member.arcname] = mtime_ns
+        entry = previous.get(member.arcname)
+        if not entry or entry["size"] != member.size:
+            continue
+        if entry["mtime_ns"] != mtime_ns:
+            stats["hashed_files"] += 1
+            if _sha256_file(member.path) != entry["sha256"]:
+                continue
+
+        compressed = zipwriter.CompressedFile(entry["crc"], entry["size"], entry["compress_size"], None, None,
+                                              entry["sha256"], entry.get("compress_type", zipfile.ZIP_DEFLATED))
+        payload_writer = (lambda out, e=entry: encoder.copy_base64_range(
+            previous_path, e["data_offset"], e["compress_size"], out, line_length))
+        reuse[member.arcname] = (compressed, payload_writer)
+
+    stats["deleted_files"] = len(set(previous) - set(mtimes_by_arcname))
+
+    # 2. --- Write the New Archive ---
+    new_members = {}
+
+    def on_written(member, zinfo, compressed, data_offset):
+        kind = "reused" if member.arcname in reuse else "compressed"
+        stats[f"{kind}_files"] += 1
+        stats[f"{kind}_bytes"] += compressed.file_size
+        new_members[member.arcname] = {
+            "size": compressed.file_size,
+            "mtime_ns": mtimes_by_arcname[member.arcname],
+            "sha256": compressed.sha256,
+            "crc": compressed.crc,
+            "compress_size": compressed.compress_size,
+            "compress_type": compressed.compress_type,
+            "data_offset": data_offset,
+        }
+
+    # The previous output is moved aside so reused members can be read from it
+    # while the new file is written under the final name.
+    if reuse:
+        os.replace(base64_output_path, previous_path)
+    hasher = integrity.BlockHasher()
+    try:
+        with encoder.Base64StreamWriter(base64_output_path, line_length=line_length, hasher=hasher,
+                                        codec=codec) as b64_stream:
+            zipwriter.write_zip_parallel(members, b64_stream, max_workers, policy,
+                                         reuse=reuse, on_written=on_written)
+    except Exception:
+        if reuse:
+            os.replace(previous_path, base64_output_path)
+        raise
+    if reuse:
+        os.remove(previous_path)
+
+    stats["archive_bytes"] = hasher.size
+
+    # 3. --- Record the Manifest for the Next Run ---
+    integrity.write_manifest(integrity.manifest_path_for(base64_output_path), hasher, base64_output_path)
+    st = os.stat(base64_output_path)
+    with open(manifest_path, 'w') as f:
+        json.dump({
+            "version": MANIFEST_VERSION,
+            "base64_size": st.st_size,
+            "base64_mtime_ns": st.st_mtime_ns,
+            "line_length": line_length,
+            "members": new_members,
+        }, f, indent=1)
+
+    return stats
+
+def print_report(stats):
+    """Prints how much compression work an incremental run skipped."""
+    total_files = stats["reused_files"] + stats["compressed_files"]
+    total_bytes = stats["reused_bytes"] + stats["compressed_bytes"]
+    skipped = (stats["reused_bytes"] / total_bytes * 100) if total_bytes else 0.0
+    print(utilities.color(
+        f"[INCREMENTAL] Reused {stats['reused_files']} of {total_files} file(s) "
+        f"({stats['reused_bytes'] / (1024 * 1024):.1f} MB not recompressed, {skipped:.0f}% of input skipped); "
+        f"compressed {stats['compressed_files']} new/changed, dropped {stats['deleted_files']} deleted, "
+        f"re-hashed {stats['hashed_files']} touched.", "BLUE"))
@@ -0,0 +1,150 @@
+# ==============================================================================
+# WHALE-PUUP Integrity Module (integrity.py)
+# Block hashes computed while an archive is encoded, the sidecar manifest they
+# are stored in, and the checks applied while it is decoded. Also compares
+# downloaded packages with NuGet's published SHA-512.
+# ==============================================================================
+
+import os
+import json
+import base64
+import hashlib
+
+# --- Configuration ---
+MANIFEST_SUFFIX = ".integrity.json"
+MANIFEST_VERSION = 1
+# Archive bytes covered by each block hash. A multiple of 3 and 4, so every block
+# starts on a Base64 (and Base85) group boundary (BLOCK_SIZE // 3 * 4 characters
+# per block in Base64) and a decoder can check each block as soon as it has written it.
+BLOCK_SIZE = 3 * 4 * 1024 * 1024
+# Manifests whose block size is not a multiple of this cannot be checked block by
+# block (Base64 groups are 3 bytes, Base85 groups 4).
+BLOCK_ALIGNMENT = 12
+
+class IntegrityError(Exception):
+    """Raised when decoded or downloaded bytes do not match their recorded hash."""
+
+def manifest_path_for(base64_path):
+    """Returns the integrity manifest path that sits next to a .base64.txt file."""
+    base = base64_path
+    for suffix in (".txt", ".base64"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return base + MANIFEST_SUFFIX
+
+class BlockHasher:
+    """
+    Hashes a byte stream in fixed-size blocks as it is written or decoded.
+
+    Data may arrive in pieces of any size; they are split at block boundaries.
+    When expected digests are given, each block is checked the moment it is
+    complete, so a mismatch is reported without waiting for the rest of the data.
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE, expected=None, first_block=0):
+        """
+        Args:
+            block_size (int): Bytes per block.
+            expected (list, optional): Hex SHA-256 digests to check blocks against.
+            first_block (int): Index of the first block this hasher sees (for hashers
+                               that cover only part of a stream).
+        """
+        self.block_size = block_size
+        self.expected = expected
+        self.digests = []
+        self.size = 0
+        self._index = first_block
+        self._hash = hashlib.sha256()
+        self._filled = 0
+
+    def update(self, data):
+        view = memoryview(data)
+        while view:
+            take = min(self.block_size - self._filled, len(view))
+            self._hash.update(view[:take])
+            self._filled += take
+            self.size += take
+            view = view[take:]
+            if self._filled == self.block_size:
+                self._close_block()
+
+    def _close_block(self):
+        digest = self._hash.hexdigest()
+        if self.expected is not None:
+            if self._index >= len(self.expected) or self.expected[self._index] != digest:
+                raise IntegrityError(f"block {self._index} (bytes {self._index * self.block_size}-"
+                                     f"{self._index * self.block_size + self._filled - 1}) does not match the manifest")
+        self.digests.append(digest)
+        self._index += 1
+        self._hash = hashlib.sha256()
+        self._filled = 0
+
+    def finish(self):
+        """Closes the final partial block. Returns the list of hex digests."""
+        if self._filled:
+            self._close_block()
+        return self.digests
+
+def write_manifest(manifest_path, hasher, base64_path):
+    """Records a finished BlockHasher's digests and sizes next to the Base64 file."""
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "algorithm": "sha256",
+        "block_size": hasher.block_size,
+        "size": hasher.size,
+        "blocks": hasher.finish(),
+        "base64_size": os.path.getsize(base64_path),
+    }
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temp_path, manifest_path)
+    return manifest
+
+def load_manifest(manifest_path):
+    """
+    Loads an integrity manifest.
+
+    Returns:
+        dict or None: The manifest, or None if there is none.
+
+    Raises:
+        IntegrityError: If the manifest exists but cannot be used.
+    """
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        raise IntegrityError(f"Integrity manifest {manifest_path} is unreadable: {e}")
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("algorithm") != "sha256":
+        raise IntegrityError(f"Unsupported integrity manifest: {manifest_path}")
+    block_size = manifest.get("block_size")
+    if not isinstance(block_size, int) or block_size <= 0 or block_size % BLOCK_ALIGNMENT:
+        raise IntegrityError(f"Unsupported integrity manifest (block size {block_size!r} is not "
+                             f"a positive multiple of {BLOCK_ALIGNMENT}): {manifest_path}")
+    return manifest
+
+def verify_file(file_path, manifest, read_size=1024 * 1024):
+    """Checks a complete file against a manifest by reading it once. Raises IntegrityError."""
+    hasher = BlockHasher(manifest["block_size"], manifest["blocks"])
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(read_size), b''):
+            hasher.update(chunk)
+    check_complete(hasher, manifest)
+
+def check_complete(hasher, manifest):
+    """Finishes a BlockHasher that saw a whole stream and checks its total size."""
+    hasher.finish()
+    if hasher.size != manifest["size"]:
+        raise IntegrityError(f"decoded {hasher.size} bytes but the manifest records {manifest['size']}")
+
+def nuget_hash_matches(sha512_hex, expected_hash):
+    """
+    Compares a hex SHA-512 digest with NuGet's packageHash (Base64 of the digest).
+    """
+    try:
+        return base64.b64decode(expected_hash, validate=True).hex() == sha512_hex.lower()
+    except ValueError:
+        return False
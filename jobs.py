@@ -0,0 +1,659 @@
+# ==============================================================================
+# WHALE-PUUP Jobs Module (jobs.py)
+# Non-interactive entry points for the three modes, a batch runner for job files,
+# and the subcommand CLI used when whale-puup is started with arguments.
+# ==============================================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import concurrent.futures
+import compression
+import feeds
+import metrics
+import package_filter
+import scanner
+import textcodec
+import utilities
+# The mode modules (downloader, resolver, cache, archiver, encoder, volumes,
+# integrity, dedup) are imported by the entry points that use them, so startup
+# and decode-only runs never load requests and the HTTP stack.
+
+# --- Configuration ---
+OUTPUT_BASE_PATH = os.path.join(os.getcwd(), "final_archives")
+DEFAULT_PARALLEL_JOBS = 2
+# Same as downloader.DEFAULT_MAX_WORKERS; repeated so building the CLI does not import it.
+DEFAULT_MAX_WORKERS = 8
+MODES = ("nuget", "folder", "decode", "extract")
+FEED_HELP = ("Where packages come from: a folder of .nupkg files, a v3 service index URL (.../index.json), "
+             "a v3 flat-container URL or a v2 URL (default: nuget.org, or WHALE_PUUP_FEED).")
+
+class JobContext:
+    """
+    Resources shared by every job in one process: the pooled HTTP session, the
+    package cache, the metadata cache, and a feed and dependency resolver (with
+    its memoized metadata) per feed source. Each is created on first use, so
+    decode-only batches never open a session.
+    """
+
+    def __init__(self, use_cache=True, max_workers=DEFAULT_MAX_WORKERS, verify=True, feed=None,
+                 metadata_cache=None):
+        """
+        Args:
+            use_cache (bool): Use the local package cache.
+            max_workers (int): Concurrent downloads per job.
+            verify (bool): Check downloads against their published SHA-512.
+            feed (str, optional): Feed for nuget jobs that do not name one (see
+                                  feeds.get_feed); nuget.org if None.
+            metadata_cache (feeds.MetadataCache, optional): Metadata cache to use; one
+                                                            in the default location
+                                                            is created if omitted.
+        """
+        self.use_cache = use_cache
+        self.max_workers = max_workers
+        self.verify = verify
+        self.default_feed = feed
+        self._lock = threading.Lock()
+        self._session = None
+        self._cache = None
+        self._metadata_cache = metadata_cache
+        self._feeds = {}
+        self._resolvers = {}
+
+    @property
+    def session(self):
+        import downloader
+        with self._lock:
+            if self._session is None:
+                self._session = downloader.create_session(self.max_workers)
+            return self._session
+
+    @property
+    def cache(self):
+        if not self.use_cache:
+            return None
+        import cache
+        with self._lock:
+            if self._cache is None:
+                self._cache = cache.PackageCache()
+            return self._cache
+
+    @property
+    def metadata_cache(self):
+        with self._lock:
+            if self._metadata_cache is None:
+                self._metadata_cache = feeds.MetadataCache()
+            return self._metadata_cache
+
+    def get_feed(self, source=None):
+        """Returns the feed for source (the context's default feed if None), created once per source."""
+        source = source or self.default_feed
+        metadata_cache = self.metadata_cache
+        with self._lock:
+            if source not in self._feeds:
+                self._feeds[source] = feeds.get_feed(source, metadata_cache)
+            return self._feeds[source]
+
+    def get_resolver(self, feed):
+        """Returns the dependency resolver for a feed from get_feed, created once per feed."""
+        import resolver
+        session = self.session
+        with self._lock:
+            if feed not in self._resolvers:
+                self._resolvers[feed] = resolver.DependencyResolver(session=session, feed=feed)
+            return self._resolvers[feed]
+
+    def close(self):
+        if self._cache is not None:
+            self._cache.flush()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+# ==============================================================================
+# --- Mode Entry Points ---
+# Each raises an Exception on failure and returns a dict of output paths.
+# ==============================================================================
+
+def run_nuget_job(packages, output_dir=OUTPUT_BASE_PATH, context=None, deduplicate=False, part_size=None,
+                  compression_policy=None, extract_filter=None, repack_packages=True, pipelined=True, codec=None,
+                  feed=None):
+    """
+    Downloads packages, writes the dependency readme, and archives and encodes them.
+
+    Args:
+        packages (list): Package IDs, optionally pinned as 'Id@Version'.
+        output_dir (str): Folder that receives the .base64.txt output.
+        context (JobContext, optional): Shared session/cache/resolver.
+        deduplicate (bool): Store files shared between packages once in the archive.
+                            Only WHALE-PUUP's decode restores the copies; a plain
+                            Base64 decode and unzip leaves them out.
+        part_size (int, optional): Split the output into Base64 parts of this many bytes.
+        compression_policy (str, optional): A compression.POLICIES name; 'default' if None.
+        extract_filter (package_filter.PackageFilter, optional): Extract only the wanted
+                                                                target frameworks and
+                                                                drop stripped groups.
+        repack_packages (bool): Copy members straight from each downloaded .nupkg into
+                                the archive; if False, extract the packages to a temp
+                                folder and archive that.
+        pipelined (bool): Repack and encode each package while later ones are still
+                          downloading (see pipeline.py). Needs repack_packages and
+                          unsplit output; otherwise the stages run one after another.
+        codec (str, optional): A textcodec.CODECS name for the output; Base64 if None.
+        feed (str, optional): Where packages come from: a folder of .nupkg files or a
+                              feed URL (see feeds.get_feed); the context's default
+                              feed if None.
+
+    Returns:
+        dict: {'source': download dir, 'zip': None, 'base64': output path, or the
+              list of part paths when split}.
+    """
+    import archiver
+    import downloader
+    import pipeline
+    import resolver
+    context = context or JobContext()
+    package_feed = context.get_feed(feed)
+    dep_resolver = context.get_resolver(package_feed)
+    download_dir = None
+    os.makedirs(output_dir, exist_ok=True)
+    print(utilities.color(f"[FEED] Using packages from {package_feed.label}", "CYAN"))
+
+    try:
+        if pipelined and repack_packages and not part_size:
+            package_cache = context.cache
+            verifier = dep_resolver.package_hash if context.verify else None
+
+            def write_readme(folder):
+                with metrics.stage("resolve"):
+                    return resolver.resolve_and_write_readme(packages, folder, dep_resolver)
+
+            download_dir = tempfile.mkdtemp(prefix="whale_puup_")
+            base64_output_path = pipeline.archive_packages_pipelined(
+                packages, download_dir, output_dir, max_workers=context.max_workers, session=context.session,
+                feed=package_feed, cache=package_cache, verifier=verifier, write_readme=write_readme,
+                deduplicate=deduplicate, compression_policy=compression_policy, package_filter=extract_filter,
+                codec=codec)
+            if package_cache:
+                package_cache.report()
+            if not package_feed.local:
+                context.metadata_cache.report()
+            return {"source": download_dir, "zip": None, "base64": base64_output_path}
+
+        # Packages already in the local cache are used without a network request. Each
+        # package is checked against its published SHA-512 as it arrives, and is kept
+        # whole for repacking unless extraction was asked for.
+        package_cache = context.cache
+        verifier = dep_resolver.package_hash if context.verify else None
+        download_dir = downloader.download_packages(packages, max_workers=context.max_workers,
+                                                    session=context.session, feed=package_feed, cache=package_cache,
+                                                    verifier=verifier, package_filter=extract_filter,
+                                                    extract=not repack_packages)
+        if package_cache:
+            package_cache.report()
+
+        if not download_dir:
+            raise Exception("NuGet download or extraction failed.")
+
+        # Document the transitive dependency closure alongside the packages. A failure
+        # here is reported but does not stop the run.
+        with metrics.stage("resolve"):
+            resolver.resolve_and_write_readme(packages, download_dir, dep_resolver)
+        if not package_feed.local:
+            context.metadata_cache.report()
+
+        zip_path, base64_output_path = archiver.archive_and_encode_packages(
+            source_dir=download_dir,
+            dest_folder=output_dir,
+            deduplicate=deduplicate,
+            part_size=part_size,
+            compression_policy=compression_policy,
+            repack_packages=repack_packages,
+            package_filter=extract_filter if repack_packages else None,
+            codec=codec
+        )
+        if base64_output_path is None:
+            raise Exception("Archiving and encoding failed.")
+
+        return {"source": download_dir, "zip": zip_path, "base64": base64_output_path}
+
+    finally:
+        if download_dir and os.path.exists(download_dir):
+            with metrics.stage("cleanup"):
+                utilities.cleanup(download_dir)
+            print(utilities.color(f"\n🗑️ Cleaned up temporary folder: {download_dir}", "YELLOW"))
+
+def run_folder_job(source_dir, output_dir=OUTPUT_BASE_PATH, incremental_build=True, context=None, part_size=None,
+                   compression_policy=None, codec=None, exclude=None, include=None, default_excludes=True):
+    """
+    Zips and Base64-encodes a local folder.
+
+    Build output, VCS metadata and dependency folders (scanner.DEFAULT_EXCLUDES) are
+    left out unless default_excludes is False, along with anything matched by the
+    folder's own .whaleignore file and by exclude.
+
+    Args:
+        source_dir (str): The folder to archive.
+        output_dir (str): Folder that receives the .base64.txt output.
+        incremental_build (bool): Reuse unchanged members from the previous run.
+        context (JobContext, optional): Unused; accepted for a uniform job signature.
+        part_size (int, optional): Split the output into Base64 parts of this many
+                                   bytes (always a full build).
+        compression_policy (str, optional): A compression.POLICIES name; 'default' if None.
+        codec (str, optional): A textcodec.CODECS name for the output; Base64 if None.
+        exclude (list or str, optional): gitignore-style patterns to leave out.
+        include (list or str, optional): Patterns to archive even if an earlier rule
+                                         excludes them (e.g. 'bin/').
+        default_excludes (bool): Start from scanner.DEFAULT_EXCLUDES.
+
+    Returns:
+        dict: {'source': source dir, 'zip': None, 'base64': output path, or the
+              list of part paths when split}.
+    """
+    import archiver
+    source_dir = os.path.abspath(os.path.expanduser(source_dir))
+    if not os.path.isdir(source_dir):
+        raise Exception(f"Source folder not found: {source_dir}")
+    scan_rules = scanner.load_rules(source_dir, exclude or (), include or (), default_excludes)
+    os.makedirs(output_dir, exist_ok=True)
+
+    zip_path, base64_output_path = archiver.archive_and_encode_packages(
+        source_dir=source_dir,
+        dest_folder=output_dir,
+        incremental_build=incremental_build,
+        part_size=part_size,
+        compression_policy=compression_policy,
+        codec=codec,
+        scan_rules=scan_rules
+    )
+    if base64_output_path is None:
+        raise Exception("Archiving and encoding failed.")
+
+    return {"source": source_dir, "zip": zip_path, "base64": base64_output_path}
+
+def run_decode_job(input_path, output_path=None, output_dir=OUTPUT_BASE_PATH, context=None):
+    """
+    Decodes a Base64 TXT file back to a ZIP file, removing partial output on failure.
+    Split output is reassembled from all of its parts, and deduplicated archives are
+    expanded so the ZIP holds every original file. A single file is checked against
+    its integrity manifest (if one sits next to it) while it is decoded.
+
+    Args:
+        input_path (str or list): The .base64.txt file to decode; for split output,
+                                  any one part (the rest are found next to it), a
+                                  folder of parts, or a list of part files.
+        output_path (str, optional): Output ZIP path; defaults to '<name>_decoded.zip'
+                                     in output_dir.
+        output_dir (str): Folder for the default output path.
+        context (JobContext, optional): Unused; accepted for a uniform job signature.
+
+    Returns:
+        dict: {'source': input path (or part list), 'zip': output path, 'base64': None}.
+    """
+    import dedup
+    import encoder
+    import integrity
+    import volumes
+    input_paths = [input_path] if isinstance(input_path, str) else list(input_path)
+    input_paths = [os.path.abspath(os.path.expanduser(p)) for p in input_paths]
+    for path in input_paths:
+        if not os.path.exists(path):
+            raise Exception(f"Input file not found: {path}")
+
+    part_paths = None
+    if len(input_paths) > 1:
+        part_paths = input_paths
+    elif os.path.isdir(input_paths[0]) or volumes.is_part_file(input_paths[0]):
+        part_paths = volumes.find_parts(input_paths[0])
+        if not part_paths:
+            raise Exception(f"No Base64 part files found in: {input_paths[0]}")
+    if output_path is None:
+        named_after = volumes.part_path(volumes.read_header(part_paths[0])["name"], 1) if part_paths else input_paths[0]
+        output_path = utilities.default_decoded_path(named_after, output_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    name = os.path.basename(part_paths[0] if part_paths else input_paths[0])
+    try:
+        with metrics.stage("decode", name) as stage:
+            if part_paths:
+                volumes.decode_parts(part_paths, output_path)
+            else:
+                manifest = integrity.load_manifest(integrity.manifest_path_for(input_paths[0]))
+                if not encoder.decode_file_parallel(input_paths[0], output_path, manifest=manifest):
+                    raise Exception("Base64 decoding failed.")
+                if manifest:
+                    print(utilities.color(f"[VERIFY] Decoded ZIP matches its integrity manifest "
+                                          f"({len(manifest['blocks'])} block(s) checked).", "GREEN"))
+                else:
+                    print(utilities.color("[VERIFY] No integrity manifest next to the input; output was not verified.", "YELLOW"))
+            stage.bytes = os.path.getsize(output_path)
+        with metrics.stage("restore", name):
+            stats = dedup.restore_archive(output_path)
+        if stats is not None:
+            print(utilities.color(f"[DEDUP] Restored {stats.get('duplicate_files', 0)} deduplicated file(s).", "GREEN"))
+    except Exception:
+        # Cleanup partially written output file if it exists and failed
+        if os.path.exists(output_path):
+            try:
+                os.remove(output_path)
+                print(utilities.color(f"\n🗑️ Cleaned up failed output file: {output_path}", "YELLOW"))
+            except OSError:
+                pass
+        raise
+
+    return {"source": part_paths or input_paths[0], "zip": output_path, "base64": None}
+
+def run_extract_job(input_path, members=None, output_dir=OUTPUT_BASE_PATH, context=None):
+    """
+    Lists the members of an encoded archive, or extracts some of them, without
+    decoding the whole archive: only the central directory at the end of the text
+    and the wanted members are decoded (see browse.py).
+
+    Args:
+        input_path (str or list): The .base64.txt file; for split output, any one
+                                  part, a folder of parts, or a list of part files.
+        members (list, optional): Member names, globs or folders to extract; the
+                                  members are listed instead if None or empty.
+        output_dir (str): Folder the members are extracted under, at their paths in
+                          the archive.
+        context (JobContext, optional): Unused; accepted for a uniform job signature.
+
+    Returns:
+        dict: {'source': input path (or part list), 'zip': None, 'base64': None,
+              'files': the paths extracted}.
+    """
+    import browse
+    input_paths = [input_path] if isinstance(input_path, str) else list(input_path)
+    input_paths = [os.path.abspath(os.path.expanduser(p)) for p in input_paths]
+    for path in input_paths:
+        if not os.path.exists(path):
+            raise Exception(f"Input file not found: {path}")
+    source = input_paths if len(input_paths) > 1 else input_paths[0]
+    name = os.path.basename(input_paths[0])
+
+    with metrics.stage("browse", name) as stage, browse.EncodedArchive(source) as archive:
+        if not members:
+            browse.print_listing(archive)
+            return {"source": source, "zip": None, "base64": None, "files": []}
+        entries = archive.select(members)
+        print(utilities.color(f"[BROWSE] Extracting {len(entries)} member(s) of {name}...", "CYAN"))
+        os.makedirs(output_dir, exist_ok=True)
+        written, stage.bytes = archive.extract(entries, output_dir)
+        print(utilities.color(f"[BROWSE] Extracted {len(written)} file(s) ({stage.bytes / (1024 * 1024):.1f} MB) to "
+                              f"{output_dir}; read {archive.text_bytes_read / (1024 * 1024):.2f} MB of "
+                              f"{archive.input_size / (1024 * 1024):.1f} MB of encoded text.", "GREEN"))
+    return {"source": source, "zip": None, "base64": None, "files": written}
+
+JOB_RUNNERS = {
+    "nuget": lambda job, context: run_nuget_job(
+        job["packages"], job.get("output_dir", OUTPUT_BASE_PATH), context, job.get("dedup", False), job.get("part_size"),
+        job.get("compression"), package_filter.from_options(job.get("frameworks"), job.get("strip")),
+        job.get("repack", True), job.get("pipeline", True), job.get("codec"), job.get("feed")),
+    "folder": lambda job, context: run_folder_job(
+        job["source"], job.get("output_dir", OUTPUT_BASE_PATH), job.get("incremental", True), context, job.get("part_size"),
+        job.get("compression"), job.get("codec"), job.get("exclude"), job.get("include"),
+        job.get("default_excludes", True)),
+    "decode": lambda job, context: run_decode_job(
+        job["input"], job.get("output"), job.get("output_dir", OUTPUT_BASE_PATH), context),
+    "extract": lambda job, context: run_extract_job(
+        job["input"], job.get("members"), job.get("output_dir", OUTPUT_BASE_PATH), context),
+}
+
+# ==============================================================================
+# --- Batch Runner ---
+# ==============================================================================
+
+def load_job_file(job_path):
+    """
+    Reads jobs from a JSON file (a list of job objects, or {"jobs": [...]}) or from
+    JSONL (one job object per line; blank lines and '#' comments are skipped).
+
+    Each job has a "mode" ('nuget', 'folder', 'decode' or 'extract') plus that mode's fields:
+    nuget: "packages" (list or comma-separated string), an optional "dedup"
+    (true to store files shared between packages once), and optional
+    "frameworks" (e.g. ["net8.0"]) and "strip" (e.g. ["metadata",
+    "signature"]) to keep only part of each package, "repack" (false to
+    extract packages to disk before archiving them) and "pipeline" (false to
+    download everything before archiving starts), and "feed" (a folder of
+    .nupkg files or a feed URL; see feeds.get_feed);
+    folder: "source", an optional "incremental", and "exclude"/"include" (lists
+    of gitignore-style patterns, see scanner.load_rules) plus "default_excludes"
+    (false to archive .git, bin, obj, node_modules and the like too); decode: "input" (a file, a
+    folder of parts, or a list of part files) and an optional "output"; extract:
+    "input" as for decode and "members" (names, globs or folders to extract, or
+    none to list the archive). Every job
+    may set "output_dir", and nuget/folder jobs may set "part_size" (bytes or a
+    size such as "100M") to split their output, "compression" (a name from
+    compression.POLICIES) to choose how members are compressed, and "codec" (a
+    name from textcodec.CODECS) to choose the text encoding. Decode jobs detect
+    the codec themselves.
+
+    Returns:
+        list[dict]: The validated jobs.
+    """
+    with open(job_path, 'r', encoding='utf-8-sig') as f:
+        text = f.read()
+
+    try:
+        data = json.loads(text)
+        jobs = data.get("jobs", []) if isinstance(data, dict) else data
+    except ValueError:
+        jobs = [json.loads(line) for line in text.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+
+    required = {"nuget": "packages", "folder": "source", "decode": "input", "extract": "input"}
+    for index, job in enumerate(jobs):
+        mode = job.get("mode")
+        if mode not in required:
+            raise ValueError(f"Job {index}: unknown mode {mode!r} (expected one of {', '.join(MODES)})")
+        if required[mode] not in job:
+            raise ValueError(f"Job {index}: {mode} jobs need a '{required[mode]}' field")
+        if mode == "nuget" and isinstance(job["packages"], str):
+            job["packages"] = [p.strip() for p in job["packages"].split(',') if p.strip()]
+        if mode == "extract" and isinstance(job.get("members"), str):
+            job["members"] = [m.strip() for m in job["members"].split(',') if m.strip()]
+        if isinstance(job.get("part_size"), str):
+            job["part_size"] = utilities.parse_size(job["part_size"])
+        if "compression" in job:
+            compression.get_policy(job["compression"]) # Reject unknown names before any job runs
+        if "codec" in job:
+            textcodec.get_codec(job["codec"])
+        if job.get("feed"):
+            feeds.get_feed(job["feed"])
+        for key in ("exclude", "include"):
+            if isinstance(job.get(key), str):
+                job[key] = [p.strip() for p in job[key].split(',') if p.strip()]
+        if job.get("exclude") or job.get("include"):
+            scanner.ScanRules((job.get("exclude") or []) + (job.get("include") or []))
+        if "strip" in job:
+            package_filter.from_options(strip=job["strip"])
+    return jobs
+
+def _run_one(index, job, context):
+    start = time.perf_counter()
+    record = {"job": index, "mode": job["mode"], "status": "ok", "error": None, "outputs": None}
+    try:
+        record["outputs"] = JOB_RUNNERS[job["mode"]](job, context)
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = str(e)
+        print(utilities.color(f"\n⚠️ Job {index} ({job['mode']}) failed: {e}", "RED"))
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+def run_jobs(jobs, max_parallel=DEFAULT_PARALLEL_JOBS, report=None, context=None):
+    """
+    Runs jobs in one process, up to max_parallel at a time, sharing one JobContext.
+
+    A JSON line with the job index, mode, status, error, output paths and elapsed
+    seconds is written to report as each job finishes, followed by a summary line.
+
+    Returns:
+        list[dict]: The per-job records, in job order.
+    """
+    context = context or JobContext()
+    report = report or sys.stdout
+    report_lock = threading.Lock()
+    records = [None] * len(jobs)
+    start = time.perf_counter()
+
+    def emit(record):
+        with report_lock:
+            report.write(json.dumps(record) + "\n")
+            report.flush()
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_parallel)) as pool:
+            futures = {pool.submit(_run_one, index, job, context): index for index, job in enumerate(jobs)}
+            for future in concurrent.futures.as_completed(futures):
+                record = future.result()
+                records[record["job"]] = record
+                emit(record)
+    finally:
+        context.close()
+
+    failed = sum(1 for record in records if record["status"] != "ok")
+    emit({"summary": True, "jobs": len(jobs), "failed": failed,
+          "seconds": round(time.perf_counter() - start, 3)})
+    return records
+
+# ==============================================================================
+# --- Command Line Interface ---
+# ==============================================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="whale-puup",
+        description="WHALE-PUUP: archive NuGet packages or folders to Base64 and back. "
+                    "Run without arguments for the interactive menu.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Instrumentation options shared by every subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--metrics", metavar="PATH", help="Write per-stage timing records as JSON lines here ('-' for stdout).")
+    common.add_argument("--metrics-table", action="store_true", help="Print a per-stage time and throughput table at the end.")
+    common.add_argument("--profile", metavar="PATH", help="Run under cProfile and save the stats here.")
+    common.add_argument("--trace-memory", action="store_true", help="Trace Python allocations and report the peak and top sites.")
+
+    nuget = subparsers.add_parser("nuget", parents=[common], help="Download, archive and encode NuGet packages.")
+    nuget.add_argument("packages", nargs='+', help="Package IDs, optionally pinned as Id@Version (commas allowed).")
+    nuget.add_argument("--output-dir", default=OUTPUT_BASE_PATH)
+    nuget.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent downloads.")
+    nuget.add_argument("--no-cache", action="store_true", help="Bypass the local package cache.")
+    nuget.add_argument("--feed", help=FEED_HELP)
+    nuget.add_argument("--no-verify", action="store_true", help="Skip checking downloads against their published SHA-512.")
+    nuget.add_argument("--dedup", action="store_true", help="Store files shared between packages once "
+                                                            "(decode with WHALE-PUUP to restore the copies).")
+    nuget.add_argument("--no-repack", action="store_true", help="Extract packages to a temp folder and archive that, "
+                                                                "instead of copying members straight from each .nupkg.")
+    nuget.add_argument("--no-pipeline", action="store_true", help="Download every package before archiving starts, "
+                                                                  "instead of overlapping the stages.")
+    nuget.add_argument("--framework", action="append", help="Only extract these target frameworks, e.g. net8.0 (repeatable, commas allowed).")
+    nuget.add_argument("--strip", action="append", choices=sorted(package_filter.STRIP_GROUPS), help="Leave these members out (repeatable).")
+    nuget.add_argument("--compression", choices=sorted(compression.POLICIES), help="How members are compressed (default: deflate, storing already-compressed files).")
+    nuget.add_argument("--part-size", type=utilities.parse_size, help="Split output into Base64 parts of this size (e.g. 100M).")
+    nuget.add_argument("--codec", choices=sorted(textcodec.CODECS), help="Text encoding of the output: base64 (default, 33%% larger than the ZIP) or base85/ascii85 (25%% larger, slower).")
+
+    folder = subparsers.add_parser("folder", parents=[common], help="Zip and Base64-encode a local folder.")
+    folder.add_argument("source")
+    folder.add_argument("--output-dir", default=OUTPUT_BASE_PATH)
+    folder.add_argument("--full", action="store_true", help="Ignore the previous manifest and rebuild everything.")
+    folder.add_argument("--compression", choices=sorted(compression.POLICIES), help="How members are compressed (default: deflate, storing already-compressed files).")
+    folder.add_argument("--part-size", type=utilities.parse_size, help="Split output into Base64 parts of this size (e.g. 100M).")
+    folder.add_argument("--exclude", action="append", metavar="PATTERN", help="Leave out paths matching this gitignore-style pattern (e.g. '*.log', 'docs/drafts/'); repeatable or comma-separated.")
+    folder.add_argument("--include", action="append", metavar="PATTERN", help="Archive paths matching this pattern even if another rule excludes them (e.g. 'bin/'); repeatable or comma-separated.")
+    folder.add_argument("--no-default-excludes", action="store_true", help="Also archive the folders left out by default (.git, .hg, .svn, .vs, bin, obj, node_modules, __pycache__).")
+    folder.add_argument("--codec", choices=sorted(textcodec.CODECS), help="Text encoding of the output: base64 (default, 33%% larger than the ZIP) or base85/ascii85 (25%% larger, slower).")
+
+    decode = subparsers.add_parser("decode", parents=[common], help="Decode a Base64 TXT file back to a ZIP.")
+    decode.add_argument("input", nargs='+', help="A Base64 TXT file, or split parts (one part, a folder, or every part).")
+    decode.add_argument("--output", help="Output ZIP path (default: <name>_decoded.zip in --output-dir).")
+    decode.add_argument("--output-dir", default=OUTPUT_BASE_PATH)
+
+    extract = subparsers.add_parser("extract", parents=[common], help="List a Base64 TXT archive, or extract single members, without decoding all of it.")
+    extract.add_argument("input", help="A Base64 TXT file, or any one part (or the folder) of split output.")
+    extract.add_argument("members", nargs='*', help="Member names, globs ('lib/*/Foo.dll') or folders to extract; lists the archive if none are given.")
+    extract.add_argument("--output-dir", default=OUTPUT_BASE_PATH, help="Members are extracted here, at their paths in the archive.")
+
+    batch = subparsers.add_parser("jobs", parents=[common], help="Run every job in a JSON/JSONL job file.")
+    batch.add_argument("job_file")
+    batch.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL_JOBS, help="Jobs run at the same time.")
+    batch.add_argument("--report", help="Write the JSON-lines timing report here instead of stdout.")
+    batch.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent downloads per job.")
+    batch.add_argument("--no-cache", action="store_true", help="Bypass the local package cache.")
+    batch.add_argument("--feed", help="Feed for nuget jobs that do not set \"feed\". " + FEED_HELP)
+    batch.add_argument("--no-verify", action="store_true", help="Skip checking downloads against their published SHA-512.")
+
+    return parser
+
+def main(argv):
+    """
+    Runs one subcommand without any prompts.
+
+    Single-mode commands are run as a one-job batch, so they print the same JSON
+    timing line as job files do. Per-stage metrics and profiling are set up
+    around the whole run.
+
+    Returns:
+        int: Process exit code (0 if every job succeeded, 1 otherwise, 2 for bad input).
+    """
+    args = build_parser().parse_args(argv)
+    context = JobContext(use_cache=not getattr(args, "no_cache", False),
+                         max_workers=getattr(args, "workers", DEFAULT_MAX_WORKERS),
+                         verify=not getattr(args, "no_verify", False), feed=getattr(args, "feed", None))
+
+    sink = None
+    if args.metrics == '-':
+        sink = sys.stdout
+    elif args.metrics:
+        sink = open(args.metrics, 'w')
+    recorder = metrics.start(sink)
+    try:
+        with metrics.profiled(args.profile, args.trace_memory):
+            records = _run_command(args, context)
+    finally:
+        if sink is not None and sink is not sys.stdout:
+            sink.close()
+    if records is None:
+        return 2
+    if args.metrics_table:
+        recorder.print_table()
+
+    return 0 if all(record["status"] == "ok" for record in records) else 1
+
+def _run_command(args, context):
+    """Runs the parsed subcommand. Returns the job records, or None if the job file is unusable."""
+    if args.command == "jobs":
+        try:
+            jobs = load_job_file(args.job_file)
+        except (OSError, ValueError) as e:
+            print(utilities.color(f"[ERROR] Could not read job file {args.job_file}: {e}", "RED"))
+            return None
+        if args.report:
+            with open(args.report, 'w') as report:
+                records = run_jobs(jobs, args.parallel, report, context)
+        else:
+            records = run_jobs(jobs, args.parallel, context=context)
+    else:
+        if args.command == "nuget":
+            packages = [p.strip() for arg in args.packages for p in arg.split(',') if p.strip()]
+            job = {"mode": "nuget", "packages": packages, "output_dir": args.output_dir, "dedup": args.dedup,
+                   "part_size": args.part_size, "compression": args.compression,
+                   "frameworks": [f for arg in args.framework or [] for f in arg.split(',')], "strip": args.strip,
+                   "repack": not args.no_repack, "pipeline": not args.no_pipeline, "codec": args.codec}
+        elif args.command == "folder":
+            job = {"mode": "folder", "source": args.source, "output_dir": args.output_dir, "incremental": not args.full,
+                   "part_size": args.part_size, "compression": args.compression, "codec": args.codec,
+                   "exclude": [p for arg in args.exclude or [] for p in arg.split(',') if p.strip()],
+                   "include": [p for arg in args.include or [] for p in arg.split(',') if p.strip()],
+                   "default_excludes": not args.no_default_excludes}
+        elif args.command == "extract":
+            job = {"mode": "extract", "input": args.input, "members": args.members, "output_dir": args.output_dir}
+        else:
+            job = {"mode": "decode", "input": args.input[0] if len(args.input) == 1 else args.input,
+                   "output": args.output, "output_dir": args.output_dir}
+        records = run_jobs([job], 1, context=context)
+    return records
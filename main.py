@@ -1,26 +1,32 @@
 ﻿import sys
 import os
-import shutil
-import archiver
 import utilities
-import downloader
-import encoder 
+import metrics
+import jobs
 
 # --- Configuration ---
-OUTPUT_BASE_PATH = os.path.join(os.getcwd(), "final_archives")
+OUTPUT_BASE_PATH = jobs.OUTPUT_BASE_PATH
 
 def run_success_message(source_path, zip_path, base64_path=None):
     """Prints the final success message with paths. Generalized for decode mode."""
     print("\n" + utilities.color("="*50, "GREEN"))
     print(utilities.color("🎉 WHALE-PUUP Operation Complete!", "GREEN"))
     
-    if base64_path and zip_path:
-        # Encoding/Archiving success message
+    if base64_path:
+        # Encoding/Archiving success message (streaming mode never writes a ZIP file)
         print(utilities.color(f"Source Path Processed: {source_path}", "GREEN")) 
-        print(utilities.color(f"ZIP Archive created: {zip_path}", "GREEN"))
-        print(utilities.color(f"Base64 Encoded TXT: {base64_path}", "GREEN"))
+        if zip_path:
+            print(utilities.color(f"ZIP Archive created: {zip_path}", "GREEN"))
+        if isinstance(base64_path, list):
+            print(utilities.color(f"Base64 Encoded TXT: {len(base64_path)} part(s)", "GREEN"))
+            for part_path in base64_path:
+                print(utilities.color(f"  {part_path}", "GREEN"))
+        else:
+            print(utilities.color(f"Base64 Encoded TXT: {base64_path}", "GREEN"))
     elif source_path and zip_path:
-        # Decoding success message (source_path is the base64 input file)
+        # Decoding success message (source_path is the base64 input file, or the parts of a split set)
+        if isinstance(source_path, list):
+            source_path = f"{len(source_path)} part(s) in {os.path.dirname(source_path[0])}"
         print(utilities.color(f"Base64 Input File: {source_path}", "GREEN"))
         print(utilities.color(f"Decoded Output ZIP: {zip_path}", "GREEN"))
     
@@ -29,8 +35,6 @@ def run_success_message(source_path, zip_path, base64_path=None):
 def run_nuget_mode():
     """Handles the full NuGet download, archive, and encode workflow."""
     
-    download_dir = None
-    
     try:
         # 1. --- GET INPUT: Prompt for package names ---
         packages = utilities.prompt_for_nuget_packages()
@@ -39,31 +43,16 @@ def run_nuget_mode():
             print(utilities.color("NuGet process cancelled. Returning to menu.", "RED"))
             return
             
-        os.makedirs(OUTPUT_BASE_PATH, exist_ok=True)
-            
         print(utilities.color("\nAll puup'd out. Now digesting NuGet packages...", "CYAN"))
 
-        # 2. --- DOWNLOAD & EXTRACT PACKAGES ---
-        # The corrected call: download_packages now creates and returns the directory path.
-        download_dir = downloader.download_packages(packages)
+        # 2. --- DOWNLOAD, EXTRACT, ARCHIVE AND ENCODE (temp folder is cleaned up) ---
+        result = jobs.run_nuget_job(packages, OUTPUT_BASE_PATH)
 
-        if not download_dir:
-            raise Exception("NuGet download or extraction failed.")
-        
-        if zip_path is None or base64_output_path is None:
-            raise Exception("Archiving and encoding failed.")
-
-        # 4. --- SUCCESS MESSAGE ---
-        run_success_message(download_dir, zip_path, base64_output_path)
+        # 3. --- SUCCESS MESSAGE ---
+        run_success_message(result["source"], result["zip"], result["base64"])
         
     except Exception as e:
         print(utilities.color(f"\n⚠️ A CRITICAL error occurred during NuGet mode: {e}", "RED"))
-        
-    finally:
-        # 5. --- CLEANUP ---
-        if download_dir and os.path.exists(download_dir):
-            utilities.cleanup(download_dir)
-            print(utilities.color(f"\n🗑️ Cleaned up temporary folder: {download_dir}", "YELLOW"))
 
 
 def run_folder_mode():
@@ -79,21 +68,14 @@ def run_folder_mode():
             print(utilities.color("Folder mode cancelled. Returning to menu.", "RED"))
             return
             
-        os.makedirs(OUTPUT_BASE_PATH, exist_ok=True)
-            
         print(utilities.color("\nAll puup'd out. Now digesting local folder...", "CYAN"))
 
         # 2. --- ARCHIVE AND ENCODE ---
-        zip_path, base64_output_path = archiver.archive_and_encode_packages(
-            source_dir=source_folder_path,
-            dest_folder=OUTPUT_BASE_PATH
-        )
-        
-        if zip_path is None or base64_output_path is None:
-            raise Exception("Archiving and encoding failed.")
+        # Incremental: only files changed since the last run of this folder are recompressed
+        result = jobs.run_folder_job(source_folder_path, OUTPUT_BASE_PATH, incremental_build=True)
 
         # 3. --- SUCCESS MESSAGE ---
-        run_success_message(source_folder_path, zip_path, base64_output_path)
+        run_success_message(result["source"], result["zip"], result["base64"])
         
     except Exception as e:
         print(utilities.color(f"\n⚠️ A CRITICAL error occurred during Folder mode: {e}", "RED"))
@@ -117,33 +99,31 @@ def run_decode_mode():
 
         print(utilities.color("\nStarting Base64 decoding...", "CYAN"))
 
-        # 2. --- DECODE ---
-        success = encoder.decode_file_from_base64(input_path, output_path)
-        
-        if not success:
-            raise Exception("Base64 decoding failed.")
+        # 2. --- DECODE (a partially written output file is removed on failure) ---
+        # A split part brings in the rest of its set from the same folder
+        result = jobs.run_decode_job(input_path, output_path)
 
         # 3. --- SUCCESS MESSAGE ---
-        run_success_message(input_path, output_path, base64_path=None) 
+        run_success_message(result["source"], output_path, base64_path=None) 
 
     except Exception as e:
         print(utilities.color(f"\n⚠️ A CRITICAL error occurred during Decode mode: {e}", "RED"))
-        
-        # Cleanup partially written output file if it exists and failed
-        if output_path and os.path.exists(output_path):
-            try:
-                os.remove(output_path)
-                print(utilities.color(f"\n🗑️ Cleaned up failed output file: {output_path}", "YELLOW"))
-            except OSError:
-                pass
 
 
 def main():
     """
     Main loop to present the user with a choice of operation modes.
+
+    When started with arguments (e.g. `whale-puup folder C:\\MyFolder` or
+    `whale-puup jobs nightly.jsonl`), runs non-interactively instead; see jobs.py.
     """
+    if len(sys.argv) > 1:
+        sys.exit(jobs.main(sys.argv[1:]))
+
     while True:
         mode = utilities.prompt_for_mode()
+        # Each run gets its own stage timings, summarized once it finishes
+        recorder = metrics.start()
         
         if mode == 'nuget':
             run_nuget_mode()
@@ -154,6 +134,12 @@ def main():
         elif mode is None:
             print(utilities.color("\nExiting WHALE-PUUP. Goodbye!", "MAGENTA"))
             sys.exit(0)
+        recorder.print_table()
             
 if __name__ == "__main__":
+    # Required for the compression process pool in the frozen (PyInstaller) executable.
+    # It does nothing otherwise, so source runs skip importing multiprocessing.
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+# ==============================================================================
+# WHALE-PUUP Metrics Module (metrics.py)
+# Records how long each pipeline stage (download, extract, archive, encode,
+# decode, cleanup, ...) takes and how many bytes it moves, per package where
+# that applies, and reports the numbers as JSON lines or a summary table.
+# Recording costs two clock reads and one list append per stage, so it is
+# always on. cProfile and tracemalloc can be enabled per run on top of it.
+# ==============================================================================
+
+import sys
+import json
+import time
+import threading
+import contextlib
+import utilities
+
+# --- Configuration ---
+# Lines of cProfile / tracemalloc output printed at the end of a profiled run.
+PROFILE_TOP_FUNCTIONS = 25
+TRACE_TOP_SITES = 10
+
+class Stage:
+    """A running stage; the timed block sets bytes (or calls add) as it learns them."""
+
+    __slots__ = ("name", "package", "bytes", "start")
+
+    def __init__(self, name, package):
+        self.name = name
+        self.package = package
+        self.bytes = 0
+        self.start = time.perf_counter()
+
+    def add(self, count):
+        self.bytes += count
+
+class StageRecorder:
+    """
+    Collects one record per finished stage. Thread-safe, so concurrent downloads
+    and parallel jobs can share a recorder.
+    """
+
+    def __init__(self, sink=None):
+        """
+        Args:
+            sink (file, optional): Text stream that receives each record as a JSON
+                                   line the moment its stage finishes.
+        """
+        self.sink = sink
+        self.records = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name, package=None):
+        """
+        Times the enclosed block as one stage. The record is kept even when the block
+        raises, with status 'failed', so slow failures show up too.
+
+        Args:
+            name (str): Stage name, e.g. 'download' or 'encode'.
+            package (str, optional): The package (or file) the stage worked on.
+
+        Yields:
+            Stage: Set its bytes attribute (or call add) to record the bytes processed.
+        """
+        current = Stage(name, package)
+        status = "ok"
+        try:
+            yield current
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            self.record(name, time.perf_counter() - current.start, current.bytes, package, status)
+
+    def record(self, name, seconds, byte_count=0, package=None, status="ok"):
+        """Adds a stage record measured elsewhere."""
+        record = {"stage": name, "package": package, "status": status, "seconds": round(seconds, 4),
+                  "bytes": byte_count, "mb_per_s": round(byte_count / seconds / (1024 * 1024), 2) if seconds > 0 and byte_count else None}
+        with self._lock:
+            self.records.append(record)
+            if self.sink is not None:
+                self.sink.write(json.dumps(record) + "\n")
+                self.sink.flush()
+
+    def summary(self):
+        """
+        Returns per-stage totals in first-seen order.
+
+        Returns:
+            list[dict]: stage, count, seconds (summed), bytes, mb_per_s.
+        """
+        totals = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            total = totals.setdefault(record["stage"], {"stage": record["stage"], "count": 0, "seconds": 0.0, "bytes": 0})
+            total["count"] += 1
+            total["seconds"] += record["seconds"]
+            total["bytes"] += record["bytes"]
+        for total in totals.values():
+            total["mb_per_s"] = total["bytes"] / total["seconds"] / (1024 * 1024) if total["seconds"] > 0 and total["bytes"] else None
+        return list(totals.values())
+
+    def print_table(self):
+        """Prints the per-stage summary. Seconds of concurrent stages are summed, so they can exceed wall time."""
+        rows = self.summary()
+        if not rows:
+            return
+        print(utilities.color("\n[METRICS] Stage           Count    Seconds          MB     MB/s", "CYAN"))
+        for row in rows:
+            rate = f"{row['mb_per_s']:8.1f}" if row["mb_per_s"] is not None else "       -"
+            print(utilities.color(f"[METRICS] {row['stage']:<15} {row['count']:5d} {row['seconds']:10.3f} "
+                                  f"{row['bytes'] / (1024 * 1024):11.1f} {rate}", "CYAN"))
+
+# The recorder that stage() reports to. Replaced by start() at the beginning of each run.
+_recorder = StageRecorder()
+
+def start(sink=None):
+    """Begins a new run: returns a fresh recorder and makes it the active one."""
+    global _recorder
+    _recorder = StageRecorder(sink)
+    return _recorder
+
+def recorder():
+    return _recorder
+
+def stage(name, package=None):
+    """Times a block as a stage of the active recorder (see StageRecorder.stage)."""
+    return _recorder.stage(name, package)
+
+# ==============================================================================
+# --- Optional Profiling ---
+# ==============================================================================
+
+@contextlib.contextmanager
+def profiled(profile_path=None, trace_memory=False, out=None):
+    """
+    Runs the enclosed block under cProfile and/or tracemalloc and prints the results.
+
+    Threads started inside the block (download workers, parallel jobs) are profiled
+    too. Compression and decode worker processes are not.
+
+    Args:
+        profile_path (str, optional): Enable cProfile and dump its stats here (open
+                                      with pstats or snakeviz); the top functions by
+                                      cumulative time are also printed.
+        trace_memory (bool): Trace Python allocations and print the peak and the
+                             largest allocation sites.
+        out (file, optional): Where reports are printed; defaults to stdout.
+    """
+    # Imported here: only profiled runs pay for loading them
+    import pstats
+    import cProfile
+    import tracemalloc
+
+    out = out or sys.stdout
+    profiles = []
+    profiles_lock = threading.Lock()
+
+    def profile_thread(frame, event, arg):
+        # Runs once as the first profile event of each new thread and swaps itself for a profiler
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with profiles_lock:
+            profiles.append(profile)
+        profile.enable()
+
+    if trace_memory:
+        tracemalloc.start()
+    if profile_path:
+        main_profile = cProfile.Profile()
+        profiles.append(main_profile)
+        threading.setprofile(profile_thread)
+        main_profile.enable()
+    try:
+        yield
+    finally:
+        if trace_memory:
+            # Taken first, so the profiler's own reporting is not counted
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if profile_path:
+            main_profile.disable()
+            threading.setprofile(None)
+            stats = pstats.Stats(profiles[0], stream=out)
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(profile_path)
+            print(utilities.color(f"\n[PROFILE] cProfile stats ({len(profiles)} thread(s)) saved to: {profile_path}", "CYAN"), file=out)
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        if trace_memory:
+            print(utilities.color(f"\n[MEMORY] Traced Python allocations: peak {peak / (1024 * 1024):.1f} MB, "
+                                  f"{current / (1024 * 1024):.1f} MB still allocated", "CYAN"), file=out)
+            for statistic in snapshot.statistics("lineno")[:TRACE_TOP_SITES]:
+                frame = statistic.traceback[0]
+                print(f"  {statistic.size / 1024:10.1f} KB in {statistic.count:6d} block(s)  {frame.filename}:{frame.lineno}", file=out)
@@ -0,0 +1,202 @@
+# ==============================================================================
+# WHALE-PUUP Package Filter Module (package_filter.py)
+# Chooses which members of a .nupkg are extracted or repacked: only the target
+# frameworks that are wanted (picking the nearest compatible one, as NuGet does),
+# and optionally without packaging metadata, the signature, symbols or XML docs.
+# Members that are filtered out are never decompressed or written to disk.
+# ==============================================================================
+
+import re
+import collections
+import utilities
+
+# --- Configuration ---
+# Folders whose children are target framework folders, e.g. lib/net8.0/.
+# runtimes/<rid>/lib/<tfm>/ and contentFiles/<lang>/<tfm>/ are handled too.
+FRAMEWORK_FOLDERS = ("lib", "ref", "build", "buildTransitive", "tools")
+# Optional groups of members that can be left out with strip=[...].
+STRIP_GROUPS = {
+    # OPC packaging parts; NuGet never reads them after installation
+    "metadata": lambda name: (name.startswith("_rels/") or name.startswith("package/services/")
+                              or name == "[Content_Types].xml"),
+    "signature": lambda name: name == ".signature.p7s",
+    "symbols": lambda name: name.lower().endswith((".pdb", ".snupkg")),
+    # IntelliSense XML docs next to assemblies
+    "docs": lambda name: name.lower().endswith(".xml") and _is_framework_asset(name),
+}
+
+# Counts of what a filter kept and dropped, for one package or accumulated.
+FilterStats = collections.namedtuple("FilterStats", ["kept_files", "kept_bytes", "dropped_files", "dropped_bytes"])
+
+_TFM_RE = re.compile(r'^(net|netcoreapp|netstandard)(\d+(?:\.\d+)*)(?:-([a-z0-9.]+))?$')
+
+def _is_framework_asset(name):
+    return name.split('/', 1)[0] in FRAMEWORK_FOLDERS or name.startswith("runtimes/")
+
+def parse_framework(tfm):
+    """
+    Parses a target framework moniker into (family, version tuple, platform).
+
+    Families are 'net' (.NET 5+ and .NET Core), 'netfx' (.NET Framework, e.g.
+    net48 or net4.8) and 'netstandard'. Returns None for anything else (e.g. 'any',
+    'uap10.0'), which only matches itself.
+    """
+    match = _TFM_RE.match(tfm.lower())
+    if not match:
+        return None
+    prefix, digits, platform = match.groups()
+    if prefix == "net" and '.' not in digits:
+        # Short .NET Framework form: net48 -> 4.8, net472 -> 4.7.2
+        return "netfx", tuple(int(d) for d in digits), platform
+    version = tuple(int(n) for n in digits.split('.'))
+    if prefix == "net" and version[0] < 5:
+        return "netfx", version, platform
+    return ("netstandard" if prefix == "netstandard" else "net"), version, platform
+
+def compatibility(target, candidate):
+    """
+    Ranks how well a package's framework folder serves a target framework.
+
+    Returns:
+        tuple or None: A sort key (higher is a better match), or None if the
+                       candidate cannot be used by the target.
+    """
+    if candidate.lower() == target.lower():
+        return (3, ())
+    wanted, offered = parse_framework(target), parse_framework(candidate)
+    if wanted is None or offered is None:
+        return None
+    family, version, platform = wanted
+    offered_family, offered_version, offered_platform = offered
+    if offered_platform and offered_platform != platform:
+        return None
+    if offered_family == family and offered_version <= version:
+        return (2, offered_version)
+    # .NET (Core) and .NET Framework both consume .NET Standard up to a limit
+    if offered_family == "netstandard":
+        limit = {"net": (2, 1), "netfx": (2, 0) if version >= (4, 6, 1) else (1, 4)}.get(family)
+        if limit and offered_version <= limit:
+            return (1, offered_version)
+    return None
+
+class PackageFilter:
+    """
+    Decides which members of a package to extract.
+
+    For every framework-specific folder (lib/, ref/, build/, buildTransitive/,
+    tools/, runtimes/<rid>/lib/, contentFiles/<lang>/) only the framework folder
+    nearest to each wanted target framework is kept. Files outside framework
+    folders (the nuspec, README, icon, content, analyzers) are always kept,
+    except for the groups named in strip. If no lib/ or ref/ folder suits any
+    wanted framework, all of them are kept with a warning.
+    """
+
+    def __init__(self, frameworks=None, strip=()):
+        """
+        Args:
+            frameworks (list, optional): Target framework monikers to keep, e.g.
+                                         ['net8.0']; None keeps every framework.
+            strip (iterable): Names from STRIP_GROUPS to leave out entirely.
+        """
+        unknown = set(strip) - set(STRIP_GROUPS)
+        if unknown:
+            raise ValueError(f"Unknown strip group(s): {', '.join(sorted(unknown))} "
+                             f"(choose from {', '.join(STRIP_GROUPS)})")
+        self.frameworks = [f.strip().lower() for f in frameworks or [] if f.strip()]
+        self.strip = tuple(strip)
+
+    def __bool__(self):
+        return bool(self.frameworks or self.strip)
+
+    @staticmethod
+    def _framework_slot(name):
+        """Returns (group folder, framework folder) for a framework-specific member, else None."""
+        parts = name.split('/')
+        if parts[0] in FRAMEWORK_FOLDERS and len(parts) > 2:
+            folder = parts[1].lower()
+            # lib/ and ref/ only hold framework folders; elsewhere other folders occur too
+            if parts[0] in ("lib", "ref") or folder == "any" or parse_framework(folder):
+                return parts[0], folder
+            return None
+        if parts[0] == "runtimes" and len(parts) > 4 and parts[2] == "lib":
+            return '/'.join(parts[:3]), parts[3].lower()
+        if parts[0] == "contentFiles" and len(parts) > 3:
+            return '/'.join(parts[:2]), parts[2].lower()
+        return None
+
+    def select(self, names, package_id=""):
+        """
+        Returns the subset of member names to extract.
+
+        Args:
+            names (list): Member names of one package, as in ZipFile.namelist().
+            package_id (str): Used in warnings.
+        """
+        names = [n for n in names if not any(STRIP_GROUPS[group](n) for group in self.strip)]
+        if not self.frameworks:
+            return names
+
+        # Framework folders offered by each group, e.g. {'lib': {'net6.0', 'netstandard2.0'}}
+        offered = collections.defaultdict(set)
+        for name in names:
+            slot = self._framework_slot(name)
+            if slot:
+                offered[slot[0]].add(slot[1])
+
+        keep = {}
+        for group, folders in offered.items():
+            chosen = set(folders) & {"any"} # contentFiles/<lang>/any/ applies to every framework
+            for target in self.frameworks:
+                ranked = [(compatibility(target, folder), folder) for folder in folders]
+                ranked = [(rank, folder) for rank, folder in ranked if rank is not None]
+                if ranked:
+                    chosen.add(max(ranked)[1])
+            if not chosen and group in ("lib", "ref"):
+                # Nothing fits: keeping every assembly is safer than shipping none. Other
+                # groups are simply dropped, as NuGet would not use them for these targets.
+                print(utilities.color(f"[FILTER] {package_id}: no {group}/ folder is compatible with "
+                                      f"{', '.join(self.frameworks)}; keeping all of {', '.join(sorted(folders))}", "YELLOW"))
+                chosen = folders
+            keep[group] = chosen
+
+        return [n for n in names if (slot := self._framework_slot(n)) is None or slot[1] in keep[slot[0]]]
+
+    def extract(self, zip_ref, extract_dir, package_id=""):
+        """
+        Extracts the selected members of an open package ZIP into extract_dir.
+
+        Returns:
+            FilterStats: Files and uncompressed bytes kept and dropped.
+        """
+        infos = zip_ref.infolist()
+        selected = set(self.select([info.filename for info in infos], package_id))
+        kept_files = kept_bytes = dropped_files = dropped_bytes = 0
+        for info in infos:
+            if info.filename in selected:
+                zip_ref.extract(info, extract_dir)
+                kept_files += 1
+                kept_bytes += info.file_size
+            elif not info.is_dir():
+                dropped_files += 1
+                dropped_bytes += info.file_size
+        return FilterStats(kept_files, kept_bytes, dropped_files, dropped_bytes)
+
+def from_options(frameworks=None, strip=None):
+    """
+    Builds a PackageFilter from CLI or job-file values ('net8.0,net48' strings or lists).
+
+    Returns:
+        PackageFilter or None: None when nothing is filtered.
+    """
+    if isinstance(frameworks, str):
+        frameworks = frameworks.split(',')
+    if isinstance(strip, str):
+        strip = strip.split(',')
+    package_filter = PackageFilter(frameworks, [s.strip() for s in strip or [] if s.strip()])
+    return package_filter or None
+
+def print_report(stats, package_id):
+    total = stats.kept_bytes + stats.dropped_bytes
+    saved = stats.dropped_bytes / total * 100 if total else 0.0
+    print(utilities.color(f"[FILTER] {package_id}: kept {stats.kept_files} file(s), dropped {stats.dropped_files} "
+                          f"({stats.dropped_bytes / (1024 * 1024):.1f} of {total / (1024 * 1024):.1f} MB, {saved:.0f}%)", "BLUE"))
@@ -0,0 +1,193 @@
+# ==============================================================================
+# WHALE-PUUP Pipeline Module (pipeline.py)
+# Runs NuGet mode as overlapping stages instead of one after another: packages
+# download concurrently, each is repacked into the archive as soon as it (and
+# every package before it) has arrived, and the archive bytes are Base64-encoded
+# on a thread of their own. Bounded queues between the stages hold back whichever
+# stage runs ahead, so memory stays flat however many packages there are.
+# ==============================================================================
+
+import os
+import queue
+import threading
+import contextlib
+import concurrent.futures
+import dedup
+import downloader
+import encoder
+import integrity
+import metrics
+import repack
+import utilities
+
+# --- Configuration ---
+# Downloaded packages that may wait for the repack stage, on top of those downloading.
+PACKAGE_QUEUE_SIZE = 8
+# Archive bytes are handed to the encode thread in pieces of this size, with at
+# most WRITE_QUEUE_SIZE pieces waiting.
+WRITE_CHUNK_SIZE = 1024 * 1024
+WRITE_QUEUE_SIZE = 8
+
+class BackgroundWriter:
+    """
+    A write-only binary stream that passes everything written to it on to another
+    stream from a background thread, through a bounded queue.
+
+    Writes are gathered into chunk_size pieces. Once queue_size pieces are waiting,
+    write blocks until the background thread catches up, so at most about
+    queue_size * chunk_size bytes are held. An error raised by the target stream
+    surfaces on the next write or on close.
+    """
+
+    def __init__(self, target, chunk_size=WRITE_CHUNK_SIZE, queue_size=WRITE_QUEUE_SIZE):
+        """
+        Args:
+            target: Writable binary stream, e.g. an encoder.Base64StreamWriter. It is
+                    not closed by this writer.
+            chunk_size (int): Bytes per queued piece.
+            queue_size (int): Pieces that may wait before write blocks.
+        """
+        self._target = target
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._buffer = bytearray()
+        self._position = 0
+        self._error = None
+        self.closed = False
+        self._thread = threading.Thread(target=self._drain, name="whale-puup-writer", daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self._error is None: # After an error, keep taking pieces so write never blocks forever
+                try:
+                    self._target.write(chunk)
+                except BaseException as e:
+                    self._error = e
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        """Returns the number of bytes written so far (ZipFile uses this for offsets)."""
+        return self._position
+
+    def write(self, data):
+        if self._error is not None:
+            raise self._error
+        self._buffer += data
+        self._position += len(data)
+        if len(self._buffer) >= self._chunk_size:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def flush(self):
+        pass # Pieces are flushed as they fill; close() sends the rest
+
+    def close(self):
+        """Sends the last piece, waits for the background thread, and re-raises its error."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+def archive_packages_pipelined(package_list, work_dir, dest_folder, max_workers=downloader.DEFAULT_MAX_WORKERS,
+                               session=None, feed=None, cache=None, verifier=None,
+                               write_readme=None, deduplicate=False, compression_policy=None, package_filter=None,
+                               queue_size=PACKAGE_QUEUE_SIZE, partial_dir=downloader.DEFAULT_PARTIAL_DIR, codec=None):
+    """
+    Downloads, repacks and Base64-encodes packages as one pipeline.
+
+    Packages are downloaded max_workers at a time into work_dir and kept whole
+    (see downloader.iter_downloads). The main thread repacks each into the archive
+    in list order (see repack.RepackWriter), and a background thread encodes the
+    archive bytes. The output is the same archive the sequential path builds,
+    except that the readme comes last rather than first. It is written to
+    '<work_dir name>.base64.txt' in dest_folder, with its integrity manifest.
+
+    Args:
+        package_list (list): Package IDs, optionally pinned as 'Id@Version'.
+        work_dir (str): Existing folder the packages are saved in; the caller removes it.
+        dest_folder (str): Folder that receives the Base64 output.
+        max_workers (int): Concurrent downloads.
+        session (requests.Session, optional): Shared pooled session.
+        feed (feeds.Feed or str, optional): Where packages come from; nuget.org if None.
+        cache (cache.PackageCache, optional): Package cache consulted before the network.
+        verifier (callable, optional): Returns NuGet's published SHA-512 (see
+                                       downloader.download_packages).
+        write_readme (callable, optional): write_readme(work_dir) writes the dependency
+                                           readme and returns its path (or None). It
+                                           runs on its own thread while packages download.
+        deduplicate (bool): Store identical files once.
+        compression_policy (str, optional): A compression.POLICIES name or a policy.
+        package_filter (package_filter.PackageFilter, optional): Members to keep.
+        queue_size (int): Downloaded packages that may wait for the repack stage.
+        partial_dir (str, optional): Where an incomplete download is kept for the next run.
+        codec (str, optional): A textcodec.CODECS name for the text output; Base64 if None.
+
+    Returns:
+        str: Path of the Base64 TXT file.
+
+    Raises:
+        Exception: If a package cannot be downloaded; the partial output is removed.
+    """
+    base_name = os.path.basename(work_dir)
+    base64_path = os.path.join(dest_folder, base_name + ".base64.txt")
+    manifest_path = integrity.manifest_path_for(base64_path)
+    hasher = integrity.BlockHasher()
+    print(utilities.color(f"[PIPELINE] Downloading, repacking and encoding {len(package_list)} package(s) "
+                          f"as they arrive...", "YELLOW"))
+
+    readme_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    readme_future = readme_pool.submit(write_readme, work_dir) if write_readme else None
+    downloads = downloader.iter_downloads(package_list, work_dir, max_workers + queue_size, max_workers, session,
+                                          feed, cache, verifier=verifier, partial_dir=partial_dir,
+                                          extract=False)
+    try:
+        with metrics.stage("pipeline", base_name) as stage, contextlib.closing(downloads), \
+                encoder.Base64StreamWriter(base64_path, hasher=hasher, codec=codec) as b64_stream:
+            background = BackgroundWriter(b64_stream)
+            try:
+                with repack.RepackWriter(background, compression_policy, package_filter, deduplicate) as writer:
+                    # 1. --- Repack Each Package As Soon As It Arrives ---
+                    for package_spec, succeeded in downloads:
+                        if not succeeded:
+                            raise Exception(f"NuGet download or extraction failed: {package_spec}")
+                        package_id = downloader.parse_package_spec(package_spec)[0]
+                        writer.add_package(package_id, os.path.join(work_dir, package_id + repack.PACKAGE_SUFFIX))
+
+                    # 2. --- Then the Readme, Resolved Meanwhile ---
+                    readme_path = readme_future.result() if readme_future else None
+                    if readme_path:
+                        writer.add_file(readme_path, os.path.relpath(readme_path, work_dir))
+            finally:
+                background.close()
+            stage.bytes = hasher.size
+        integrity.write_manifest(manifest_path, hasher, base64_path)
+    except BaseException:
+        for path in (base64_path, manifest_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        readme_pool.shutdown(wait=True)
+
+    stats = writer.stats
+    if deduplicate:
+        dedup.print_report(stats["dedup"])
+    repack.print_report(stats)
+    print(utilities.color(f"[ENCODE] Archived {stats['files']} file(s); Base64 file saved to: {base64_path}", "GREEN"))
+    return base64_path
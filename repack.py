@@ -0,0 +1,266 @@
+# ==============================================================================
+# WHALE-PUUP Repack Module (repack.py)
+# Builds the NuGet-mode archive straight from the downloaded .nupkg files. Each
+# package's members are copied into the output ZIP under '<package_id>/', as
+# their raw compressed bytes wherever the compression policy allows, so packages
+# are never extracted to disk, walked again, or deleted file by file.
+# ==============================================================================
+
+import os
+import hashlib
+import zipfile
+import tempfile
+import collections
+import compression
+import dedup
+import metrics
+import package_filter as filters
+import utilities
+import zipwriter
+
+# --- Configuration ---
+# Downloaded packages in a NuGet-mode work folder end with this; everything else
+# there (the dependency readme) is archived as an ordinary file.
+PACKAGE_SUFFIX = ".nupkg"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# One member to copy: its entry in the package's central directory and its name in the output.
+RepackMember = collections.namedtuple("RepackMember", ["info", "arcname"])
+
+def find_packages(source_dir):
+    """
+    Splits a NuGet-mode work folder into downloaded packages and loose files.
+
+    Returns:
+        tuple (dict, list): package ID -> .nupkg path, in name order, and the
+                            zipwriter.Member list of everything else.
+    """
+    packages = {}
+    for name in sorted(os.listdir(source_dir)):
+        path = os.path.join(source_dir, name)
+        if name.lower().endswith(PACKAGE_SUFFIX) and os.path.isfile(path):
+            packages[name[:-len(PACKAGE_SUFFIX)]] = path
+    package_paths = set(packages.values())
+    loose = [member for member in zipwriter.collect_members(source_dir) if member.path not in package_paths]
+    return packages, loose
+
+def member_arcname(package_id, name):
+    """
+    Returns the output name of a package member: '<package_id>/<name>', with empty,
+    '.' and '..' parts dropped so nothing lands outside the package's folder (as
+    ZipFile.extract would). Returns None for a name that has no parts left.
+    """
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..')]
+    if not parts:
+        return None
+    return '/'.join([package_id] + parts) + ('/' if name.endswith('/') else '')
+
+def select_members(zip_ref, package_id, package_filter=None):
+    """
+    Lists the members of one open package to copy, after filtering.
+
+    Returns:
+        tuple (list, FilterStats or None): RepackMembers in central-directory order,
+                                           and what the filter kept and dropped.
+    """
+    infos = zip_ref.infolist()
+    filter_stats = None
+    if package_filter:
+        selected = set(package_filter.select([info.filename for info in infos], package_id))
+        kept = [info for info in infos if info.filename in selected]
+        dropped = [info for info in infos if info.filename not in selected and not info.is_dir()]
+        filter_stats = filters.FilterStats(sum(1 for info in kept if not info.is_dir()), sum(info.file_size for info in kept),
+                                           len(dropped), sum(info.file_size for info in dropped))
+        infos = kept
+    members = []
+    for info in infos:
+        arcname = member_arcname(package_id, info.filename)
+        if arcname is not None:
+            members.append(RepackMember(info, arcname))
+    return members, filter_stats
+
+def _sha256_member(package_path, info):
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(package_path) as zip_ref, zip_ref.open(info) as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class RepackWriter:
+    """
+    Writes an archive from packages added one at a time, e.g. as they finish
+    downloading. Each package's members go under '<package_id>/' in central-directory
+    order. Members the policy accepts as they are (see
+    CompressionPolicy.repack_choice) are copied as raw compressed bytes; the rest are
+    inflated and recompressed in memory. Works on unseekable streams.
+
+    Deduplication runs as members arrive: a member is inflated and hashed only when
+    an earlier member has the same CRC-32 and size (both read from the central
+    directory), so the result matches a plan made over every package up front.
+    Packages must stay on disk until the writer is closed.
+    """
+
+    def __init__(self, fileobj, policy=None, package_filter=None, deduplicate=False):
+        """
+        Args:
+            fileobj: A writable binary stream, or a path, for the archive.
+            policy (compression.CompressionPolicy or str, optional): Compression policy.
+            package_filter (package_filter.PackageFilter, optional): Copy only the wanted
+                                                                     target frameworks
+                                                                     and drop stripped groups.
+            deduplicate (bool): Store members with identical content once, with the
+                                index dedup.restore_archive reads.
+        """
+        self.policy = compression.get_policy(policy)
+        self.package_filter = package_filter
+        self.deduplicate = deduplicate
+        self.stats = {"packages": 0, "files": 0, "copied_files": 0, "recompressed_files": 0, "copied_bytes": 0}
+        self.dedup_stats = {"files": 0, "duplicate_files": 0, "hashed_files": 0, "logical_bytes": 0, "stored_bytes": 0}
+        self._duplicates = {}
+        self._blobs = {} # (CRC, size) -> [[arcname, package path, ZipInfo, sha256 or None], ...]
+        self._spool = tempfile.TemporaryDirectory(prefix="whale_puup_spool_")
+        self._zf = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+
+    def add_file(self, file_path, arcname):
+        """Compresses one loose file (e.g. the dependency readme), or adds a directory entry."""
+        if os.path.isdir(file_path):
+            self._zf.write(file_path, arcname)
+            return
+        compressed = zipwriter.compress_file(file_path, self.policy, self._spool.name)
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+        zinfo.compress_type = compressed.compress_type
+        zipwriter.write_raw_member(self._zf, zinfo, compressed)
+        self.stats["files"] += 1
+
+    def add_package(self, package_id, package_path):
+        """Copies the (filtered) members of one .nupkg into the archive under '<package_id>/'."""
+        with metrics.stage("repack", package_id) as stage, open(package_path, 'rb') as fp, \
+                zipfile.ZipFile(fp) as zip_ref:
+            members, filter_stats = select_members(zip_ref, package_id, self.package_filter)
+            for member in members:
+                if self.deduplicate and not member.info.is_dir():
+                    self.dedup_stats["files"] += 1
+                    self.dedup_stats["logical_bytes"] += member.info.file_size
+                    blob = self._duplicate_of(package_path, member) if member.info.file_size else None
+                    if blob is not None:
+                        self._duplicates[member.arcname] = blob
+                        self.dedup_stats["duplicate_files"] += 1
+                        self.stats["files"] += 1
+                        continue
+                    self.dedup_stats["stored_bytes"] += member.info.file_size
+                stage.add(self._copy_member(zip_ref, fp, member))
+        self.stats["packages"] += 1
+        if filter_stats:
+            filters.print_report(filter_stats, package_id)
+
+    def _duplicate_of(self, package_path, member):
+        """Returns the arcname of an earlier member with the same content, or None (recording this one)."""
+        stored = self._blobs.setdefault((member.info.CRC, member.info.file_size), [])
+        digest = None
+        if stored:
+            digest = self._digest(package_path, member.info)
+            for blob in stored:
+                if blob[3] is None:
+                    blob[3] = self._digest(blob[1], blob[2])
+                if blob[3] == digest:
+                    return blob[0]
+        stored.append([member.arcname, package_path, member.info, digest])
+        return None
+
+    def _digest(self, package_path, info):
+        self.dedup_stats["hashed_files"] += 1
+        return _sha256_member(package_path, info)
+
+    def _copy_member(self, zip_ref, fp, member):
+        """Writes one package member. Returns its uncompressed size."""
+        info = member.info
+        zinfo = zipwriter.copy_info(info, member.arcname)
+        if info.is_dir():
+            self._zf.writestr(zinfo, b'')
+            return 0
+        if info.flag_bits & 0x1:
+            raise zipfile.BadZipFile(f"{member.arcname} is encrypted")
+
+        choice = self.policy.repack_choice(info.filename, info.compress_type)
+        if choice is None:
+            # The compressed bytes go across untouched; the package as a whole was
+            # already checked against its published SHA-512 when it was downloaded.
+            compressed = zipwriter.CompressedFile(info.CRC, info.file_size, info.compress_size, None, None, None,
+                                                  info.compress_type)
+            offset = zipwriter.raw_data_offset(fp, info)
+            zipwriter.write_raw_member(self._zf, zinfo, compressed,
+                                       lambda out: zipwriter.copy_raw_payload(fp, offset, info.compress_size, out))
+            self.stats["copied_files"] += 1
+            self.stats["copied_bytes"] += info.compress_size
+        else:
+            compress_type, level = choice
+            with zip_ref.open(info) as source: # Inflating checks the member's CRC
+                compressed = zipwriter.compress_stream(source, info.file_size, compress_type, level,
+                                                       self.policy.store_if_larger, self._spool.name)
+            zinfo.compress_type = compressed.compress_type
+            zipwriter.write_raw_member(self._zf, zinfo, compressed)
+            self.stats["recompressed_files"] += 1
+        self.stats["files"] += 1
+        return info.file_size
+
+    def close(self):
+        """
+        Writes the dedup index (if any member was a duplicate) and the central directory.
+
+        Returns:
+            dict: packages, files (including deduplicated copies), copied_files,
+                  recompressed_files, copied_bytes, and 'dedup' stats when deduplicating.
+        """
+        try:
+            if self._duplicates:
+                self._zf.writestr(*dedup.index_entry(self._duplicates, self.dedup_stats))
+            self._zf.close()
+        finally:
+            self._spool.cleanup()
+        if self.deduplicate:
+            self.stats["dedup"] = self.dedup_stats
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # The archive is incomplete and will be discarded; just release what is held
+            self._spool.cleanup()
+
+def write_zip_repack(source_dir, fileobj, policy=None, package_filter=None, deduplicate=False):
+    """
+    Writes the archive of a NuGet-mode work folder without extracting its packages.
+
+    Loose files (the dependency readme) come first, as a directory walk lists them,
+    then each package in name order, with the same member names an extracted folder
+    would have produced (see RepackWriter).
+
+    Args:
+        source_dir (str): Folder holding '<package_id>.nupkg' files and loose files.
+        fileobj: A writable binary stream, or a path, for the archive.
+        policy (compression.CompressionPolicy or str, optional): Compression policy.
+        package_filter (package_filter.PackageFilter, optional): Members to keep.
+        deduplicate (bool): Store members with identical content once.
+
+    Returns:
+        dict: Stats, as returned by RepackWriter.close.
+    """
+    packages, loose = find_packages(source_dir)
+    writer = RepackWriter(fileobj, policy, package_filter, deduplicate)
+    with writer:
+        for member in loose:
+            writer.add_file(member.path, member.arcname)
+        for package_id, package_path in packages.items():
+            writer.add_package(package_id, package_path)
+    return writer.stats
+
+def print_report(stats):
+    """Prints how many members were copied as-is and how many were recompressed."""
+    print(utilities.color(
+        f"[REPACK] {stats['files']} file(s) from {stats['packages']} package(s): {stats['copied_files']} copied "
+        f"without recompression ({stats['copied_bytes'] / (1024 * 1024):.1f} MB), "
+        f"{stats['recompressed_files']} recompressed.", "BLUE"))
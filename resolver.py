@@ -0,0 +1,314 @@
+# ==============================================================================
+# WHALE-PUUP Dependency Resolver Module (resolver.py)
+# Walks the transitive NuGet dependency graph using registration metadata.
+# Each breadth-first level is fetched concurrently, and every package's metadata
+# is fetched at most once per resolver, however many packages depend on it.
+# ==============================================================================
+
+import re
+import json
+import threading
+import concurrent.futures
+import requests
+import downloader
+import feeds
+import utilities
+
+# --- Configuration ---
+DEFAULT_MAX_WORKERS = 16
+
+_VERSION_RE = re.compile(r'^\s*(\d+(?:\.\d+)*)(?:-([0-9A-Za-z.-]+))?(?:\+.*)?\s*$')
+
+def version_key(version):
+    """
+    Returns a sort key for a NuGet version string ('1.2', '1.2.0.0' and '1.2.0' sort equal).
+
+    Stable versions sort after their prereleases, as in SemVer.
+    """
+    match = _VERSION_RE.match(version)
+    if not match:
+        return ((0, 0, 0, 0), 0, version)
+    numbers = tuple(int(n) for n in match.group(1).split('.'))
+    numbers = (numbers + (0, 0, 0, 0))[:4]
+    prerelease = match.group(2)
+    return (numbers, 1 if prerelease is None else 0, prerelease or "")
+
+def is_prerelease(version):
+    match = _VERSION_RE.match(version)
+    return bool(match and match.group(2))
+
+def range_minimum(version_range):
+    """
+    Extracts the lower bound of a NuGet version range.
+
+    '1.0' means '>= 1.0' and '[1.0, 2.0)' has lower bound 1.0; an open lower
+    bound ('(, 2.0)') or empty range returns None.
+
+    Returns:
+        tuple (str or None, bool): The minimum version and whether it is inclusive.
+    """
+    text = (version_range or "").strip()
+    if not text:
+        return None, True
+    if text[0] not in "[(":
+        return text, True
+    lower = text[1:].split(',')[0].rstrip(')]').strip()
+    return (lower or None), text[0] == '['
+
+class DependencyResolver:
+    """
+    Resolves transitive dependencies against a feed's metadata (a NuGet V3
+    registration endpoint, or the nuspecs of a folder feed).
+
+    Versions are picked deterministically: a root uses its pinned version or the
+    latest stable one, and each dependency uses the lowest available version that
+    satisfies the highest lower bound seen for it (NuGet's "lowest applicable
+    version" rule), so every package ID appears once in the result.
+    Registration metadata is memoized on the resolver, so reusing one instance
+    across runs or packages never fetches the same index twice.
+    """
+
+    def __init__(self, session=None, feed=None, max_workers=DEFAULT_MAX_WORKERS, target_framework=None):
+        """
+        Args:
+            session (requests.Session, optional): Shared session; one is created if omitted.
+            feed (feeds.Feed or str, optional): Where metadata comes from (see
+                                                feeds.get_feed); nuget.org if None.
+            max_workers (int): Concurrent metadata requests per level.
+            target_framework (str, optional): Only follow this framework's dependency
+                                              group (e.g. 'net8.0'); all groups if None.
+        """
+        self.session = session or downloader.create_session(max_workers)
+        self.feed = feeds.get_feed(feed)
+        self.max_workers = max_workers
+        self.target_framework = target_framework.lower() if target_framework else None
+        self.request_count = 0
+        self.round_trips = 0
+        self._count_lock = threading.Lock()
+        self._metadata = {} # id-lowercase -> {version: catalogEntry} or an error string
+        self._hashes = {} # (id-lowercase, version) -> packageHash or None
+        self._in_flight = {} # id-lowercase -> Event set once another thread has fetched it
+        self._in_flight_lock = threading.Lock()
+
+    # --- Metadata fetching ---
+
+    def _fetch(self, url):
+        with self._count_lock:
+            self.request_count += 1
+        return self.feed.fetch(self.session, url)
+
+    def _fetch_registration(self, package_id):
+        """Fetches every version's catalog entry for one package from the feed."""
+        try:
+            return self.feed.registration(package_id, self._fetch)
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            return f"Error: Could not fetch metadata for {package_id} ({e})"
+
+    def _prefetch(self, package_ids):
+        """
+        Fetches all not-yet-known package IDs of one BFS level concurrently. IDs that
+        another thread (e.g. a download checking its hash) is already fetching are
+        waited for rather than fetched twice.
+        """
+        wanted = {pid.lower() for pid in package_ids} - set(self._metadata)
+        with self._in_flight_lock:
+            waiting = [self._in_flight[pid] for pid in wanted if pid in self._in_flight]
+            missing = sorted(pid for pid in wanted if pid not in self._in_flight)
+            fetched = threading.Event()
+            for pid in missing:
+                self._in_flight[pid] = fetched
+        if missing:
+            self.round_trips += 1
+            try:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    for package_id, entries in zip(missing, pool.map(self._fetch_registration, missing)):
+                        self._metadata[package_id] = entries
+            finally:
+                with self._in_flight_lock:
+                    for pid in missing:
+                        del self._in_flight[pid]
+                fetched.set()
+        for event in waiting:
+            event.wait()
+
+    # --- Version selection ---
+
+    def _pick_version(self, entries, minimum, inclusive, is_root):
+        """
+        Chooses a version deterministically.
+
+        An unpinned root gets the latest stable version (or latest prerelease if there
+        is no stable one), and a pinned root exactly its pin (or nothing, since the
+        downloader fetches the pin itself). Everything else gets the exact minimum if
+        it exists, otherwise the lowest available version above the bound.
+        """
+        versions = sorted(entries, key=version_key)
+        if not versions:
+            return None
+        if minimum is None and is_root:
+            stable = [v for v in versions if not is_prerelease(v)]
+            return (stable or versions)[-1]
+        if is_root:
+            return next((v for v in versions if version_key(v) == version_key(minimum)), None)
+        if minimum is None:
+            return versions[0]
+        if inclusive and minimum in entries:
+            return minimum
+        floor = version_key(minimum)
+        for version in versions:
+            key = version_key(version)
+            if key > floor or (inclusive and key == floor):
+                return version
+        return None
+
+    def _dependencies_of(self, entry):
+        """Returns [(group label, [(dep id, range)])] for the selected framework(s)."""
+        groups = []
+        for group in entry.get("dependencyGroups", []) or []:
+            framework = group.get("targetFramework", "") or ""
+            if self.target_framework and framework.lower() not in ("", self.target_framework):
+                continue
+            deps = [(d["id"], d.get("range", "")) for d in group.get("dependencies", []) or []]
+            groups.append((framework or "any", deps))
+        return groups
+
+    # --- Public API ---
+
+    def package_hash(self, package_id, version):
+        """
+        Returns the published packageHash (Base64 SHA-512) of one package version.
+
+        Registration leaves usually carry the hash inline; otherwise it is read from
+        the version's catalog leaf. Results are memoized.
+
+        Returns:
+            str or None: The hash, or None if the feed does not publish one.
+        """
+        key = (package_id.lower(), version)
+        if key in self._hashes:
+            return self._hashes[key]
+
+        self._prefetch([package_id])
+        entries = self._metadata.get(package_id.lower())
+        entry = None
+        if isinstance(entries, dict):
+            entry = entries.get(version) or next(
+                (e for v, e in entries.items() if version_key(v) == version_key(version)), None)
+
+        package_hash = None
+        if entry is not None:
+            package_hash = entry.get("packageHash")
+            if package_hash is None and entry.get("@id"):
+                try:
+                    leaf = json.loads(self._fetch(entry["@id"]))
+                    if leaf.get("packageHashAlgorithm", "SHA512").upper() == "SHA512":
+                        package_hash = leaf.get("packageHash")
+                except (requests.exceptions.RequestException, ValueError):
+                    package_hash = None
+        self._hashes[key] = package_hash
+        return package_hash
+
+    def resolve(self, package_specs):
+        """
+        Resolves the transitive closure of the given packages breadth-first.
+
+        Each package ID resolves to a single version. When a later constraint needs a
+        higher version than the one already picked, the ID is raised to it and its
+        dependencies are re-walked from the memoized metadata (no new requests unless
+        new IDs appear). The result then keeps only what the final versions still
+        reach from the roots, so a dependency that only a superseded version needed
+        is not listed.
+
+        Args:
+            package_specs (list): Package IDs, optionally pinned as 'Id@Version'.
+
+        Returns:
+            dict: '<Id> <Version>' -> list of dependency lines in the format
+                  utilities.create_readme_file expects ('--- Group: <tfm> ---'
+                  headers followed by '<Id> (Version: <range>)' lines, or a single
+                  'Error: ...' line keyed by the bare ID), for every package in the
+                  closure.
+        """
+        chosen = {} # id-lowercase -> selected version
+        errors = {} # id-lowercase -> (display ID, error line)
+        level = []
+        for spec in package_specs:
+            package_id, version = downloader.parse_package_spec(spec)
+            level.append((package_id, version, True, True))
+
+        while level:
+            self._prefetch(package_id for package_id, _, _, _ in level)
+            next_level = []
+
+            for package_id, minimum, inclusive, is_root in level:
+                lower = package_id.lower()
+                entries = self._metadata[lower]
+                if isinstance(entries, str):
+                    errors.setdefault(lower, (package_id, entries))
+                    continue
+
+                candidate = self._pick_version(entries, minimum, inclusive, is_root)
+                if candidate is None:
+                    errors.setdefault(lower, (package_id, f"Error: No version of {package_id} satisfies '{minimum}'"))
+                    continue
+                current = chosen.get(lower)
+                if current is not None and version_key(candidate) <= version_key(current):
+                    continue # Already satisfied by the version picked earlier
+
+                chosen[lower] = candidate
+                for _, deps in self._dependencies_of(entries[candidate]):
+                    for dep_id, dep_range in deps:
+                        dep_minimum, dep_inclusive = range_minimum(dep_range)
+                        next_level.append((dep_id, dep_minimum, dep_inclusive, False))
+
+            level = next_level
+
+        # --- Keep only the packages the final selection reaches ---
+        reachable = set()
+        stack = [downloader.parse_package_spec(spec)[0].lower() for spec in package_specs]
+        while stack:
+            lower = stack.pop()
+            if lower in reachable:
+                continue
+            reachable.add(lower)
+            if lower in chosen:
+                for _, deps in self._dependencies_of(self._metadata[lower][chosen[lower]]):
+                    stack.extend(dep_id.lower() for dep_id, _ in deps)
+
+        # --- Build the readme structure from the final selection ---
+        package_dependencies = {}
+        for lower, version in chosen.items():
+            if lower not in reachable:
+                continue
+            entry = self._metadata[lower][version]
+            lines = []
+            for framework, deps in self._dependencies_of(entry):
+                lines.append(f"--- Group: {framework} ---")
+                lines.extend(f"{dep_id} (Version: {dep_range or 'any'})" for dep_id, dep_range in deps)
+            package_dependencies[f"{entry.get('id', lower)} {version}"] = lines
+        for lower, (package_id, error) in errors.items():
+            if lower not in chosen and lower in reachable:
+                package_dependencies[package_id] = [error]
+
+        return package_dependencies
+
+def resolve_and_write_readme(package_specs, output_folder, resolver=None):
+    """
+    Resolves the dependency closure of package_specs and writes readme_puup_file.txt.
+
+    Returns:
+        str or None: The readme path, or None if resolution failed entirely.
+    """
+    resolver = resolver or DependencyResolver()
+    print(utilities.color("[RESOLVE] Resolving transitive NuGet dependencies...", "YELLOW"))
+    try:
+        package_dependencies = resolver.resolve(package_specs)
+    except Exception as e:
+        print(utilities.color(f"[ERROR] Dependency resolution failed: {e}", "RED"))
+        return None
+    readme_path = utilities.create_readme_file(package_dependencies, output_folder)
+    print(utilities.color(
+        f"[RESOLVE] {len(package_dependencies)} package(s) in the closure, "
+        f"{resolver.request_count} request(s) over {resolver.round_trips} round trip(s). "
+        f"Readme written to: {readme_path}", "GREEN"))
+    return readme_path
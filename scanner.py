@@ -0,0 +1,341 @@
+# ==============================================================================
+# WHALE-PUUP Scanner Module (scanner.py)
+# Lists the files of a folder for archiving. Directories are listed in parallel
+# with os.scandir, and gitignore-style rules are compiled once and applied as
+# entries are listed, so excluded folders (.git, bin, obj, node_modules, ...)
+# are pruned without ever being opened. The result is the member list the
+# archivers take, in the same order a sorted os.walk gives.
+# ==============================================================================
+
+import os
+import re
+import threading
+import collections
+import metrics
+import utilities
+import zipwriter
+
+# --- Configuration ---
+# Build output, VCS metadata and dependency folders left out of folder mode unless
+# default_excludes is turned off. Any rule can re-include them with '!'.
+DEFAULT_EXCLUDES = (".git/", ".hg/", ".svn/", ".vs/", "bin/", "obj/", "node_modules/", "__pycache__/")
+# Rules in the root of the scanned folder are read from this file, if present.
+IGNORE_FILENAME = ".whaleignore"
+# Directories listed at the same time (listing is I/O bound).
+SCAN_WORKERS = 8
+
+# What a scan found and what the rules left out. Excluded folders are not
+# descended into, so files below them are not counted.
+ScanStats = collections.namedtuple("ScanStats", ["files", "dirs", "bytes", "excluded_files", "excluded_dirs",
+                                                 "unreadable"])
+
+def _translate(pattern):
+    """Returns the regular expression for one gitignore glob (without '!' or a trailing '/')."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith("**", i):
+                # '**/' matches zero or more folders; a trailing '/**' everything inside
+                if pattern.startswith("**/", i):
+                    out.append("(?:.*/)?")
+                    i += 3
+                else:
+                    out.append(".*")
+                    i += 2
+                continue
+            out.append("[^/]*")
+        elif c == '?':
+            out.append("[^/]")
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', '^') else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+class ScanRules:
+    """
+    gitignore-style rules, compiled once.
+
+    Each rule is a glob: '*' and '?' stay within one path segment, '**' spans
+    folders, '[...]' is a character class. A rule with a '/' before its end is
+    matched against the path from the scanned folder; any other rule against the
+    name at every depth. A trailing '/' matches folders only, and a leading '!'
+    re-includes what an earlier rule excluded. The last matching rule wins, and
+    nothing inside an excluded folder can be re-included, because excluded
+    folders are never opened (as in git).
+
+    Consecutive rules of the same kind are merged into one regular expression per
+    target (name or path, any entry or folders only), so matching an entry costs a
+    few regex calls however many rules there are.
+    """
+
+    def __init__(self, patterns=()):
+        """
+        Args:
+            patterns (iterable): Rule lines; blank lines and '#' comments are skipped.
+
+        Raises:
+            ValueError: If a rule is not a valid pattern (e.g. a reversed range '[z-a]').
+        """
+        self.patterns = []
+        groups = [] # [negated, {(on_path, dir_only): [regex, ...]}]
+        for line in patterns:
+            rule = line.rstrip("\n")
+            if not rule.endswith("\\ "):
+                rule = rule.rstrip()
+            if not rule or rule.startswith('#'):
+                continue
+            self.patterns.append(rule)
+            negated = rule.startswith('!')
+            if negated:
+                rule = rule[1:]
+            elif rule.startswith(("\\!", "\\#")):
+                rule = rule[1:]
+            dir_only = rule.endswith('/')
+            rule = rule.rstrip('/')
+            on_path = '/' in rule
+            regex = _translate(rule.lstrip('/'))
+            try:
+                re.compile(regex)
+            except re.error as e:
+                raise ValueError(f"Invalid scan rule '{self.patterns[-1]}': {e}")
+            if not groups or groups[-1][0] != negated:
+                groups.append([negated, collections.defaultdict(list)])
+            groups[-1][1][(on_path, dir_only)].append(regex)
+
+        # Checked last rule first: the first group that matches decides
+        self._groups = []
+        for negated, regexes in reversed(groups):
+            compiled = {key: re.compile('|'.join(f"(?:{r})" for r in rs), re.DOTALL).fullmatch
+                        for key, rs in regexes.items()}
+            self._groups.append((negated, compiled.get((False, False)), compiled.get((True, False)),
+                                 compiled.get((False, True)), compiled.get((True, True))))
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def excluded(self, name, rel_path, is_dir):
+        """
+        Returns True if the rules leave an entry out.
+
+        Args:
+            name (str): The entry's name.
+            rel_path (str): Its path from the scanned folder, with '/' separators.
+            is_dir (bool): The entry is a folder.
+        """
+        for negated, name_any, path_any, name_dir, path_dir in self._groups:
+            if ((name_any and name_any(name)) or (path_any and path_any(rel_path))
+                    or (is_dir and ((name_dir and name_dir(name)) or (path_dir and path_dir(rel_path))))):
+                return not negated
+        return False
+
+def load_rules(source_dir, exclude=(), include=(), default_excludes=True):
+    """
+    Builds the rules for scanning a folder, in order (later rules win):
+    DEFAULT_EXCLUDES, the folder's own .whaleignore, exclude, then include as
+    '!' rules that re-include matching paths.
+
+    Args:
+        source_dir (str): The folder to be scanned.
+        exclude (iterable or str): Extra rules ('a,b' strings are split on commas).
+        include (iterable or str): Patterns to keep even if an earlier rule excludes them.
+        default_excludes (bool): Start from DEFAULT_EXCLUDES.
+
+    Returns:
+        ScanRules: The rules (empty if there are none).
+    """
+    if isinstance(exclude, str):
+        exclude = exclude.split(',')
+    if isinstance(include, str):
+        include = include.split(',')
+    patterns = list(DEFAULT_EXCLUDES) if default_excludes else []
+    try:
+        with open(os.path.join(source_dir, IGNORE_FILENAME), 'r', encoding='utf-8-sig') as f:
+            patterns.extend(f.read().splitlines())
+    except OSError:
+        pass
+    patterns.extend(p.strip() for p in exclude or [] if p.strip())
+    patterns.extend('!' + p.strip().lstrip('!') for p in include or [] if p.strip())
+    return ScanRules(patterns)
+
+def _list_dir(dir_path, rel_dir, rules):
+    """
+    Lists one folder, applying the rules.
+
+    Returns:
+        tuple: ([(name, size, mtime_ns)] files kept, [name] folders to descend into,
+               files excluded, folders excluded, entries that could not be read).
+    """
+    files, dirs = [], []
+    excluded_files = excluded_dirs = unreadable = 0
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                name = entry.name
+                try:
+                    is_dir = entry.is_dir()
+                    if is_dir and entry.is_symlink():
+                        continue # Linked folders are not followed (as os.walk does by default)
+                    if rules and rules.excluded(name, f"{rel_dir}/{name}" if rel_dir else name, is_dir):
+                        if is_dir:
+                            excluded_dirs += 1
+                        else:
+                            excluded_files += 1
+                        continue
+                    if is_dir:
+                        dirs.append(name)
+                    else:
+                        st = entry.stat() # Follows a link to its target's size, like os.path.getsize
+                        files.append((name, st.st_size, st.st_mtime_ns))
+                except OSError:
+                    unreadable += 1 # e.g. a dangling link, or removed while scanning
+    except OSError:
+        unreadable += 1
+    return files, dirs, excluded_files, excluded_dirs, unreadable
+
+def scan_tree(source_dir, rules=None, prefix="", max_workers=SCAN_WORKERS):
+    """
+    Lists everything under source_dir that the rules keep, as archive members.
+
+    Folders are listed with os.scandir by max_workers threads (the calling
+    thread being one of them); excluded folders are pruned as they are listed,
+    so nothing below them is ever opened. Without rules the result matches
+    zipwriter.collect_members exactly: members in sorted walk order, each folder
+    before its contents, arcnames relative to source_dir (optionally under
+    prefix), and empty folders kept. Folder links are not followed.
+
+    Args:
+        source_dir (str): The folder to scan.
+        rules (ScanRules, optional): What to leave out; everything is kept if None.
+        prefix (str): Optional leading folder for every arcname.
+        max_workers (int): Folders listed at the same time.
+
+    Returns:
+        tuple (list, ScanStats): The zipwriter.Member list (file members carry
+                                 mtime_ns) and what was found and left out.
+    """
+    rules = rules or None # Empty rules skip matching altogether
+    listings = {} # rel dir ('' for the root) -> (sorted files, sorted dirs)
+    shared = [""] # Folders waiting for any thread
+    totals = [0, 0, 0] # Excluded files, excluded folders, unreadable entries
+    state = {"idle": 0, "finished": False, "error": None}
+    condition = threading.Condition()
+    worker_count = max(1, max_workers)
+
+    def take():
+        """Waits for a shared folder; returns None once every thread is idle and none are left."""
+        with condition:
+            state["idle"] += 1
+            while not shared:
+                if state["finished"] or state["idle"] == worker_count:
+                    state["finished"] = True
+                    condition.notify_all()
+                    return None
+                condition.wait()
+            state["idle"] -= 1
+            return shared.pop()
+
+    def work():
+        # Each thread walks depth-first from its own stack and only hands half of it
+        # over when another thread is idle, so most folders cost no locking at all.
+        local = []
+        counts = [0, 0, 0]
+        try:
+            while True:
+                if not local:
+                    rel_dir = take()
+                    if rel_dir is None:
+                        break
+                    local.append(rel_dir)
+                rel_dir = local.pop()
+                dir_path = os.path.join(source_dir, rel_dir) if rel_dir else source_dir
+                files, dirs, *skipped = _list_dir(dir_path, rel_dir.replace(os.sep, '/'), rules)
+                files.sort()
+                dirs.sort()
+                listings[rel_dir] = (files, dirs)
+                for i, count in enumerate(skipped):
+                    counts[i] += count
+                rel_prefix = rel_dir + os.sep if rel_dir else ""
+                local.extend(rel_prefix + name for name in dirs)
+                if state["idle"] and len(local) > 1:
+                    with condition:
+                        half = len(local) // 2
+                        shared.extend(local[:half])
+                        del local[:half]
+                        condition.notify(half)
+        except BaseException as e:
+            with condition:
+                state["error"] = state["error"] or e
+                state["finished"] = True
+                condition.notify_all()
+        with condition:
+            for i, count in enumerate(counts):
+                totals[i] += count
+
+    # 1. --- List Folders in Parallel, Pruning Excluded Ones ---
+    threads = [threading.Thread(target=work, name="whale-puup-scan", daemon=True) for _ in range(worker_count - 1)]
+    for thread in threads:
+        thread.start()
+    work() # The calling thread scans too; with one worker it is the only one
+    for thread in threads:
+        thread.join()
+    if state["error"] is not None:
+        raise state["error"]
+
+    # 2. --- Emit Members in Walk Order ---
+    members = []
+    if prefix:
+        members.append(zipwriter.Member(source_dir, prefix, 0, True))
+    total_files = total_bytes = 0
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        files, dirs = listings[rel_dir]
+        dir_path = os.path.join(source_dir, rel_dir) if rel_dir else source_dir
+        if rel_dir:
+            members.append(zipwriter.Member(dir_path, os.path.join(prefix, rel_dir), 0, True))
+        # Joined once per folder; names are appended (same strings os.path.join gives)
+        path_prefix = os.path.join(dir_path, "")
+        arc_prefix = os.path.join(prefix, rel_dir, "")
+        for name, size, mtime_ns in files:
+            members.append(zipwriter.Member(path_prefix + name, arc_prefix + name, size, False, mtime_ns))
+            total_bytes += size
+        total_files += len(files)
+        rel_prefix = rel_dir + os.sep if rel_dir else ""
+        stack.extend(rel_prefix + name for name in reversed(dirs))
+    return members, ScanStats(total_files, len(listings) - 1, total_bytes, *totals)
+
+def collect_members(source_dir, rules=None):
+    """
+    Scans source_dir (see scan_tree) as a 'scan' stage, and prints what the rules
+    left out if there were any.
+
+    Returns:
+        list[zipwriter.Member]: The members to archive.
+    """
+    with metrics.stage("scan", os.path.basename(source_dir)):
+        members, stats = scan_tree(source_dir, rules)
+    if rules:
+        print_report(stats)
+    return members
+
+def print_report(stats):
+    """Prints what a scan found and what its rules left out."""
+    print(utilities.color(
+        f"[SCAN] {stats.files} file(s) ({stats.bytes / (1024 * 1024):.1f} MB) in {stats.dirs} folder(s); "
+        f"rules left out {stats.excluded_dirs} folder(s) and {stats.excluded_files} file(s)"
+        + (f"; {stats.unreadable} unreadable item(s) skipped" if stats.unreadable else "") + ".", "BLUE"))
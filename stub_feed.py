@@ -0,0 +1,189 @@
+# ==============================================================================
+# WHALE-PUUP Stub Feed Module (stub_feed.py)
+# A local stub NuGet server and synthetic registration graphs, shared by
+# benchmark.py and the tests so both run offline against the same feed.
+# ==============================================================================
+
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+import http.server
+
+# --- Synthetic Registration Graphs ---
+
+def make_registration_graph(node_count=200, fan_out=3, versions_per_package=3, seed=0):
+    """
+    Builds registration indexes for a layered synthetic dependency graph.
+
+    Package 'Graph.Node0' is the root; every node depends on the next node plus up
+    to fan_out random higher-numbered ones, so all nodes are reachable and the graph
+    is a DAG with lots of shared children.
+
+    Returns:
+        dict: Lowercase package ID -> registration index, for StubNuGetServer.
+    """
+    rng = random.Random(seed)
+    registrations = {}
+    for node in range(node_count):
+        package_id = f"Graph.Node{node}"
+        children = rng.sample(range(node + 1, node_count), min(fan_out, node_count - node - 1))
+        children = sorted(set(children) | ({node + 1} if node + 1 < node_count else set()))
+        leaves = []
+        for minor in range(versions_per_package):
+            deps = [{"id": f"Graph.Node{child}", "range": f"[1.{rng.randrange(versions_per_package)}.0, )"} for child in children]
+            leaves.append({"catalogEntry": {
+                "id": package_id,
+                "version": f"1.{minor}.0",
+                "dependencyGroups": [{"targetFramework": "net8.0", "dependencies": deps}],
+            }})
+        registrations[package_id.lower()] = {"items": [{"items": leaves}]}
+    return registrations
+
+# --- Local Stub HTTP Server ---
+
+class StubNuGetServer:
+    """
+    A threaded local HTTP server that serves fake packages at /package/<id>.
+
+    Use as a context manager; `feed` is suitable for the `feed` argument of
+    downloader.download_packages and resolver.DependencyResolver.
+    """
+
+    def __init__(self, packages, latency=0.0, registrations=None, faults=None, bandwidth=None):
+        """
+        Args:
+            packages (dict): Mapping of request path suffix (package ID) to bytes.
+                             Packages honor Range and If-Range requests.
+            latency (float): Seconds to sleep before answering each request, to
+                             simulate round-trip time to a remote feed.
+            registrations (dict, optional): Lowercase package ID -> registration index
+                                            (a JSON-serializable dict) served at
+                                            /registration/<id>/index.json.
+            faults (dict, optional): Package ID -> list of faults injected into that
+                                     package's successive requests, one per request:
+                                     ('cut', n) drops the connection after n body
+                                     bytes, ('status', code) answers with that error,
+                                     ('stall', n, seconds) pauses after n bytes. Later
+                                     requests are answered normally.
+            bandwidth (int, optional): Bytes per second sent on each connection, to
+                                       simulate a slow link; unlimited if None.
+        """
+        self.packages = packages
+        self.registrations = {k: json.dumps(v).encode() for k, v in (registrations or {}).items()}
+        self.latency = latency
+        self.faults = {k: list(v) for k, v in (faults or {}).items()}
+        self.bandwidth = bandwidth
+        self.request_count = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                fault = None
+                if self.path.startswith('/registration/'):
+                    body = stub.registrations.get(self.path.split('/')[2])
+                else:
+                    # /package/<id> or /package/<id>/<version>; versions are not distinguished
+                    key = self.path.split('/package/', 1)[-1].split('/')[0]
+                    body = stub.packages.get(key)
+                    with stub._lock:
+                        if stub.faults.get(key):
+                            fault = stub.faults[key].pop(0)
+                if body is None:
+                    self.send_error(404)
+                    return
+                if fault and fault[0] == 'status':
+                    self.send_response(fault[1])
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+                start = 0
+                match = re.match(r'bytes=(\d+)-$', self.headers.get("Range", ""))
+                if match and self.headers.get("If-Range", etag) == etag:
+                    start = int(match.group(1))
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(body)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(body) - start))
+                self.send_header("ETag", etag)
+                self.end_headers()
+
+                payload = memoryview(body)[start:]
+                try:
+                    if fault and fault[0] in ('cut', 'stall'):
+                        self.wfile.write(payload[:fault[1]])
+                        self.wfile.flush()
+                        with stub._lock:
+                            stub.bytes_sent += min(fault[1], len(payload))
+                        if fault[0] == 'cut':
+                            self.close_connection = True
+                            return
+                        time.sleep(fault[2])
+                        payload = payload[fault[1]:]
+                    step = 64 * 1024 if stub.bandwidth else len(payload) or 1
+                    for offset in range(0, len(payload), step):
+                        self.wfile.write(payload[offset:offset + step])
+                        if stub.bandwidth:
+                            time.sleep(min(step, len(payload) - offset) / stub.bandwidth)
+                    with stub._lock:
+                        stub.bytes_sent += len(payload)
+                except OSError:
+                    self.close_connection = True # The client gave up (e.g. read timeout)
+
+            def log_message(self, format, *args):
+                pass # Keep benchmark output clean
+
+        return Handler
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def package_url(self):
+        return f"{self.base_url}/package/"
+
+    @property
+    def registration_url(self):
+        return f"{self.base_url}/registration/"
+
+    @property
+    def feed(self):
+        import feeds
+        return feeds.V2Feed(self.package_url, self.registration_url)
+
+    def __enter__(self):
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,9 @@
+# ==============================================================================
+# WHALE-PUUP Test Configuration (tests/conftest.py)
+# The modules live side by side at the repository root; make them importable.
+# ==============================================================================
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+# ==============================================================================
+# Random-access listing and extraction of encoded archives (browse.py).
+# ==============================================================================
+
+import os
+import random
+import pytest
+import archiver
+import browse
+
+def _make_folder(root):
+    rng = random.Random(0)
+    source = os.path.join(root, "bundle")
+    files = {}
+    for i in range(6):
+        arcname = f"Package{i}/lib/net8.0/Package{i}.dll"
+        files[arcname] = rng.randbytes(300 * 1024)
+    files["readme.txt"] = b"hello\n"
+    for arcname, data in files.items():
+        path = os.path.join(source, *arcname.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    return source, files
+
+@pytest.mark.parametrize("codec", ["base64", "base85"])
+@pytest.mark.parametrize("part_size", [None, 512 * 1024])
+def test_extract_members(tmp_path, codec, part_size):
+    source, files = _make_folder(str(tmp_path))
+    out = os.path.join(str(tmp_path), "out")
+    os.makedirs(out)
+    _, encoded = archiver.archive_and_encode_packages(source, out, part_size=part_size, codec=codec)
+    assert encoded
+    if part_size:
+        assert len(encoded) > 1
+        encoded = encoded[1] # Any one part finds the rest of its set
+
+    with browse.EncodedArchive(encoded) as archive:
+        assert {entry.arcname for entry in archive.entries() if not entry.is_dir} == set(files)
+        written, _ = archive.extract(archive.select(["readme.txt", "Package3/"]), os.path.join(str(tmp_path), "x"))
+        assert archive.text_bytes_read < archive.input_size / 2
+
+    assert len(written) == 2
+    for arcname in ("readme.txt", "Package3/lib/net8.0/Package3.dll"):
+        with open(os.path.join(str(tmp_path), "x", *arcname.split('/')), 'rb') as f:
+            assert f.read() == files[arcname]
+
+def test_unknown_member(tmp_path):
+    source, _ = _make_folder(str(tmp_path))
+    _, encoded = archiver.archive_and_encode_packages(source, str(tmp_path))
+    with browse.EncodedArchive(encoded) as archive, pytest.raises(ValueError):
+        archive.select(["missing.dll"])
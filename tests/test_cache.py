@@ -0,0 +1,74 @@
+# ==============================================================================
+# Package cache (cache.PackageCache): hits only mark the index dirty, and it is
+# written once by store, flush or report rather than once per lookup. Damaged
+# blobs are discarded and downloaded again.
+# ==============================================================================
+
+import io
+import base64
+import hashlib
+import zipfile
+import pytest
+import cache
+import downloader
+import stub_feed
+import utilities
+
+def _store(package_cache, package_id, data):
+    sha512 = hashlib.sha512(data).hexdigest()
+    return package_cache.store(package_id, "1.0.0", "1.0.0", io.BytesIO(data), sha512)
+
+def test_lookups_write_the_index_once(tmp_path, monkeypatch):
+    package_cache = cache.PackageCache(cache_dir=str(tmp_path))
+    blobs = [_store(package_cache, f"Pkg{i}", bytes([i]) * 100) for i in range(5)]
+
+    saves = []
+    original_save = package_cache._save_index
+    monkeypatch.setattr(package_cache, "_save_index", lambda: saves.append(1) or original_save())
+    for _ in range(3):
+        assert [package_cache.lookup(f"Pkg{i}", "1.0.0") for i in range(5)] == blobs
+    assert saves == []
+
+    package_cache.report()
+    package_cache.flush() # Nothing changed since report wrote it
+    assert saves == [1]
+
+def test_flushed_access_times_survive_reload(tmp_path):
+    package_cache = cache.PackageCache(cache_dir=str(tmp_path))
+    sha512 = cache.PackageCache.blob_digest(_store(package_cache, "Pkg", b"package bytes"))
+    package_cache._index["blobs"][sha512]["last_access"] = 0 # As if stored long ago
+    package_cache._save_index()
+
+    package_cache.lookup("Pkg", "1.0.0")
+    assert cache.PackageCache(cache_dir=str(tmp_path))._index["blobs"][sha512]["last_access"] == 0
+    package_cache.flush()
+    assert cache.PackageCache(cache_dir=str(tmp_path))._index["blobs"][sha512]["last_access"] > 0
+
+def _nupkg(package_id):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{package_id}.nuspec", f"<package><metadata><id>{package_id}</id>"
+                                            f"<version>1.0.0</version></metadata></package>")
+        zf.writestr(f"lib/net8.0/{package_id}.dll", bytes(range(256)) * 64)
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("damage", [lambda data: data[:len(data) // 2], lambda data: b"PK" + bytes(len(data) - 2)])
+@pytest.mark.parametrize("verify", [False, True])
+def test_damaged_blob_is_discarded_and_downloaded(tmp_path, damage, verify):
+    data = _nupkg("Pkg")
+    sha512 = hashlib.sha512(data).hexdigest()
+    package_cache = cache.PackageCache(cache_dir=str(tmp_path / "cache"))
+    blob = _store(package_cache, "Pkg", data)
+    with open(blob, 'wb') as f:
+        f.write(damage(data))
+    verifier = (lambda package_id, version: base64.b64encode(bytes.fromhex(sha512)).decode()) if verify else None
+
+    with stub_feed.StubNuGetServer({"Pkg": data}) as server:
+        result_dir = downloader.download_packages(["Pkg@1.0.0"], feed=server.feed, cache=package_cache,
+                                                  verifier=verifier, partial_dir=None)
+        assert result_dir is not None
+        assert server.request_count == 1
+    utilities.cleanup(result_dir)
+    assert (package_cache.hits, package_cache.misses) == (0, 1)
+    with open(blob, 'rb') as f:
+        assert f.read() == data # Stored again from the download
@@ -0,0 +1,27 @@
+# ==============================================================================
+# Integrity manifests (integrity.load_manifest): block sizes that do not land on
+# both Base64 and Base85 group boundaries are rejected up front.
+# ==============================================================================
+
+import json
+import pytest
+import integrity
+
+def _write_manifest(tmp_path, block_size):
+    path = tmp_path / ("archive" + integrity.MANIFEST_SUFFIX)
+    path.write_text(json.dumps({"version": integrity.MANIFEST_VERSION, "algorithm": "sha256",
+                                "block_size": block_size, "size": 0, "blocks": []}))
+    return str(path)
+
+@pytest.mark.parametrize("block_size", [12, 12 * 1000, integrity.BLOCK_SIZE])
+def test_aligned_block_size_loads(tmp_path, block_size):
+    assert integrity.load_manifest(_write_manifest(tmp_path, block_size))["block_size"] == block_size
+
+# 3, 6 and 3003 pass a Base64-only check but split Base85 groups
+@pytest.mark.parametrize("block_size", [3, 6, 3003, 4, 0, -12, "12", None])
+def test_unaligned_block_size_is_unsupported(tmp_path, block_size):
+    with pytest.raises(integrity.IntegrityError, match="Unsupported integrity manifest"):
+        integrity.load_manifest(_write_manifest(tmp_path, block_size))
+
+def test_missing_manifest(tmp_path):
+    assert integrity.load_manifest(str(tmp_path / "missing.json")) is None
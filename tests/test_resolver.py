@@ -0,0 +1,114 @@
+# ==============================================================================
+# Dependency resolution (resolver.DependencyResolver) against the stub NuGet
+# feed: deterministic versions, one round trip per level, pins.
+# ==============================================================================
+
+import random
+import pytest
+import resolver
+import stub_feed
+
+def _registration(package_id, versions):
+    """Builds a registration index; versions maps '<version>' -> {dep id: range}."""
+    leaves = [{"catalogEntry": {
+        "id": package_id,
+        "version": version,
+        "dependencyGroups": [{"targetFramework": "net8.0",
+                              "dependencies": [{"id": d, "range": r} for d, r in deps.items()]}],
+    }} for version, deps in versions.items()]
+    return {"items": [{"items": leaves}]}
+
+# App -> Lib.A, Lib.B; Lib.A -> Lib.C; Lib.B -> Lib.C (a higher bound), Lib.D
+DIAMOND = {
+    "app": _registration("App", {"1.0.0": {"Lib.A": "[1.0.0, )", "Lib.B": "[1.0.0, )"},
+                                 "2.0.0": {"Lib.A": "[2.0.0, )", "Lib.B": "[1.0.0, )"}}),
+    "lib.a": _registration("Lib.A", {"1.0.0": {"Lib.C": "[1.0.0, )"},
+                                     "2.0.0": {"Lib.C": "[1.0.0, )"}}),
+    "lib.b": _registration("Lib.B", {"1.0.0": {"Lib.C": "[1.1.0, )", "Lib.D": "[1.0.0, )"}}),
+    "lib.c": _registration("Lib.C", {"1.0.0": {}, "1.1.0": {}, "1.2.0": {}}),
+    "lib.d": _registration("Lib.D", {"1.0.0": {}}),
+}
+
+# Root -> Lib.A, Lib.B; Lib.B -> Lib.A 2.0; only Lib.A 1.0 needs Lib.C
+SUPERSEDED = {
+    "root": _registration("Root", {"1.0.0": {"Lib.A": "[1.0.0, )", "Lib.B": "[1.0.0, )"}}),
+    "lib.a": _registration("Lib.A", {"1.0.0": {"Lib.C": "[1.0.0, )"}, "2.0.0": {}}),
+    "lib.b": _registration("Lib.B", {"1.0.0": {"Lib.A": "[2.0.0, )"}}),
+    "lib.c": _registration("Lib.C", {"1.0.0": {"Lib.Missing": "[1.0.0, )"}}),
+}
+
+@pytest.fixture(scope="module")
+def diamond_feed():
+    with stub_feed.StubNuGetServer({}, registrations=DIAMOND) as server:
+        yield server.feed
+
+def _depths(registrations, root):
+    """Returns the BFS depth of every ID reachable from root (all versions share dependencies here)."""
+    depths = {root.lower(): 0}
+    level = [root.lower()]
+    while level:
+        next_level = []
+        for package_id in level:
+            entry = registrations[package_id]["items"][0]["items"][0]["catalogEntry"]
+            for dep in entry["dependencyGroups"][0]["dependencies"]:
+                if dep["id"].lower() not in depths:
+                    depths[dep["id"].lower()] = depths[package_id] + 1
+                    next_level.append(dep["id"].lower())
+        level = next_level
+    return depths
+
+def test_same_graph_resolves_to_same_versions():
+    registrations = stub_feed.make_registration_graph(60)
+    with stub_feed.StubNuGetServer({}, registrations=registrations) as server:
+        results = [resolver.DependencyResolver(feed=server.feed, max_workers=workers).resolve(["Graph.Node0"])
+                   for workers in (1, 16, 16)]
+        # Listing the same roots in another order must not change the selection either
+        roots = [f"Graph.Node{n}" for n in range(0, 60, 7)]
+        shuffled = roots[:]
+        random.Random(1).shuffle(shuffled)
+        ordered = resolver.DependencyResolver(feed=server.feed).resolve(roots)
+        reordered = resolver.DependencyResolver(feed=server.feed).resolve(shuffled)
+
+    assert results[0] == results[1] == results[2]
+    assert len(results[0]) == 60
+    assert "Graph.Node0 1.2.0" in results[0] # Unpinned root: latest stable
+    assert sorted(ordered) == sorted(reordered)
+
+def test_diamond_picks_lowest_applicable_versions(diamond_feed):
+    closure = resolver.DependencyResolver(feed=diamond_feed).resolve(["App"])
+    assert sorted(closure) == ["App 2.0.0", "Lib.A 2.0.0", "Lib.B 1.0.0", "Lib.C 1.1.0", "Lib.D 1.0.0"]
+
+def test_round_trips_bounded_by_levels():
+    registrations = stub_feed.make_registration_graph(80)
+    levels = max(_depths(registrations, "Graph.Node0").values()) + 1
+    with stub_feed.StubNuGetServer({}, registrations=registrations) as server:
+        dep_resolver = resolver.DependencyResolver(feed=server.feed, max_workers=8)
+        dep_resolver.resolve(["Graph.Node0"])
+        assert dep_resolver.round_trips == levels
+        assert dep_resolver.request_count == len(registrations) # Each index fetched once
+
+        # Memoized metadata: resolving again costs no requests at all
+        dep_resolver.resolve(["Graph.Node0"])
+        assert dep_resolver.round_trips == levels
+        assert dep_resolver.request_count == len(registrations)
+        assert server.request_count == len(registrations)
+
+def test_pinned_version_is_respected(diamond_feed):
+    dep_resolver = resolver.DependencyResolver(feed=diamond_feed)
+    closure = dep_resolver.resolve(["App@1.0.0"])
+    assert sorted(closure) == ["App 1.0.0", "Lib.A 1.0.0", "Lib.B 1.0.0", "Lib.C 1.1.0", "Lib.D 1.0.0"]
+
+    # A pin above the lowest applicable version wins over it
+    closure = dep_resolver.resolve(["App@1.0.0", "Lib.C@1.2.0"])
+    assert sorted(closure) == ["App 1.0.0", "Lib.A 1.0.0", "Lib.B 1.0.0", "Lib.C 1.2.0", "Lib.D 1.0.0"]
+
+def test_pin_without_that_version_is_an_error(diamond_feed):
+    closure = resolver.DependencyResolver(feed=diamond_feed).resolve(["Lib.D@0.9.0", "Lib.C@1.1"])
+    assert closure["Lib.D"] == ["Error: No version of Lib.D satisfies '0.9.0'"]
+    assert "Lib.C 1.1.0" in closure # '1.1' names the same version as '1.1.0'
+
+def test_superseded_version_dependencies_are_dropped():
+    with stub_feed.StubNuGetServer({}, registrations=SUPERSEDED) as server:
+        closure = resolver.DependencyResolver(feed=server.feed).resolve(["Root"])
+    # Lib.C (and the error for its missing dependency) came only from Lib.A 1.0.0
+    assert sorted(closure) == ["Lib.A 2.0.0", "Lib.B 1.0.0", "Root 1.0.0"]
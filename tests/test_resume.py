@@ -0,0 +1,131 @@
+# ==============================================================================
+# Resumable downloads (downloader.fetch_resumable) against a local stub server
+# that cuts responses short, changes its ETag, or ignores Range.
+# ==============================================================================
+
+import os
+import re
+import json
+import hashlib
+import threading
+import http.server
+import pytest
+import requests
+import downloader
+import feeds
+
+RETRY = downloader.RetryPolicy(max_attempts=3, timeout=(5, 5), backoff_base=0.01, backoff_max=0.01)
+
+class StubFile:
+    """Serves one body at /file; its behaviour is set per test."""
+
+    def __init__(self, body, etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.cut_after = None # Close the connection after this many body bytes, once
+        self.honor_range = True
+        self.requests = [] # Headers of every request received
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(dict(self.headers))
+                body, start = stub.body, 0
+                match = re.match(r'bytes=(\d+)-$', self.headers.get("Range", ""))
+                if (stub.honor_range and match
+                        and self.headers.get("If-Range", stub.etag) == stub.etag):
+                    start = int(match.group(1))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                else:
+                    self.send_response(200)
+                payload = body[start:]
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("ETag", stub.etag)
+                self.end_headers()
+                if stub.cut_after is not None:
+                    payload, stub.cut_after = payload[:stub.cut_after], None
+                    self.close_connection = True
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/file"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def body():
+    return bytes(range(256)) * 1200 # 300 KB
+
+@pytest.fixture
+def stub(body):
+    server = StubFile(body)
+    yield server
+    server.close()
+
+def _fetch(stub, path, state=None):
+    with open(path, 'a+b') as f:
+        sink = downloader._HashingSink(f)
+        sink.absorb_existing()
+        with requests.Session() as session:
+            state = downloader.fetch_resumable(session, stub.url, sink, retry=RETRY, state=state)
+        return state, sink.digest.hexdigest()
+
+def test_cut_download_resumes_with_range(stub, body, tmp_path):
+    stub.cut_after = 100000
+    path = tmp_path / "pkg.nupkg"
+    state, digest = _fetch(stub, path)
+
+    # The second attempt asks only for what the first did not deliver
+    assert state["attempts"] == 2
+    assert 0 < state["resumed_bytes"] <= 100000
+    assert stub.requests[1]["Range"] == f"bytes={state['resumed_bytes']}-"
+    assert stub.requests[1]["If-Range"] == stub.etag
+    assert digest == hashlib.sha512(body).hexdigest()
+    assert path.read_bytes() == body
+
+def test_changed_etag_restarts_from_zero(stub, body, tmp_path):
+    path = tmp_path / "pkg.nupkg"
+    path.write_bytes(b"old version " * 1000) # A partial kept by an earlier run
+    stub.etag = '"v2"'
+    state, digest = _fetch(stub, path, {"validator": '"v1"', "total": len(body)})
+
+    assert stub.requests[0]["If-Range"] == '"v1"'
+    assert state["resumed_bytes"] == 0
+    assert state["validator"] == '"v2"'
+    assert digest == hashlib.sha512(body).hexdigest()
+    assert path.read_bytes() == body
+
+def test_ignored_range_truncates_partial(stub, body, tmp_path):
+    path = tmp_path / "pkg.nupkg"
+    path.write_bytes(body[:100000])
+    stub.honor_range = False
+    state, digest = _fetch(stub, path, {"validator": stub.etag, "total": len(body)})
+
+    assert stub.requests[0]["Range"] == "bytes=100000-"
+    assert state["resumed_bytes"] == 0
+    assert digest == hashlib.sha512(body).hexdigest()
+    assert path.read_bytes() == body # Not the partial with the full body appended
+
+def test_unusable_resumed_package_drops_partial(stub, body, tmp_path):
+    # A partial that already holds the whole body, which is not a valid .nupkg
+    partial_dir = str(tmp_path / "partial")
+    os.makedirs(partial_dir)
+    data_path, state_path = downloader._partial_paths(partial_dir, "Broken", "1.0.0")
+    with open(data_path, 'wb') as f:
+        f.write(body)
+    with open(state_path, 'w') as f:
+        json.dump({"validator": stub.etag, "total": len(body)}, f)
+    feed = feeds.V2Feed(stub.url.rsplit('/', 1)[0] + "/")
+
+    for _ in range(2):
+        assert downloader.download_packages(["Broken@1.0.0"], feed=feed, retry=RETRY, partial_dir=partial_dir) is None
+    assert stub.requests[0]["Range"] == f"bytes={len(body)}-"
+    assert "Range" not in stub.requests[-1] # The second run starts over instead of resuming at the end
+    assert not os.path.exists(data_path) and not os.path.exists(state_path)
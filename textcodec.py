@@ -0,0 +1,274 @@
+# ==============================================================================
+# WHALE-PUUP Text Codec Module (textcodec.py)
+# The binary-to-text encodings an archive can be carried in: Base64 (33% larger
+# than the archive, readable by any Base64 tool) and Base85 / Ascii85 (25%
+# larger, decoded by WHALE-PUUP). Every codec maps fixed-size groups of bytes to
+# fixed-size groups of characters, so blocks encode independently and byte
+# offsets map to character offsets by arithmetic. Output in any codec but
+# Base64 starts with a one-line header naming it, which decoding reads.
+# ==============================================================================
+
+import binascii
+
+# --- Configuration ---
+# Non-Base64 output starts with this, the codec name and a newline. Base64 output
+# has no header, so it stays a plain Base64 file.
+HEADER_MARKER = b"WHALE-PUUP-CODEC "
+# Longest header line read when detecting the codec.
+HEADER_MAX_SIZE = 64
+
+BASE85_ALPHABET = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz!#$%&()*+-;<=>?@^_`{|}~"
+ASCII85_ALPHABET = bytes(range(33, 118)) # '!' to 'u', as in Adobe's Ascii85
+
+# Exact floor(x / 85) for any x < 2**32 is ((x * _DIV85_MULTIPLIER) >> _DIV85_SHIFT);
+# the product stays below 2**64.
+_DIV85_MULTIPLIER = 3233857729 # ceil(2**38 / 85)
+_DIV85_SHIFT = 38
+# Words converted per big-integer pass; larger integers fall out of the CPU cache.
+_WORDS_PER_PASS = 16384
+
+def _a2b_strict(data):
+    """Decodes Base64, rejecting characters outside the alphabet where Python supports it."""
+    try:
+        return binascii.a2b_base64(data, strict_mode=True)
+    except TypeError:
+        return binascii.a2b_base64(data) # Python < 3.11 has no strict_mode
+
+class Codec:
+    """
+    A binary-to-text encoding that turns every raw_group bytes into text_group
+    characters.
+
+    encode and decode accept any whole number of groups plus, at the very end of
+    the data, one partial group: padded with '=' for Base64, or shortened (as
+    base64.b85encode with pad=False does) for Base85 and Ascii85.
+    """
+
+    def __init__(self, name, raw_group, text_group, padded, label):
+        """
+        Args:
+            name (str): Name used on the command line and in headers.
+            raw_group (int): Bytes per group.
+            text_group (int): Characters per group.
+            padded (bool): The final group is padded to full size (Base64), rather
+                           than shortened.
+            label (str): Display name for messages.
+        """
+        self.name = name
+        self.raw_group = raw_group
+        self.text_group = text_group
+        self.padded = padded
+        self.label = label
+
+    def __repr__(self):
+        return f"Codec({self.name!r})"
+
+    def encode(self, data):
+        raise NotImplementedError
+
+    def decode(self, text):
+        """Decodes text without whitespace. Raises binascii.Error if it is not valid."""
+        raise NotImplementedError
+
+    def header(self):
+        """Returns the header line output in this codec starts with (empty for Base64)."""
+        return HEADER_MARKER + self.name.encode('ascii') + b"\n"
+
+    def encoded_size(self, raw_size):
+        """Returns the number of characters raw_size bytes encode to."""
+        groups, remainder = divmod(raw_size, self.raw_group)
+        if not remainder:
+            return groups * self.text_group
+        return (groups + 1) * self.text_group if self.padded else groups * self.text_group + remainder + 1
+
+    def valid_length(self, char_count):
+        """Returns True if some encoding has exactly char_count characters."""
+        remainder = char_count % self.text_group
+        return remainder == 0 if self.padded else remainder != 1
+
+    def decoded_size(self, char_count, tail=b""):
+        """
+        Returns the number of bytes char_count characters decode to.
+
+        Args:
+            char_count (int): Characters in the whole text, without whitespace.
+            tail (bytes): The last characters of the text (for Base64 padding).
+
+        Raises:
+            binascii.Error: If no valid encoding has that many characters.
+        """
+        groups, remainder = divmod(char_count, self.text_group)
+        if self.padded:
+            if remainder:
+                raise binascii.Error(f"input ends with {remainder} stray character(s) "
+                                     f"(length is not a multiple of {self.text_group})")
+            return groups * self.raw_group - (len(tail) - len(tail.rstrip(b"=")))
+        if remainder == 1:
+            raise binascii.Error("input ends with a lone character")
+        return groups * self.raw_group + max(0, remainder - 1)
+
+class Base64Codec(Codec):
+    """Standard Base64, encoded and decoded by binascii."""
+
+    def __init__(self):
+        super().__init__("base64", 3, 4, True, "Base64")
+
+    def encode(self, data):
+        return binascii.b2a_base64(data, newline=False)
+
+    def decode(self, text):
+        return _a2b_strict(text)
+
+    def header(self):
+        return b""
+
+class Base85Codec(Codec):
+    """
+    Base85 in the given 85-character alphabet, big-endian, without shorthands
+    such as Ascii85's 'z', so every 4 bytes are exactly 5 characters.
+
+    The standard library encodes one 4-byte word at a time in Python (a few MB/s).
+    Here all words of a block are processed together as lanes of one big integer:
+    each word sits in its own 64-bit lane, division by 85 is a multiply and shift
+    of the whole integer, and digits move in and out as bytes with strided
+    slices, so the per-word work happens inside CPython's integer routines.
+    """
+
+    def __init__(self, name, alphabet, label):
+        super().__init__(name, 4, 5, False, label)
+        self.alphabet = alphabet
+        self._to_chars = alphabet + bytes(256 - len(alphabet))
+        values = bytearray(b"\xff" * 256)
+        for value, char in enumerate(alphabet):
+            values[char] = value
+        self._to_values = bytes(values)
+        self._masks = {}
+
+    def _lane_masks(self, count):
+        """Returns (low 26 bits, low 8 bits) of every lane of count 64-bit lanes."""
+        masks = self._masks.get(count)
+        if masks is None:
+            if len(self._masks) > 8:
+                self._masks.clear() # Block sizes are nearly always the same; don't grow without bound
+            masks = self._masks[count] = (int.from_bytes(b"\x00\x00\x00\x00\x03\xff\xff\xff" * count, 'big'),
+                                          int.from_bytes(b"\x00\x00\x00\x00\x00\x00\x00\xff" * count, 'big'))
+        return masks
+
+    def _encode_words(self, data, count):
+        low26 = self._lane_masks(count)[0]
+        lanes = bytearray(8 * count)
+        for k in range(4):
+            lanes[4 + k::8] = data[k:4 * count:4]
+        w = int.from_bytes(lanes, 'big')
+        # floor(x / 85) for every lane at once; shifting pulls the next lane's low bits down, hence the mask
+        q1 = ((w * _DIV85_MULTIPLIER) >> _DIV85_SHIFT) & low26
+        q2 = ((q1 * _DIV85_MULTIPLIER) >> _DIV85_SHIFT) & low26
+        q3 = ((q2 * _DIV85_MULTIPLIER) >> _DIV85_SHIFT) & low26
+        q4 = ((q3 * _DIV85_MULTIPLIER) >> _DIV85_SHIFT) & low26
+        # With w = 85*q1 + d4, q1 = 85*q2 + d3, ..., this puts d0..d4 in the low 5 bytes of each lane
+        digits = (w + 171 * (q1 + ((q2 + ((q3 + (q4 << 8)) << 8)) << 8))).to_bytes(8 * count, 'big')
+        out = bytearray(5 * count)
+        for k in range(5):
+            out[k::5] = digits[3 + k::8]
+        return out.translate(self._to_chars)
+
+    def encode(self, data):
+        data = memoryview(data).cast('B')
+        count = len(data) // 4
+        out = bytearray()
+        for start in range(0, count, _WORDS_PER_PASS):
+            words = min(_WORDS_PER_PASS, count - start)
+            out += self._encode_words(data[4 * start:4 * (start + words)], words)
+        remainder = len(data) - 4 * count
+        if remainder:
+            # A shortened final group: encode it zero-padded and keep remainder + 1 characters
+            out += self._encode_words(data[4 * count:].tobytes() + bytes(4 - remainder), 1)[:remainder + 1]
+        return bytes(out)
+
+    def _decode_words(self, text, count):
+        low8 = self._lane_masks(count)[1]
+        values = text.translate(self._to_values)
+        if b"\xff" in values:
+            bad = text[values.index(b"\xff"):][:1]
+            raise binascii.Error(f"invalid {self.label} character {bad!r}")
+        lanes = bytearray(8 * count)
+        for k in range(5):
+            lanes[3 + k::8] = values[k::5]
+        digits = int.from_bytes(lanes, 'big')
+        w = (digits >> 32) & low8
+        for shift in (24, 16, 8, 0):
+            w = w * 85 + ((digits >> shift) & low8)
+        words = w.to_bytes(8 * count, 'big')
+        if words[3::8].strip(b"\x00"):
+            raise binascii.Error(f"{self.label} group out of range")
+        out = bytearray(4 * count)
+        for k in range(4):
+            out[k::4] = words[4 + k::8]
+        return out
+
+    def decode(self, text):
+        text = bytes(text)
+        count = len(text) // 5
+        out = bytearray()
+        for start in range(0, count, _WORDS_PER_PASS):
+            words = min(_WORDS_PER_PASS, count - start)
+            out += self._decode_words(text[5 * start:5 * (start + words)], words)
+        remainder = len(text) - 5 * count
+        if remainder == 1:
+            raise binascii.Error("input ends with a lone character")
+        if remainder:
+            # A shortened final group: pad it with the highest digit and keep remainder - 1 bytes
+            padded = text[5 * count:] + self.alphabet[-1:] * (5 - remainder)
+            out += self._decode_words(padded, 1)[:remainder - 1]
+        return bytes(out)
+
+BASE64 = Base64Codec()
+CODECS = {
+    "base64": BASE64,
+    # RFC 1924 alphabet (as base64.b85encode and git use): no quotes or backslash
+    "base85": Base85Codec("base85", BASE85_ALPHABET, "Base85"),
+    "ascii85": Base85Codec("ascii85", ASCII85_ALPHABET, "Ascii85"),
+}
+
+def get_codec(codec=None):
+    """
+    Returns a Codec for a codec name, a codec object, or None (Base64).
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if codec is None:
+        return BASE64
+    if isinstance(codec, Codec):
+        return codec
+    if codec not in CODECS:
+        raise ValueError(f"Unknown text codec '{codec}' (choose from {', '.join(CODECS)})")
+    return CODECS[codec]
+
+def read_header(f):
+    """
+    Detects the codec of encoded text from its first line.
+
+    Args:
+        f: Binary file object positioned at the start of the text. It is left just
+           past the header, or where it was if there is none.
+
+    Returns:
+        tuple (Codec, int): The codec (Base64 if there is no header) and the header's
+                            size in bytes.
+
+    Raises:
+        ValueError: If the header names an unknown codec.
+    """
+    start = f.tell()
+    line = f.readline(HEADER_MAX_SIZE)
+    if not line.startswith(HEADER_MARKER):
+        f.seek(start)
+        return BASE64, 0
+    name = line[len(HEADER_MARKER):].strip().decode('ascii', 'replace')
+    return get_codec(name), len(line)
+
+def detect(file_path):
+    """Returns (Codec, header size) for an encoded file; see read_header."""
+    with open(file_path, 'rb') as f:
+        return read_header(f)
@@ -1,26 +1,16 @@
-﻿import json
-import os
+﻿import os
 import random
+import re
 import sys
+import whale_art
 
 def show_whale_prompt():
-    """Displays a random ASCII whale from whales.json and prompts the user for packages."""
-    
-    # --- Part 1: Load and Display Whale ---
+    """Displays a random ASCII whale (precompiled from whales.json) and prompts the user for packages."""
     
-    script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
-    json_path = os.path.join(script_dir, "whales.json")
-    whale_key = "fallback" # Initialize for clean output in case of error
+    # --- Part 1: Pick and Display Whale ---
     
-    try:
-        with open(json_path, 'r') as f:
-            whale_config = json.load(f)
-        whale_key = random.choice(list(whale_config.keys()))
-        whale_ascii = "\n" + "\n".join(whale_config[whale_key])
-        
-    except (FileNotFoundError, Exception) as e:
-        # Simplified error handling for display
-        whale_ascii = "\n (~^~)\\ " 
+    whale_key = random.choice(list(whale_art.WHALES))
+    whale_ascii = "\n" + whale_art.WHALES[whale_key]
         
     print("\n" + "="*50)
     print("Welcome to WHALE-PUUP Download Utility!")
@@ -202,6 +192,26 @@ def prompt_for_source_folder():
             print(color(f"Selected folder: {abs_path}", "GREEN"))
             return abs_path
 
+def default_decoded_path(input_path, output_base_path):
+    """
+    Suggests '<name>_decoded.zip' in output_base_path for a '<name>.base64.txt' input
+    (or a '<name>.partNNN.base64.txt' split part).
+    """
+    default_name = os.path.splitext(os.path.basename(input_path))[0]
+    # Remove the .base64 suffix if present to suggest a cleaner name
+    if default_name.endswith(".base64"):
+        default_name = default_name[:-len(".base64")]
+    default_name = re.sub(r'\.part\d+$', '', default_name)
+    return os.path.join(output_base_path, f"{default_name}_decoded.zip")
+
+def parse_size(text):
+    """Parses sizes like '10M', '1G' or '4096' into a byte count."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper()
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
 def prompt_for_base64_file(output_base_path):
     """
     Prompts the user for the Base64 input file and the desired output ZIP filename.
@@ -232,11 +242,7 @@ def prompt_for_base64_file(output_base_path):
             break
             
     # 2. Get Desired Output ZIP Filename
-    default_name = os.path.splitext(os.path.basename(abs_input_path))[0]
-    # Remove the .base64 suffix if present to suggest a cleaner name
-    if default_name.endswith(".base64"):
-        default_name = default_name[:-len(".base64")]
-    default_output_path = os.path.join(output_base_path, f"{default_name}_decoded.zip")
+    default_output_path = default_decoded_path(abs_input_path, output_base_path)
     
     print(color(f"Default output ZIP path: {default_output_path}", "YELLOW"))
 
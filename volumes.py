@@ -0,0 +1,363 @@
+# ==============================================================================
+# WHALE-PUUP Split Volume Module (volumes.py)
+# Splits an archive into numbered Base64 part files of a chosen size and puts
+# them back together. Parts are encoded and decoded concurrently across cores,
+# and each part carries a header with its offset, checksum and text codec, so a
+# set can be decoded from parts supplied in any order.
+# ==============================================================================
+
+import io
+import os
+import json
+import math
+import uuid
+import bisect
+import hashlib
+import concurrent.futures
+import encoder
+import textcodec
+import utilities
+
+# --- Configuration ---
+# Every part starts with one line: HEADER_MARKER followed by a JSON object.
+HEADER_MARKER = b"WHALE-PUUP-PART "
+# Bytes of each part's size budget set aside for the header line.
+HEADER_RESERVE = 512
+PART_SUFFIX = ".base64.txt"
+READ_BLOCK_SIZE = encoder.ENCODE_BLOCK_SIZE
+# The header is written before the part's digest is known and rewritten in place
+# once it is, so the placeholder must have the digest's exact width.
+_DIGEST_PLACEHOLDER = "0" * 64
+
+def part_path(base_path, index):
+    """Returns '<base_path>.partNNN.base64.txt' for a 1-based part index."""
+    return f"{base_path}.part{index:03d}{PART_SUFFIX}"
+
+def raw_bytes_per_part(part_size, line_length=encoder.DEFAULT_LINE_LENGTH, codec=None):
+    """
+    Returns how many archive bytes fit in a part file of at most part_size bytes.
+
+    The result is a whole number of the codec's groups (a multiple of 3 for
+    Base64), so every part except the last encodes without padding.
+    """
+    codec = textcodec.get_codec(codec)
+    chars = part_size - HEADER_RESERVE
+    if line_length:
+        chars = chars * line_length // (line_length + len(encoder.LINE_ENDING)) - len(encoder.LINE_ENDING)
+    raw = chars // codec.text_group * codec.raw_group
+    if raw < codec.raw_group:
+        raise ValueError(f"Part size {part_size} is too small "
+                         f"(minimum is {HEADER_RESERVE + codec.text_group + 2} bytes)")
+    return raw
+
+def _header_line(header):
+    return HEADER_MARKER + json.dumps(header, sort_keys=True).encode('ascii') + b"\n"
+
+def read_header(file_path):
+    """
+    Reads the header of a part file.
+
+    Returns:
+        dict or None: The header fields, or None if file_path is not a part file.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            line = f.readline(HEADER_RESERVE)
+    except OSError:
+        return None
+    if not line.startswith(HEADER_MARKER) or not line.endswith(b"\n"):
+        return None
+    try:
+        header = json.loads(line[len(HEADER_MARKER):])
+    except ValueError:
+        return None
+    header["header_size"] = len(line)
+    return header
+
+# ==============================================================================
+# --- Encoding ---
+# ==============================================================================
+
+def _encode_part(zip_path, output_path, header, line_length):
+    """Worker entry point: encodes one byte range of zip_path into a part file."""
+    codec = textcodec.get_codec(header.get("codec"))
+    header = dict(header, sha256=_DIGEST_PLACEHOLDER)
+    digest = hashlib.sha256()
+    remaining = header["length"]
+    buffer = bytearray(READ_BLOCK_SIZE)
+
+    with open(zip_path, 'rb') as f_in, open(output_path, 'wb') as f_out:
+        f_out.write(_header_line(header))
+        sink = encoder._TextSink(f_out, line_length)
+        f_in.seek(header["offset"])
+        while remaining > 0:
+            view = memoryview(buffer)[:min(READ_BLOCK_SIZE, remaining)]
+            count = encoder._read_full(f_in, view)
+            if not count:
+                raise EOFError(f"{zip_path} ended before part {header['part']} was complete")
+            digest.update(view[:count])
+            sink.write(codec.encode(view[:count]))
+            remaining -= count
+        sink.finish()
+
+        header["sha256"] = digest.hexdigest()
+        f_out.seek(0)
+        f_out.write(_header_line(header))
+    return output_path
+
+def encode_parts(zip_path, base_path, part_size, max_workers=None, line_length=encoder.DEFAULT_LINE_LENGTH,
+                 codec=None):
+    """
+    Encodes zip_path into numbered Base64 part files no larger than part_size bytes.
+
+    Each part holds a contiguous byte range of the archive and starts with a header
+    line recording the set ID, part number and count, the range's offset and length,
+    the archive's total size and name, the SHA-256 of the range, and (for codecs
+    other than Base64) the text codec. Parts are encoded in a process pool, one
+    task per part.
+
+    Args:
+        zip_path (str): The archive to split.
+        base_path (str): Output path prefix; parts are '<base_path>.partNNN.base64.txt'.
+        part_size (int): Maximum size of each part file in bytes.
+        max_workers (int, optional): Encoding processes; defaults to the CPU count.
+        line_length (int): Wrap Base64 lines at this many characters (0 disables wrapping).
+        codec (str or textcodec.Codec, optional): A textcodec.CODECS name; Base64 if None.
+
+    Returns:
+        list[str]: The part file paths, in order.
+    """
+    codec = textcodec.get_codec(codec)
+    total = os.path.getsize(zip_path)
+    per_part = raw_bytes_per_part(part_size, line_length, codec)
+    count = max(1, math.ceil(total / per_part))
+    set_id = uuid.uuid4().hex
+    name = os.path.basename(base_path)
+
+    tasks = []
+    for index in range(count):
+        offset = index * per_part
+        header = {"set": set_id, "name": name, "part": index + 1, "parts": count,
+                  "offset": offset, "length": min(per_part, total - offset), "total": total}
+        if codec is not textcodec.BASE64:
+            header["codec"] = codec.name # Parts without one (as older versions wrote) are Base64
+        tasks.append((zip_path, part_path(base_path, index + 1), header, line_length))
+    if len(_header_line(dict(tasks[-1][2], sha256=_DIGEST_PLACEHOLDER))) > HEADER_RESERVE:
+        raise ValueError(f"Archive name is too long for a part header: {name}")
+
+    max_workers = min(max_workers or os.cpu_count() or 1, count)
+    try:
+        if max_workers == 1:
+            return [_encode_part(*task) for task in tasks]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_encode_part, *task) for task in tasks]
+            return [future.result() for future in futures]
+    except Exception:
+        for task in tasks:
+            if os.path.exists(task[1]):
+                os.remove(task[1])
+        raise
+
+# ==============================================================================
+# --- Decoding ---
+# ==============================================================================
+
+def is_part_file(file_path):
+    return read_header(file_path) is not None
+
+def find_parts(path):
+    """
+    Finds every part of a split set.
+
+    Args:
+        path (str): Any one part file (its siblings with the same set ID in the same
+                    folder are found by their headers, whatever they are named), or
+                    a folder holding the parts of exactly one set.
+
+    Returns:
+        list[str]: The part files found, unordered.
+    """
+    folder = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+    set_id = None if os.path.isdir(path) else (read_header(path) or {}).get("set")
+
+    parts = []
+    for entry in os.scandir(folder):
+        if not entry.is_file():
+            continue
+        header = read_header(entry.path)
+        if header is None:
+            continue
+        if set_id is None:
+            set_id = header["set"]
+        elif header["set"] != set_id:
+            if os.path.isdir(path):
+                raise ValueError(f"{folder} holds parts of more than one split set")
+            continue
+        parts.append(entry.path)
+    return parts
+
+def check_parts(part_paths):
+    """
+    Validates that part_paths form one complete split set.
+
+    Returns:
+        list[dict]: The headers ordered by offset, each with its 'path'.
+
+    Raises:
+        ValueError: If parts come from different sets, are duplicated or missing, or
+                    their ranges do not tile the archive exactly.
+    """
+    headers = []
+    for file_path in part_paths:
+        header = read_header(file_path)
+        if header is None:
+            raise ValueError(f"{file_path} is not a WHALE-PUUP part file")
+        header["path"] = file_path
+        headers.append(header)
+    if not headers:
+        raise ValueError("No part files given")
+
+    first = headers[0]
+    if any(h["set"] != first["set"] for h in headers):
+        raise ValueError("Part files belong to different split sets")
+    numbers = sorted(h["part"] for h in headers)
+    if len(set(numbers)) != len(numbers):
+        raise ValueError("The same part was given more than once")
+    missing = sorted(set(range(1, first["parts"] + 1)) - set(numbers))
+    if missing:
+        raise ValueError(f"Missing part(s) {', '.join(map(str, missing))} of {first['parts']} for {first['name']}")
+
+    headers.sort(key=lambda h: h["offset"])
+    position = 0
+    for header in headers:
+        if header["offset"] != position:
+            raise ValueError(f"Part {header['part']} starts at {header['offset']}, expected {position}")
+        position += header["length"]
+    if position != first["total"]:
+        raise ValueError(f"Parts cover {position} bytes but the archive is {first['total']} bytes")
+    return headers
+
+def _decode_part(header, output_path):
+    """Worker entry point: decodes one part into place in the preallocated output file."""
+    digest = hashlib.sha256()
+    written = 0
+    with open(header["path"], 'rb') as f_in, open(output_path, 'r+b') as f_out:
+        f_in.seek(header["header_size"])
+        f_out.seek(header["offset"])
+        for data in encoder.decode_blocks(f_in, codec=textcodec.get_codec(header.get("codec"))):
+            digest.update(data)
+            f_out.write(data)
+            written += len(data)
+
+    if written != header["length"]:
+        raise ValueError(f"Part {header['part']} decodes to {written} bytes, expected {header['length']}")
+    if digest.hexdigest() != header["sha256"]:
+        raise ValueError(f"Part {header['part']} ({header['path']}) failed its SHA-256 check")
+    return written
+
+def decode_parts(part_paths, output_path, max_workers=None):
+    """
+    Decodes a complete set of part files, given in any order, into output_path.
+
+    The output is preallocated to the archive's full size and each part is decoded
+    by a pool worker straight into place at its offset, so parts never wait on each
+    other. Every part's length and SHA-256 is checked against its header.
+
+    Args:
+        part_paths (list): The part files (see find_parts).
+        output_path (str): The ZIP file to create.
+        max_workers (int, optional): Decoding processes; defaults to the CPU count.
+
+    Returns:
+        dict: The header of the first part (set ID, name, part count, total size).
+
+    Raises:
+        ValueError: If the set is incomplete or a part fails its checks.
+        binascii.Error: If a part is not valid Base64 (or its header's codec).
+    """
+    headers = check_parts(part_paths)
+    print(utilities.color(f"[DECODE] Reassembling {len(headers)} part(s) of {headers[0]['name']} "
+                          f"({headers[0]['total'] / (1024 * 1024):.1f} MB)...", "CYAN"))
+
+    with open(output_path, 'wb') as f:
+        f.truncate(headers[0]["total"])
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(headers))
+    if max_workers == 1:
+        for header in headers:
+            _decode_part(header, output_path)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for future in [pool.submit(_decode_part, header, output_path) for header in headers]:
+                future.result()
+    return headers[0]
+
+class PartSetReader(io.RawIOBase):
+    """
+    A read-only, seekable file of the archive a complete split set encodes. Each
+    read is decoded from the part (or parts) holding it, without decoding the
+    rest (see encoder.EncodedReader). Part checksums cover whole parts, so they
+    are not checked; zipfile checks the CRC-32 of every member it reads.
+    """
+
+    def __init__(self, part_paths):
+        """
+        Args:
+            part_paths (list): The part files, in any order (see find_parts).
+
+        Raises:
+            ValueError: If the set is incomplete, or a part cannot be read at random.
+        """
+        super().__init__()
+        headers = check_parts(part_paths)
+        self.header = headers[0]
+        self.size = headers[0]["total"]
+        self._offsets = [header["offset"] for header in headers]
+        self._parts = []
+        try:
+            for header in headers:
+                self._parts.append(encoder.EncodedReader(header["path"], header["length"], header["header_size"],
+                                                         textcodec.get_codec(header.get("codec"))))
+        except ValueError:
+            self.close()
+            raise
+        self._position = 0
+
+    @property
+    def text_bytes_read(self):
+        return sum(part.text_bytes_read for part in self._parts)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def readinto(self, b):
+        """Reads from the part holding the current position; a read never spans two parts."""
+        if self._position >= self.size:
+            return 0
+        index = bisect.bisect_right(self._offsets, self._position) - 1
+        part = self._parts[index]
+        part.seek(self._position - self._offsets[index])
+        count = part.readinto(b)
+        self._position += count
+        return count
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        super().close()
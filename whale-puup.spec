@@ -1,31 +1,66 @@
 # -*- mode: python -*-
+#
+# Build profiles (pick one with the WHALE_PUUP_BUILD environment variable):
+#   onefile (default) - a single whale-puup.exe. Simple to carry around, but every
+#                       launch unpacks the whole bundle to a temp folder first.
+#   onedir            - dist/whale-puup/ holding whale-puup.exe next to its libraries.
+#                       Nothing is unpacked at launch and UPX is off, so it starts fastest.
+# e.g. `set WHALE_PUUP_BUILD=onedir` then `pyinstaller whale-puup.spec`.
+
+import os
 
 block_cipher = None
+build_profile = os.environ.get("WHALE_PUUP_BUILD", "onefile")
+if build_profile not in ("onefile", "onedir"):
+    raise SystemExit(f"Unknown WHALE_PUUP_BUILD '{build_profile}' (choose onefile or onedir)")
+onedir = build_profile == "onedir"
 
 
 a = Analysis(['main.py'],
              pathex=['.'],
              binaries=[],
-             datas=[],
+             datas=[], # The whale art is compiled into whale_art.py, so no data files are needed
              hiddenimports=['requests'], # Ensure requests and its dependencies are included
              hookspath=[],
              runtime_hooks=[],
-             excludes=[],
+             # Never imported by WHALE-PUUP; leaving them out shrinks what onefile unpacks per launch
+             excludes=['tkinter', 'test', 'pydoc_data'],
              win_no_prefer_redirects=False,
              win_private_assemblies=False,
              cipher=block_cipher,
              noarchive=False)
 pyz = PYZ(a.pure, a.zipped_data,
              cipher=block_cipher)
-exe = EXE(pyz,
-          a.scripts,
-          a.binaries,
-          a.zipfiles,
-          a.datas,
-          name='whale-puup', # This sets the output name to whale-puup.exe
-          debug=False,
-          strip=False,
-          upx=True,
-          console=True,
-          icon='icon/whale-icon.ico' # <--- ADDED: Path to the custom icon
-          )
\ No newline at end of file
+
+if onedir:
+    exe = EXE(pyz,
+              a.scripts,
+              [],
+              exclude_binaries=True,
+              name='whale-puup',
+              debug=False,
+              strip=False,
+              upx=False, # UPX-packed libraries are decompressed on every load
+              console=True,
+              icon='icon/whale-icon.ico'
+              )
+    coll = COLLECT(exe,
+                   a.binaries,
+                   a.zipfiles,
+                   a.datas,
+                   strip=False,
+                   upx=False,
+                   name='whale-puup') # dist/whale-puup/whale-puup.exe
+else:
+    exe = EXE(pyz,
+              a.scripts,
+              a.binaries,
+              a.zipfiles,
+              a.datas,
+              name='whale-puup', # This sets the output name to whale-puup.exe
+              debug=False,
+              strip=False,
+              upx=True,
+              console=True,
+              icon='icon/whale-icon.ico' # <--- ADDED: Path to the custom icon
+              )
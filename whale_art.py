@@ -0,0 +1,36 @@
+# ==============================================================================
+# WHALE-PUUP Whale Art Module (whale_art.py)
+# The ASCII whales from whales.json, compiled into Python so showing one needs
+# no file lookup or JSON parsing, and so the frozen executable always has them.
+# Generated: edit whales.json, then run `python whale_art.py` to rebuild this file.
+# ==============================================================================
+
+# Whale name -> ASCII art (lines joined with newlines), in whales.json order.
+WHALES = {
+    'humpback': "                       . .,\n                     '.-:-.`\n                     '  :  `\n                   .-----:,\n                 .'         .\n                .'          .\n               .'            .\n              .'             .\n         ,    /           (o) \\\n        \\`._/              ,__)\n  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~",
+    'beluga': "      (.)\n     / \\\\\n    |   |\n    \\  \\/\n     `---'",
+    'narwhal': "                       . .,\n                     '.-:-.`\n                     '  :  `\n                   .-----:,\n                 .'         .\n                .'          .\n               .'            .\n              .'             .\n         ,    /           (o) \\----------\n        \\`._/              ,__)\n  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~",
+    'minke_small': ' (\\\n  \\\\\n  `\\\\\n   `\\o)',
+    'crested_whale': '                   88                     88             \n                   88                     88             \n                   88                     88             \n8b      db      d8 88,dPPYba,  ,adPPYYba, 88  ,adPPYba,  \n`8b    d88b    d8\' 88P\'    "8a ""     `Y8 88 a8P_____88  \n `8b  d8\'`8b  d8\'  88       88 ,adPPPPP88 88 8PP"""""""  \n  `8bd8\'  `8bd8\'   88       88 88,    ,88 88 "8b,   ,aa  \n    YP      YP     88       88 `"8bbdP"Y8 88  `"Ybbd8"\'  ',
+    'deep_diver': "    .-------------'```'----....,,__                        _,\n   |                               `'`'`'`'-.,.__        .'(\n   |                                             `'--._.'   )\n   |                                                   `'-.<\n   \\               .-'`'-.                            -.    `\\\n    \\               -.o_.     _                     _,-'`\\    |\n     ``````''--.._.-=-._    .'  \\            _,,--'`      `-._(\n       (^^^^^^^^`___    '-. |    \\  __,,..--'                 `\n        `````````   `'--..___\\    |`                        \n                              `-.,'                         ",
+}
+
+def regenerate(json_path, module_path=__file__):
+    """Rewrites the WHALES literal of this module from json_path. Returns the whale count."""
+    import re
+    import json
+    with open(json_path, 'r', encoding='utf-8') as f:
+        whales = json.load(f)
+    with open(module_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    entries = [f"    {name!r}: {chr(10).join(lines)!r},\n" for name, lines in whales.items()]
+    literal = "WHALES = {\n" + "".join(entries) + "}\n"
+    source = re.sub(r"^WHALES = \{(?:\}|.*?^\})\n", lambda _: literal, source, count=1, flags=re.M | re.S)
+    with open(module_path, 'w', encoding='utf-8') as f:
+        f.write(source)
+    return len(whales)
+
+if __name__ == "__main__":
+    import os
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"Compiled {regenerate(os.path.join(here, 'whales.json'))} whale(s) into {os.path.join(here, 'whale_art.py')}")
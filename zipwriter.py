@@ -0,0 +1,319 @@
+# ==============================================================================
+# WHALE-PUUP ZIP Writer Module (zipwriter.py)
+# Builds standard ZIP archives with members compressed in parallel across cores.
+# Worker processes compress file contents; the parent process writes the
+# already-compressed members, in order, into a regular zipfile.ZipFile.
+# ==============================================================================
+
+import io
+import os
+import zlib
+import struct
+import hashlib
+import zipfile
+import tempfile
+import collections
+import concurrent.futures
+import compression
+
+# --- Configuration ---
+# Files smaller than this are grouped into batches so each task carries real work.
+SMALL_FILE_LIMIT = 1024 * 1024
+# A batch is closed once it holds this many bytes or this many files.
+BATCH_BYTES = 8 * 1024 * 1024
+BATCH_MAX_FILES = 512
+# Compressed output of files larger than this is spooled to a temp file by the
+# worker instead of being sent back through the pipe, bounding parent memory.
+SPOOL_THRESHOLD = 32 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+# Fixed part of a ZIP local file header; the name and extra field lengths sit at offset 26.
+LOCAL_HEADER_SIZE = 30
+
+# A file or directory to be archived. Directories have size 0 and is_dir=True.
+# mtime_ns is filled in when the lister already has it (see scanner.scan_tree).
+Member = collections.namedtuple("Member", ["path", "arcname", "size", "is_dir", "mtime_ns"], defaults=(None,))
+
+# Result of compressing one file in a worker. At most one of data/spool_path is set;
+# when neither is, the payload is supplied by a payload_writer (see write_raw_member).
+CompressedFile = collections.namedtuple("CompressedFile", ["crc", "file_size", "compress_size", "data", "spool_path",
+                                                           "sha256", "compress_type"],
+                                        defaults=(zipfile.ZIP_DEFLATED,))
+
+def collect_members(source_dir, prefix=""):
+    """
+    Lists everything under source_dir as archive members, in a deterministic order.
+
+    Arcnames are relative to source_dir (optionally under prefix), matching
+    shutil.make_archive. Directories are listed so empty ones are preserved.
+
+    Args:
+        source_dir (str): The directory to archive.
+        prefix (str): Optional leading folder for every arcname (e.g. the folder name).
+
+    Returns:
+        list[Member]: Members in walk order, each directory before its contents.
+    """
+    members = []
+    if prefix:
+        members.append(Member(source_dir, prefix, 0, True))
+    for dir_path, dir_names, file_names in os.walk(source_dir):
+        dir_names.sort()
+        rel_dir = os.path.relpath(dir_path, source_dir)
+        if rel_dir != os.curdir:
+            members.append(Member(dir_path, os.path.join(prefix, rel_dir), 0, True))
+        else:
+            rel_dir = ""
+        for file_name in sorted(file_names):
+            file_path = os.path.join(dir_path, file_name)
+            members.append(Member(file_path, os.path.join(prefix, rel_dir, file_name), os.path.getsize(file_path), False))
+    return members
+
+def write_raw_member(zf, zinfo, compressed, payload_writer=None):
+    """
+    Appends an already-compressed member to an open ZipFile.
+
+    zipfile has no public API for this, so it mirrors what ZipFile.writestr does
+    internally: write the local header and payload at the current position and
+    register the ZipInfo so close() emits it in the central directory. Because the
+    CRC and sizes are known up front, no data descriptor is needed and this works
+    on unseekable streams too.
+
+    Args:
+        zf (zipfile.ZipFile): Archive open for writing.
+        zinfo (zipfile.ZipInfo): Member header; compress_type must match the payload.
+        compressed (CompressedFile): Payload produced by compress_file.
+        payload_writer (callable, optional): Called with the archive's file object to
+                                             write the payload when compressed carries
+                                             neither data nor a spool path.
+
+    Returns:
+        int: Offset of the member's compressed data within the archive.
+    """
+    zinfo.CRC = compressed.crc
+    zinfo.file_size = compressed.file_size
+    zinfo.compress_size = compressed.compress_size
+    zinfo.flag_bits &= ~0x08
+    if zinfo.compress_type == zipfile.ZIP_LZMA:
+        zinfo.flag_bits |= zipfile._MASK_COMPRESS_OPTION_1 # As ZipFile does: the stream has an end marker
+    zf._writecheck(zinfo)
+    zf._didModify = True
+    zinfo.header_offset = zf.fp.tell()
+    zf.fp.write(zinfo.FileHeader())
+    data_offset = zf.fp.tell()
+
+    if compressed.data is not None:
+        zf.fp.write(compressed.data)
+    elif compressed.spool_path is not None:
+        with open(compressed.spool_path, 'rb') as spool:
+            for chunk in iter(lambda: spool.read(READ_CHUNK_SIZE), b''):
+                zf.fp.write(chunk)
+        os.remove(compressed.spool_path)
+    else:
+        payload_writer(zf.fp)
+
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+    zf.start_dir = zf.fp.tell()
+    return data_offset
+
+def raw_data_offset(fp, zinfo):
+    """
+    Returns the offset of a member's compressed data in an archive read from fp.
+
+    The local header's extra field may differ from the central directory's copy,
+    so its length is read from the local header itself.
+    """
+    fp.seek(zinfo.header_offset)
+    header = fp.read(LOCAL_HEADER_SIZE)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    return zinfo.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length
+
+def copy_info(zinfo, filename):
+    """Returns a fresh ZipInfo for filename carrying zinfo's timestamp, method and attributes."""
+    copy = zipfile.ZipInfo(filename, date_time=zinfo.date_time)
+    copy.compress_type = zinfo.compress_type
+    copy.create_system = zinfo.create_system
+    copy.external_attr = zinfo.external_attr
+    copy.comment = zinfo.comment
+    return copy
+
+def copy_raw_payload(fp, offset, length, out):
+    """Copies length bytes starting at offset in fp to out, without decompressing."""
+    fp.seek(offset)
+    while length > 0:
+        chunk = fp.read(min(READ_CHUNK_SIZE, length))
+        if not chunk:
+            raise EOFError("Archive ended inside a member's compressed data")
+        out.write(chunk)
+        length -= len(chunk)
+
+def compress_file(file_path, policy=None, spool_dir=None):
+    """
+    Compresses one file with the method its policy picks (raw deflate, bzip2 or
+    LZMA, in the format ZIP members use, or stored as-is) and computes its CRC and
+    SHA-256 in the same pass.
+
+    Args:
+        file_path (str): File to compress.
+        policy (compression.CompressionPolicy, optional): Chooses method and level;
+                                                          defaults to compression.DEFAULT_POLICY.
+        spool_dir (str, optional): Where to spool output for files over SPOOL_THRESHOLD.
+
+    Returns:
+        CompressedFile: CRC, sizes, digest, method, and the compressed bytes or their spool path.
+    """
+    policy = compression.get_policy(policy)
+    size = os.path.getsize(file_path)
+    compress_type, level = policy.choose(file_path, size)
+    with open(file_path, 'rb') as f:
+        return compress_stream(f, size, compress_type, level, policy.store_if_larger, spool_dir)
+
+def compress_stream(f, size, compress_type, level=None, store_if_larger=True, spool_dir=None):
+    """
+    Compresses everything read from a binary stream, as compress_file does for a file.
+
+    Args:
+        f: Readable binary stream, e.g. a file or a member opened with ZipFile.open.
+        size (int): Expected number of bytes, used to decide on spooling and on
+                    keeping small inputs so they can be stored instead.
+        compress_type (int): zipfile method to use.
+        level (int, optional): Compression level for the method.
+        store_if_larger (bool): Store small inputs whose compressed form is no smaller.
+        spool_dir (str, optional): Where to spool output for inputs over SPOOL_THRESHOLD.
+
+    Returns:
+        CompressedFile: CRC, sizes, digest, method, and the compressed bytes or their spool path.
+    """
+    compressor = zipfile._get_compressor(compress_type, level)
+    spool = spool_dir is not None and size > SPOOL_THRESHOLD
+    # Small files keep their raw bytes so they can be stored if compression does not pay
+    raw = [] if compressor and store_if_larger and size < SMALL_FILE_LIMIT else None
+    out = tempfile.NamedTemporaryFile(dir=spool_dir, delete=False) if spool else io.BytesIO()
+    digest = hashlib.sha256()
+    crc = 0
+    file_size = 0
+
+    with out:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            crc = zlib.crc32(chunk, crc)
+            digest.update(chunk)
+            file_size += len(chunk)
+            if compressor:
+                out.write(compressor.compress(chunk))
+                if raw is not None:
+                    raw.append(chunk)
+            else:
+                out.write(chunk)
+        if compressor:
+            out.write(compressor.flush())
+        compress_size = out.tell()
+        data = None if spool else out.getvalue()
+
+    if raw is not None and compress_size >= file_size:
+        data, compress_size, compress_type = b''.join(raw), file_size, zipfile.ZIP_STORED
+    return CompressedFile(crc, file_size, compress_size, data, out.name if spool else None, digest.hexdigest(), compress_type)
+
+def _compress_batch(paths, policy, spool_dir):
+    """Worker entry point: compresses every path in a batch (None entries are skipped)."""
+    return [None if path is None else compress_file(path, policy, spool_dir) for path in paths]
+
+def _plan_batches(members, reuse=()):
+    """Groups consecutive members into tasks: small files batched, large files alone."""
+    batch, batch_bytes = [], 0
+    for member in members:
+        if member.arcname in reuse:
+            batch.append(member) # No compression work; just keeps its place in order
+            continue
+        if member.size >= SMALL_FILE_LIMIT:
+            if batch:
+                yield batch
+                batch, batch_bytes = [], 0
+            yield [member]
+            continue
+        batch.append(member)
+        batch_bytes += member.size
+        if batch_bytes >= BATCH_BYTES or len(batch) >= BATCH_MAX_FILES:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+def write_zip_parallel(members, fileobj, max_workers=None, policy=None,
+                       reuse=None, on_written=None, extra_files=()):
+    """
+    Writes members into a standard ZIP, compressing them in a process pool.
+
+    Tasks are submitted through a bounded window and written back in submission
+    order, so the archive is deterministic and at most a few batches of compressed
+    data are held in memory at once. With one worker (or one task) files are
+    compressed in-process instead.
+
+    Args:
+        members (list[Member]): What to archive, e.g. from collect_members.
+        fileobj: A writable binary stream, or a path, for the archive.
+        max_workers (int, optional): Worker processes; defaults to os.cpu_count().
+        policy (compression.CompressionPolicy or str, optional): Picks each file's
+                                                                 method and level;
+                                                                 defaults to 'default'.
+        reuse (dict, optional): arcname -> (CompressedFile, payload_writer) for members
+                                whose compressed bytes already exist elsewhere; they
+                                are copied as-is instead of being recompressed.
+        on_written (callable, optional): Called as on_written(member, zinfo, compressed,
+                                         data_offset) after each file member is written.
+        extra_files (iterable): (ZipInfo, bytes) pairs written after all members, for
+                                generated content such as an index.
+
+    Returns:
+        int: The number of files written into the archive.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    policy = compression.get_policy(policy)
+    reuse = reuse or {}
+    batches = list(_plan_batches(members, reuse))
+    file_count = sum(1 for member in members if not member.is_dir)
+
+    def task_paths(batch):
+        return [None if member.is_dir or member.arcname in reuse else member.path for member in batch]
+
+    def write_batch(zf, batch, results):
+        for member, compressed in zip(batch, results):
+            if member.is_dir:
+                zf.write(member.path, member.arcname)
+                continue
+            payload_writer = None
+            if compressed is None:
+                compressed, payload_writer = reuse[member.arcname]
+            zinfo = zipfile.ZipInfo.from_file(member.path, member.arcname)
+            zinfo.compress_type = compressed.compress_type
+            data_offset = write_raw_member(zf, zinfo, compressed, payload_writer)
+            if on_written:
+                on_written(member, zinfo, compressed, data_offset)
+
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf, \
+            tempfile.TemporaryDirectory(prefix="whale_puup_spool_") as spool_dir:
+        if max_workers == 1 or len(batches) <= 1:
+            for batch in batches:
+                write_batch(zf, batch, _compress_batch(task_paths(batch), policy, spool_dir))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+                window = collections.deque()
+                batch_iter = iter(batches)
+
+                def submit_next():
+                    batch = next(batch_iter, None)
+                    if batch is not None:
+                        window.append((batch, pool.submit(_compress_batch, task_paths(batch), policy, spool_dir)))
+
+                for _ in range(max_workers * 2):
+                    submit_next()
+
+                while window:
+                    batch, future = window.popleft()
+                    results = future.result()
+                    submit_next()
+                    write_batch(zf, batch, results)
+
+        for zinfo, data in extra_files:
+            zf.writestr(zinfo, data)
+
+    return file_count